@@ -0,0 +1,72 @@
+# benchmarks/read_primitives.py
+#
+# times FileManipulator's primitive readers and the parsers built on them
+#
+# usage: python benchmarks/read_primitives.py [repository]
+# pass the root of another checkout (e.g. a `git worktree` of an older commit) to time that one instead
+
+import os
+import sys
+import timeit
+
+sys.path.insert(0, sys.argv[1] if len(sys.argv) > 1 else os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from epicmickeylib.internal.file_manipulator import FileManipulator, EndianType
+from epicmickeylib.formats.dct import DCT, DCTLine
+from epicmickeylib.formats.scene import *
+
+# values read per timed run of a primitive
+READS = 10000
+
+def best_time(function:callable, repeat:int = 20) -> float:
+    # the fastest run is the one least disturbed by everything else on the machine
+    return min(timeit.repeat(function, number=1, repeat=repeat))
+
+def time_primitive(name:str, size:int) -> float:
+    fm = FileManipulator(bytes(range(256)) * (READS * size // 256 + 1), endian=EndianType.BIG)
+    read = getattr(fm, name)
+
+    def run() -> None:
+        fm.seek(0)
+        for _ in range(READS):
+            read()
+
+    return best_time(run) / READS * 1e9
+
+def build_scene() -> bytes:
+    entities = []
+    for i in range(40):
+        components = []
+        for j in range(3):
+            properties = [
+                Property("Point3", "Translation", value=Point3(i, j, 1.5)),
+                Property("Matrix3", "Rotation", value=Matrix3()),
+                Property("Float", "F", value=0.25 * i),
+                Property("Float", "FL", value=[0.5, 1.0, i * 1.0]),
+                Property("Unsigned Integer", "U", value=[1, 2, 3, i]),
+                Property("Integer", "I", value=-i),
+                Property("Boolean", "B", value=bool(i % 2)),
+                Property("String", "S", value=f"str{i % 7}"),
+                Property("String", "SL", value=[f"a{i}", "b"], asset=True),
+                Property("Entity Pointer", "E", value=EntityPointer(ID(i))),
+                Property("Point2", "P2", value=Point2(1, 2)),
+                Property("Color (RGB)", "C", value=ColorRGB(0.5, 0.25, 1)),
+                Property("Short", "Sh", value=-3),
+                Property("Unsigned Short", "USh", value=7)
+            ]
+            components.append(Component(f"JPSComp{j}", "", ID(0x1234 + j), ID(i * 10 + j), ID(5) if j else None, properties))
+        entities.append(Entity("JPSGeneralEntity", f"ent{i}", ID(i + 1), ID(3) if i % 3 else None, i, i * 2, components))
+    scene = SceneFile(Scene([ID(k) for k in range(50)]), Objects(entities), ID(0xdeadbeef), [], SceneFileVersion.VERSION_1)
+    return bytes(scene.pack(EndianType.BIG))
+
+def main() -> None:
+    for name, size in (("r_u8", 1), ("r_u16", 2), ("r_u32", 4), ("r_s32", 4), ("r_u64", 8), ("r_float", 4)):
+        print(f"{name:10} {time_primitive(name, size):8.1f} ns")
+
+    dct = bytes(DCT(lines=[DCTLine(i + 1, f"line {i}") for i in range(20000)], footer_lines=[]).pack())
+    print(f"{'dct':10} {best_time(lambda: DCT.from_binary(dct)) * 1000:8.1f} ms (20000 lines)")
+    scene = build_scene()
+    print(f"{'scene':10} {best_time(lambda: SceneFile.from_binary(scene)) * 1000:8.1f} ms ({len(scene)} bytes)")
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,14 @@
 from epicmickeylib.internal.file_manipulator import FileManipulator
+from epicmickeylib.internal.record_schema import RecordSchema
+
+# the fixed size fields after the name of an entry
+ENTRY_FIELDS = RecordSchema(
+    ("id", "H"),
+    ("cd_filler", "2s"),
+    ("number", "H"),
+    ("ff_filler", "2s"),
+    ("boolean", "4s")
+)
 
 class ApprenticeGlobalStateEntry:
     text:str
@@ -14,21 +24,16 @@ class ApprenticeGlobalStateEntry:
     
     def unpack(self, fm:FileManipulator) -> "FileManipulator":
         self.text = fm.r_str_jps()
-        self.id = fm.r_u16()
-        fm.move(2) # skip the CD CD filler bytes
-        self.number = fm.r_u16()
-        fm.move(2) # skip the FF FF filler bytes
-        self.boolean = fm.r_bool()
+        # the CD CD and FF FF filler bytes are skipped
+        self.id, _, self.number, _, boolean = ENTRY_FIELDS.unpack(fm)
+        # only FF FF FF FF is true
+        self.boolean = boolean == b"\xFF\xFF\xFF\xFF"
         return fm
     
     def pack(self) -> bytes:
         fm:FileManipulator = FileManipulator()
         fm.w_str_jps(self.text)
-        fm.w_u16(self.id)
-        fm.write(b"\xCD\xCD")
-        fm.w_u16(self.number)
-        fm.write(b"\xFF\xFF")
-        fm.w_bool(self.boolean)
+        ENTRY_FIELDS.pack_to(fm, self.id, b"\xCD\xCD", self.number, b"\xFF\xFF", b"\xFF\xFF\xFF\xFF" if self.boolean else b"\x00\x00\x00\x00")
         return fm.getbuffer()
     
     def __str__(self):
@@ -60,7 +65,9 @@ class ApprenticeGlobalState:
         self.magic = fm.r_u32()
         self.highest_id = fm.r_u16()
         fm.move(2) # skip the CD CD filler bytes
-        while fm.tell() != fm.size():
+        size = fm.size()
+        # < rather than !=, a truncated last entry can leave the position past the end
+        while fm.tell() < size:
             entry = ApprenticeGlobalStateEntry()
             fm = entry.unpack(fm)
             self.entries.append(entry)
@@ -1,5 +1,13 @@
 from enum import Enum
-from epicmickeylib.internal.file_manipulator import FileManipulator, EndianType
+from epicmickeylib.internal.file_manipulator import FileManipulator, EndianType, ParseError
+from epicmickeylib.internal.string_pool import StringPool
+from epicmickeylib.internal.record_schema import RecordSchema
+
+# one 8 byte record per entry, the text offset points at a null terminated string
+CREDIT_RECORD = RecordSchema(
+    ("credit_type", "I"),
+    ("text_offset", "I")
+)
 
 class CreditType(Enum):
     NAME = 0
@@ -27,16 +35,18 @@ class CreditsFile:
         self.credit_entries = credit_entries
     
     def unpack(self, fm:FileManipulator) -> "FileManipulator":
+        strings = StringPool(fm)
         number_of_entries = fm.r_u32()
-        for i in range(number_of_entries):
-            fm.seek(4 + (i * 8))
-            number = fm.r_u32()
-            text_offset = fm.r_u32()
-            fm.seek(text_offset)
-            text = fm.r_str_null()
+        start = fm.tell()
+        for i, (number, text_offset) in enumerate(CREDIT_RECORD.unpack_table(fm, number_of_entries)):
+            text = strings.r_str_null(text_offset)
+            try:
+                credit_type = CreditType(number)
+            except ValueError:
+                raise ParseError(f"Unknown credit type {number}", start + i * CREDIT_RECORD.size) from None
             self.credit_entries.append(
                 CreditEntry (   
-                    credit_type=CreditType(number),
+                    credit_type=credit_type,
                     text=text
                 )
             )
@@ -5,6 +5,15 @@
 import json
 import os
 from epicmickeylib.internal.file_manipulator import FileManipulator, EndianType
+from epicmickeylib.internal.binary_builder import BinaryBuilder
+from epicmickeylib.internal.record_schema import RecordSchema
+
+# one 12 byte entry per audio file
+AUDIO_HEADER = RecordSchema(
+    ("hashed_name", "I"),
+    ("data_offset", "I"),
+    ("data_size", "I")
+)
 
 class VirtualAudioFile:
     hashed_name: int
@@ -15,7 +24,8 @@ class VirtualAudioFile:
         self.data = data
     
     def get_aligned_data(self, alignment: int = 2048) -> bytes:
-        return self.data + b"\x00" * (alignment - (len(self.data) % alignment))
+        # join instead of + so memoryview data from a mapped file works too
+        return b"".join((self.data, b"\x00" * (alignment - (len(self.data) % alignment))))
 
 
 class CafFile:
@@ -37,39 +47,34 @@ class CafFile:
         self.unknown_3 = fm.r_u32()
         fm.move(0x10)
         self.files = []
-        current_header_pos = fm.tell()
-        for i in range(amount_of_files):
-            hashed_name = fm.r_u32()
-            data_offset = fm.r_u32()
-            data_size = fm.r_u32()
-            current_header_pos = fm.tell()
+        # every header is read before seeking to the data
+        for hashed_name, data_offset, data_size in list(AUDIO_HEADER.unpack_table(fm, amount_of_files)):
             fm.seek(data_offset)
-            data = fm.read(data_size)
-            fm.seek(current_header_pos)
+            data = fm.r_bytes(data_size)
             self.files.append(VirtualAudioFile(hashed_name, data))
         return fm
 
     def pack(self, endian:EndianType = EndianType.BIG) -> bytes:
-        fm = FileManipulator(endian=endian)
-        fm.w_u32(self.unknown_1)
-        fm.w_u32(len(self.files))
-        fm.w_u32(self.unknown_2)
-        fm.w_u32(self.unknown_3)
-        fm.write(b"\x00" * 0x10)
-        current_header_pos = fm.tell()
-        current_data_pos = current_header_pos + (12 * len(self.files))
+        bb = BinaryBuilder(endian=endian)
+        bb.w_u32(self.unknown_1)
+        bb.w_u32(len(self.files))
+        bb.w_u32(self.unknown_2)
+        bb.w_u32(self.unknown_3)
+        bb.write(b"\x00" * 0x10)
+        # the data starts at the first 2048 boundary after the headers
+        data_offset = (0x20 + AUDIO_HEADER.size * len(self.files) + 2047) & ~2047
+        headers = []
+        for file in self.files:
+            headers.append((file.hashed_name, data_offset, len(file.data)))
+            data_offset += len(file.data) + 2048 - (len(file.data) % 2048)
+        AUDIO_HEADER.pack_table(bb, headers)
         # align data position to 2048
-        current_data_pos = (current_data_pos + 2047) & ~2047
+        bb.align(2048)
         for file in self.files:
-            fm.w_u32(file.hashed_name)
-            fm.w_u32(current_data_pos)
-            fm.w_u32(len(file.data))
-            current_header_pos = fm.tell()
-            fm.seek(current_data_pos)
-            fm.write(file.get_aligned_data())
-            current_data_pos = fm.tell()
-            fm.seek(current_header_pos)
-        return fm.getbuffer().tobytes()
+            # same padding as get_aligned_data, without copying the data
+            bb.write(file.data)
+            bb.write(b"\x00" * (2048 - (len(file.data) % 2048)))
+        return bb.getvalue()
     
     def to_dict_stripped(self):
         return {
@@ -129,7 +134,14 @@ class CafFile:
         return caf
     
     @staticmethod
-    def from_binary_path(path: str, endian: EndianType):
+    def from_binary_path(path: str, endian: EndianType, mapped: bool = False):
+        # mapped caf files keep their audio data as views into the file on disk
+        if mapped == True:
+            fm = FileManipulator.from_path(path, endian=endian, mapped=True)
+            caf = CafFile()
+            caf.files = []
+            caf.unpack(fm)
+            return caf
         with open(path, "rb") as f:
             data = f.read()
         return CafFile.from_binary(data, endian)
@@ -3,7 +3,7 @@
 # container for collectible and extras data used in both games
 
 from epicmickeylib.internal.file_manipulator import EndianType, FileManipulator
-from xml.etree.ElementTree import Element, SubElement, tostring
+from xml.etree.ElementTree import Element, SubElement, tostring, fromstring
 from xml.dom import minidom
 import json
 
@@ -226,23 +226,14 @@ class CollectibleDatabase:
     
     @staticmethod
     def from_xml(xml:str) -> "CollectibleDatabase":
-        root = Element.fromstring(xml)
+        root = fromstring(xml)
         version = int(root.get("Version"))
         collectibles = []
         for collectible_element in root.find("Collectibles"):
-            collectible = Collectible()
-            collectible.set_type(collectible_element.get("Type"))
-            collectible.set_dev_name(collectible_element.get("DevName"))
-            collectible.set_icon_path(collectible_element.get("IconPath"))
-            collectibles.append(collectible)
+            collectibles.append(Collectible(collectible_element.get("DevName"), collectible_element.get("Type"), collectible_element.get("IconPath")))
         extras = []
         for extra_element in root.find("Extras"):
-            extra = Extra()
-            extra.set_global_state(extra_element.get("GlobalState"))
-            extra.set_type(extra_element.get("Type"))
-            extra.set_thumbnail_path(extra_element.get("ThumbnailPath"))
-            extra.set_asset_path(extra_element.get("AssetPath"))
-            extras.append(extra)
+            extras.append(Extra(extra_element.get("GlobalState"), extra_element.get("Type"), extra_element.get("ThumbnailPath"), extra_element.get("AssetPath")))
         return CollectibleDatabase(version, collectibles, extras)
     
     @staticmethod
@@ -2,11 +2,17 @@
 #
 # dialog container format used in both games
 
-from epicmickeylib.internal.file_manipulator import EndianType, FileManipulator
+from epicmickeylib.internal.file_manipulator import EndianType, FileManipulator, ParseError
+from epicmickeylib.internal.binary_builder import BinaryBuilder
+from epicmickeylib.internal.record_schema import RecordSchema
+from epicmickeylib.internal.string_pool import StringPool
 from epicmickeylib.thirdparty.epic_mickey_hash import epic_mickey_hash
 import xml.etree.ElementTree as ET
 from xml.dom import minidom
 
+# one 12 byte record per line, empty lines are all zeros
+LINE_RECORD = RecordSchema(("hashed_key", "I"), ("text_offset", "I"), ("zero", "I"))
+
 class DCTLine:
     hashed_key:int
     text:str
@@ -59,6 +65,8 @@ class DCT:
 
         # read footer offset
         footer_offset = fm.tell() + fm.r_u32() + 9
+        if footer_offset > fm.size():
+            raise ParseError(f"Footer offset {footer_offset} is past the end of the file", fm.tell() - 4)
 
         # read footer switch
         footer_switch = fm.r_u32()
@@ -67,34 +75,21 @@ class DCT:
         else:
             footer_switch = False
 
-        current_data_offset = fm.tell()
+        strings = StringPool(fm)
 
         self.lines = []
-        # read lines
-        for _ in range(line_count):
-            # read line id (4 bytes)
-            hashed_key = fm.r_u32()
+        # the whole line table is read at once
+        table_offset = fm.tell()
+        for i, (hashed_key, text_offset, line_zero) in enumerate(LINE_RECORD.unpack_table(fm, line_count)):
             # if line id is 0, it is an empty line. add it to the lines and continue
             if hashed_key == 0:
-                # move forward 8 bytes
-                fm.move(8)
                 self.lines.append(DCTLine())
-                current_data_offset = fm.tell()
                 continue
-            line_offset = fm.tell() + fm.r_u32() + 1
-            # read line zero
-            line_zero = fm.r_u32()
-            # set current data offset
-            current_data_offset = fm.tell()
-            # go to line offset
-            fm.seek(line_offset)
-            # read line - r_str_null(dct)
-            line_text = fm.r_str_null()
+            # relative to the offset field, minus one
+            line_offset = table_offset + i * LINE_RECORD.size + 4 + text_offset + 1
+            line_text = strings.r_str_null(line_offset)
 
             self.lines.append(DCTLine(hashed_key,line_text))
-
-            # go to current data offset
-            fm.seek(current_data_offset)
         
         if not footer_switch:
             return fm
@@ -103,21 +98,16 @@ class DCT:
         while fm.tell() < footer_offset:
             footer_line_offset = fm.tell() + fm.r_u32() + 1
             footer_line_id = fm.r_u32()
-            current_data_offset = fm.tell()
 
-            fm.seek(footer_line_offset)
-
-            footer_line_text = fm.r_str_null()
+            footer_line_text = strings.r_str_null(footer_line_offset)
 
             # add footer line to footer
             self.footer_lines.append(DCTFooterEntry(footer_line_id, footer_line_text))
-            # go to current data offset
-            fm.seek(current_data_offset)
 
         return fm
     
     def pack(self) -> bytes:
-        fm = FileManipulator(endian=EndianType.LITTLE)
+        bb = BinaryBuilder(endian=EndianType.LITTLE)
 
         # get line count
         line_count = len(self.lines)
@@ -125,80 +115,68 @@ class DCT:
         footer_line_count = len(self.footer_lines)
         end_offset = (line_count * 12) + (footer_line_count * 8) - 1
 
-        fm.w_str(self.magic)
-        fm.w_u32(self.version1)
-        fm.w_u32(self.hash_seed)
-        fm.w_u32(self.version2)
+        bb.w_str(self.magic)
+        bb.w_u32(self.version1)
+        bb.w_u32(self.hash_seed)
+        bb.w_u32(self.version2)
 
         # write line count
-        fm.w_u32(line_count)
+        bb.w_u32(line_count)
 
         # write 1
-        fm.w_u32(1)
+        bb.w_u32(1)
         # write end offset
-        fm.w_u32(end_offset)
+        bb.w_u32(end_offset)
         # if there are no footer lines, write 0 and continue
         if footer_line_count == 0:
-            fm.w_u32(0)
+            bb.w_u32(0)
         else:
-            fm.w_u32(1)
+            bb.w_u32(1)
 
-        current_data_offset = fm.tell()
-        current_line_offset = end_offset + 50
-        # go to current line offset
-        fm.seek(current_line_offset)
-        # write null byte
-        fm.write(b"\x00")
-        # go to current data offset
-        fm.seek(current_data_offset)
+        # the text is written after the table, offsets to it are relative to the offset field minus one
+        texts = []
         # write lines
         for line in self.lines:
             # if line has no id, it is an empty line. write 0 and continue
             if line.hashed_key == 0:
                 for _ in range(3):
-                    fm.w_u32(0)
-                current_data_offset = fm.tell()
+                    bb.w_u32(0)
                 continue
-            # parse unicode escape sequences
 
             # write line id
-            fm.w_u32(line.hashed_key)
+            bb.w_u32(line.hashed_key)
             # write line offset
-            fm.w_u32(current_line_offset - fm.tell() - 1)
+            bb.w_offset(f"text {len(texts)}", adjust=-1, relative=True)
             # write line zero
-            fm.w_u32(0)
-            current_data_offset = fm.tell()
-            fm.seek(current_line_offset)
-            fm.w_str_null(line.text)
-            current_line_offset = fm.tell()
-            fm.seek(current_data_offset)
-        
-        if footer_line_count == 0:
-            return fm.getbuffer()
+            bb.w_u32(0)
+            texts.append(line.text)
 
-        # write footer
-        for footer_line in self.footer_lines:
-            # write offset
-            fm.w_u32(current_line_offset - fm.tell() - 1)
-            # write id
-            fm.w_u32(footer_line.number)
-            current_data_offset = fm.tell()
-            # go to current line offset
-            fm.seek(current_line_offset)
-            # write line
-            fm.w_str_null(footer_line.text)
-            # set current line offset
-            current_line_offset = fm.tell()
-            # go to current data offset
-            fm.seek(current_data_offset)
-        # write data end bytes
-        # DF FF FF FF
-        fm.write(b"\xdf\xff\xff\xff")
-        fm.w_u32(11)
-        fm.w_u32(12)
-        fm.w_u32(0)
+        if footer_line_count != 0:
+            # write footer
+            for footer_line in self.footer_lines:
+                # write offset
+                bb.w_offset(f"text {len(texts)}", adjust=-1, relative=True)
+                # write id
+                bb.w_u32(footer_line.number)
+                texts.append(footer_line.text)
+            # write data end bytes
+            # DF FF FF FF
+            bb.write(b"\xdf\xff\xff\xff")
+            bb.w_u32(11)
+            bb.w_u32(12)
+            bb.w_u32(0)
+
+        # the text starts at end offset + 50
+        text_offset = end_offset + 50
+        bb.pad_to(text_offset)
+        for i, text in enumerate(texts):
+            bb.label(f"text {i}")
+            bb.w_str_null(text)
+        # if there is no text, the text section is a single null byte
+        if bb.tell() == text_offset:
+            bb.write(b"\x00")
 
-        return fm.getbuffer()
+        return bb.getvalue()
     
     def get_line_from_key(self, key:str=""):
         hashed_key = epic_mickey_hash(key.encode("utf-8"), self.hash_seed)
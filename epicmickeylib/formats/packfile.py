@@ -9,12 +9,21 @@ from epicmickeylib.formats.collectible_database import CollectibleDatabase
 from epicmickeylib.formats.dct import DCT
 from epicmickeylib.formats.script import Script
 from epicmickeylib.formats.subtitle_file import SubtitleFile
-from epicmickeylib.internal.file_manipulator import FileManipulator, EndianType
+from epicmickeylib.internal.file_manipulator import FileManipulator, EndianType, ParseError
+from epicmickeylib.internal.binary_builder import BinaryBuilder
+from epicmickeylib.internal.record_schema import RecordSchema
+from epicmickeylib.internal.lru_cache import LRUCache
+from epicmickeylib.internal.compression_cache import CompressionCache
 from epicmickeylib.formats.scene import SceneFile
 # element tree is used for xml parsing
 import xml.etree.ElementTree as ET
 import zlib
+import itertools
 import os.path
+import shutil
+import tempfile
+from bisect import bisect_left, bisect_right, insort
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
 
 class EndianDependentString:
     text:str
@@ -30,34 +39,227 @@ class EndianDependentString:
         return fm
     
     def pack(self, endian:EndianType) -> bytes:
-        fm:FileManipulator = FileManipulator(endian=endian)
+        return self.pack_to(BinaryBuilder(endian=endian)).getvalue()
 
+    def pack_to(self, bb:BinaryBuilder) -> BinaryBuilder:
         string_to_write = self.text
 
         while len(string_to_write) < 4:
             string_to_write += "\0"
 
-        if fm.endian == EndianType.LITTLE:
+        if bb.endian == EndianType.LITTLE:
             string_to_write = string_to_write[::-1]
-        fm.w_str(string_to_write)
-        return fm.getbuffer()
+        bb.w_str(string_to_write)
+        return bb
+
+    @staticmethod
+    def from_u32(value:int) -> "EndianDependentString":
+        # the string read as a u32 of either endian, big endian bytes are always the text
+        return EndianDependentString(value.to_bytes(4, "big").decode("utf-8").replace("\x00", ""))
+
+    def to_u32(self) -> int:
+        # the inverse of from_u32, packing this as a u32 in either endian gives the same bytes as pack()
+        return int.from_bytes(self.text.encode("utf-8").ljust(4, b"\x00"), "big")
 
     def __str__(self) -> str:
         return self.text
 
+class PackedData:
+    """
+    Where the data of a file is stored inside a packfile, for reading it on demand.
+    """
+
+    fm:FileManipulator
+    offset:int
+    compressed_size:int
+    real_size:int
+    path:str
+
+    def __init__(self, fm:FileManipulator, offset:int, compressed_size:int, real_size:int, path:str = "") -> "PackedData":
+        self.fm = fm
+        self.offset = offset
+        self.compressed_size = compressed_size
+        self.real_size = real_size
+        self.path = path
+
+    def is_compressed(self) -> bool:
+        return self.compressed_size != self.real_size
+
+    def read_raw(self) -> bytes:
+        # the data exactly as it is stored, compressed or not
+        return self.fm.read_at(self.offset, self.compressed_size)
+
+    def read_view(self) -> memoryview:
+        # the stored data without copying it, keeps the whole packfile's data alive
+        return self.fm.view_at(self.offset, self.compressed_size)
+
+    def load(self) -> bytes:
+
+        """
+        Reads the data and decompresses it if needed.
+
+        Returns:
+        - The uncompressed data.
+        """
+
+        if not self.is_compressed():
+            return self.read_raw()
+        return self.decompress(self.read_view())
+
+    def decompress(self, raw:bytes) -> bytes:
+        if not self.is_compressed():
+            return raw
+        return decompress_exact(raw, self.real_size, self.path, self.offset)
+
+# zlib can't compress better than about 1032 to 1, a larger real size is damaged and isn't allocated
+MAX_COMPRESSION_RATIO = 1032
+
+def decompress_exact(raw:bytes, real_size:int, path:str = "", offset:int = 0) -> bytes:
+
+    """
+    Decompresses zlib data, producing at most the size it should have.
+
+    Args:
+    - raw (bytes): The compressed data, a memoryview isn't copied.
+    - real_size (int): The size of the decompressed data, from the table of contents.
+    - path (str): The path of the file, for errors.
+    - offset (int): Where the data is stored, for errors.
+
+    Returns:
+    - The decompressed data.
+    """
+
+    if real_size > len(raw) * MAX_COMPRESSION_RATIO + 0x100:
+        raise ParseError(f"Couldn't decompress {path}: {len(raw)} bytes can't decompress to {real_size}", offset)
+    decompressor = zlib.decompressobj()
+    try:
+        # bounded by the real size, so damaged data can't decompress to much more. a limit of 0 would mean no limit
+        data = decompressor.decompress(raw, max(real_size, 1))
+        # anything past the real size means the data doesn't match the table of contents
+        if not decompressor.eof and len(data) == real_size and len(decompressor.decompress(decompressor.unconsumed_tail, 1)) > 0:
+            raise ParseError(f"Couldn't decompress {path}: the data is larger than {real_size} bytes", offset)
+    except zlib.error as e:
+        raise ParseError(f"Couldn't decompress {path}: {e}", offset) from None
+    if len(data) != real_size:
+        raise ParseError(f"Couldn't decompress {path}: the data is {len(data)} bytes instead of {real_size}", offset)
+    if not decompressor.eof:
+        raise ParseError(f"Couldn't decompress {path}: the data ends early", offset)
+    return data
+
 class VirtualFile:
     type:EndianDependentString
     compress:bool
     compression_level:int
     path:str
-    data:bytes
-
-    def __init__(self, type:EndianDependentString = EndianDependentString(), compress:bool = False, compression_level:int = 6, path:str = "", data:bytes=[]) -> "VirtualFile":
+    # where the data is read from on first access, None once it has been replaced
+    source:PackedData
+    # decompressed data of lazily loaded files, None to keep it on the file itself
+    cache:LRUCache
+    # the file list indexing this file by path, told about renames
+    owner:"FileList"
+    # the data as it is stored in a packfile, None until it's needed or after data, compress or compression_level changed
+    compressed_data:bytes
+    # whether the compressed data in source is still what would be written, it's read back instead of compressing again
+    passthrough:bool
+    # (layout, offset, compressed size) of the unchanged data in a packfile on disk, None once it changed
+    stored_at:tuple
+
+    def __init__(self, type:EndianDependentString = EndianDependentString(), compress:bool = False, compression_level:int = 6, path:str = "", data:bytes=[], source:PackedData = None, cache:LRUCache = None) -> "VirtualFile":
+        self.compressed_data = None
+        self.passthrough = False
+        self.stored_at = None
         self.type = type
         self.compress = compress
         self.compression_level = compression_level
+        self.owner = None
         self.path = path
-        self.data = data
+        self.cache = cache
+        if source == None:
+            self.data = data
+        else:
+            self._data = None
+            self.source = source
+            self.passthrough = compress == True and source.is_compressed()
+
+    @property
+    def data(self) -> bytes:
+        if self._data != None:
+            return self._data
+        if self.cache == None:
+            self._data = self.source.load()
+            return self._data
+        data = self.cache.get(self.source)
+        if data == None:
+            data = self.source.load()
+            self.cache.put(self.source, data)
+        return data
+
+    @data.setter
+    def data(self, data:bytes) -> None:
+        # assign new data rather than changing it in place, or the compressed data won't be updated
+        self._data = data
+        self.source = None
+        self.compressed_data = None
+        self.passthrough = False
+        self.stored_at = None
+        self.changed()
+
+    def is_loaded(self) -> bool:
+        return self._data != None
+
+    def read_from(self, source:PackedData) -> None:
+        # the data is stored in source now, data that's already loaded is kept
+        self.source = source
+        self.compressed_data = None
+        self.passthrough = self.stored_at != None and self.compress == True and source.is_compressed()
+
+    def get_stored_data(self) -> tuple[bytes, bool]:
+        # the data as it's held right now and whether it still has to be decompressed, without loading anything
+        if self._data == None:
+            return self.source.read_raw(), self.source.is_compressed()
+        return self.data, False
+
+    def changed(self) -> None:
+        # the packed size may have changed
+        if getattr(self, "owner", None) != None:
+            self.owner.changed()
+
+    @property
+    def compress(self) -> bool:
+        return self._compress
+
+    @compress.setter
+    def compress(self, compress:bool) -> None:
+        if compress != getattr(self, "_compress", None):
+            self.compressed_data = None
+            self.passthrough = False
+            self.stored_at = None
+            self.changed()
+        self._compress = compress
+
+    @property
+    def compression_level(self) -> int:
+        return self._compression_level
+
+    @compression_level.setter
+    def compression_level(self, compression_level:int) -> None:
+        if compression_level != getattr(self, "_compression_level", None):
+            self.compressed_data = None
+            self.passthrough = False
+            self.stored_at = None
+            self.changed()
+        self._compression_level = compression_level
+
+    @property
+    def path(self) -> str:
+        return self._path
+
+    @path.setter
+    def path(self, path:str) -> None:
+        old_path = getattr(self, "_path", None)
+        self._path = path
+        if self.owner != None:
+            self.owner.rename(self, old_path)
     
     def get_data_str(self) -> str:
         # return the data as a string, 16 bytes per line, ints
@@ -68,31 +270,52 @@ class VirtualFile:
             data_str += str(self.data[i]) + " "
         return data_str
     
-    def get_compressed_data(self) -> bytes:
+    def needs_compressing(self) -> bool:
+        return self.compress == True and self.compressed_data == None and self.passthrough == False
+
+    def get_compressed_data(self, keep:bool = True, compression_cache:CompressionCache = None) -> bytes:
         if self.compress == True:
-            return zlib.compress(self.data, self.compression_level)
+            # compressed once, until the data or the compression settings change
+            if self.compressed_data == None:
+                # unchanged since it was read, the stored bytes are written back as they are
+                if self.passthrough == True:
+                    return self.source.read_raw()
+                if compression_cache != None:
+                    compressed_data = compression_cache.compress(self.data, self.compression_level)
+                else:
+                    compressed_data = zlib.compress(self.data, self.compression_level)
+                # not keeping it bounds memory when streaming a pack to disk
+                if keep == True:
+                    self.compressed_data = compressed_data
+                return compressed_data
+            return self.compressed_data
+        # stored uncompressed and not loaded yet, read it without keeping it
+        if self._data == None and not self.source.is_compressed():
+            return self.source.read_raw()
         return self.data
     
     def get_assembled_data(self) -> bytes:
         data = self.get_compressed_data()
-        # if the data is of type memoryview, convert it to bytes
-        if type(data) == memoryview:
-            data = bytes(data)
-        while (len(data) % 32) != 0:
-            data += b"\x00"
-        return data
+        # pad to 32 bytes in one go, join also turns memoryview data into bytes
+        return b"".join((data, bytes(-len(data) % 32)))
 
     def get_split_path(self) -> tuple[str, str]:
         return os.path.split(self.path)
     
     def get_real_data_size(self) -> int:
+        # lazily loaded files know their size from the table of contents
+        if self._data == None:
+            return self.source.real_size
         return len(self.data)
     
     def get_compressed_data_size(self) -> int:
+        # unchanged files know their size without reading anything
+        if self.stored_at != None:
+            return self.stored_at[2]
         return len(self.get_compressed_data())
     
     def get_aligned_data_size(self) -> int:
-        return len(self.get_assembled_data())
+        return (self.get_compressed_data_size() + 31) & ~31
     
     def __str__(self):
         string = \
@@ -104,6 +327,16 @@ class VirtualFile:
         """
         return string
     
+    def copy(self) -> "VirtualFile":
+        # shares the data and where it's stored, so an unchanged copy is written without compressing it again
+        file = VirtualFile(type=self.type, compress=self.compress, compression_level=self.compression_level, path=self.path, data=self._data)
+        file.source = self.source
+        file.cache = self.cache
+        file.compressed_data = self.compressed_data
+        file.passthrough = self.passthrough
+        file.stored_at = self.stored_at
+        return file
+
     def to_dict(self) -> dict:
         return {
             "type": str(self.type),
@@ -122,18 +355,593 @@ class VirtualFile:
         }
 
 
+class SuffixIndex:
+    """
+    The normalized paths of a FileList reversed and kept sorted, so every path
+    ending with a suffix is found with two binary searches instead of
+    comparing against each path, plus a dict of file name -> paths.
+
+    Kept up to date by the FileList it belongs to.
+    """
+
+    # reversed paths, sorted
+    reversed_paths:list[str]
+    # file name -> paths ending with it
+    basenames:dict[str, list[str]]
+
+    def __init__(self) -> "SuffixIndex":
+        self.reversed_paths = []
+        self.basenames = {}
+
+    def add(self, path:str) -> None:
+        insort(self.reversed_paths, path[::-1])
+        self.basenames.setdefault(path.rsplit("/", 1)[-1], []).append(path)
+
+    def remove(self, path:str) -> None:
+        reversed_path = path[::-1]
+        i = bisect_left(self.reversed_paths, reversed_path)
+        if i < len(self.reversed_paths) and self.reversed_paths[i] == reversed_path:
+            del self.reversed_paths[i]
+        basename = path.rsplit("/", 1)[-1]
+        paths = self.basenames.get(basename, [])
+        if path in paths:
+            paths.remove(path)
+            if len(paths) == 0:
+                del self.basenames[basename]
+
+    def find(self, suffix:str) -> list[str]:
+
+        """
+        Gets every path ending with a suffix.
+
+        Args:
+        - suffix (str): The normalized end of the path, which doesn't have to start at a slash.
+
+        Returns:
+        - The matching paths, in no particular order.
+        """
+
+        # paths ending with the suffix are exactly the reversed paths starting with it, which sort next to each other
+        reversed_suffix = suffix[::-1]
+        start = bisect_left(self.reversed_paths, reversed_suffix)
+        end = bisect_left(self.reversed_paths, reversed_suffix + "\U0010ffff", start)
+        return [reversed_path[::-1] for reversed_path in self.reversed_paths[start:end]]
+
+    def find_basename(self, basename:str) -> list[str]:
+        # paths whose last part is exactly the given name
+        return list(self.basenames.get(basename, []))
+
+class FileList(list):
+    """
+    The files of a packfile in order, with an index of normalized path -> files.
+
+    Behaves like a list. Adding, removing, replacing and renaming files keeps
+    the index up to date, so `get()`, `find_by_suffix()` and `find_by_basename()`
+    don't have to search the whole list. A file is tracked by the last FileList
+    it was added to, renaming it only updates that list's index.
+    """
+
+    index:dict[str, list[VirtualFile]]
+    suffixes:SuffixIndex
+    # id of file -> positions, rebuilt on demand after files are added, removed or moved
+    positions:dict[int, list[int]]
+    # changes on every change to the files or their order, for things built from the list to know when they're out of date
+    version:int
+
+    # shared by every list, so a new list never reuses a version an older list had
+    versions = itertools.count(1)
+
+    def __init__(self, files:list[VirtualFile] = ()) -> "FileList":
+        self.version = 0
+        super().__init__(files)
+        self.reindex()
+
+    def changed(self) -> None:
+        self.version = next(FileList.versions)
+
+    def reindex(self) -> None:
+        self.changed()
+        self.index = {}
+        self.suffixes = SuffixIndex()
+        self.positions = None
+        for file in self:
+            self._add_to_index(file)
+
+    def _add_to_index(self, file:VirtualFile) -> None:
+        self.changed()
+        self.positions = None
+        file.owner = self
+        key = Packfile.format_path_for_comparison(file.path)
+        files = self.index.get(key)
+        if files == None:
+            files = []
+            self.index[key] = files
+            self.suffixes.add(key)
+        files.append(file)
+
+    def _remove_from_index(self, file:VirtualFile, path:str = None) -> None:
+        if path == None:
+            path = file.path
+        self.changed()
+        self.positions = None
+        key = Packfile.format_path_for_comparison(path)
+        files = self.index.get(key, [])
+        if file in files:
+            files.remove(file)
+            if len(files) == 0:
+                del self.index[key]
+                self.suffixes.remove(key)
+        # the same file can be in the list more than once
+        if file.owner is self and file not in files:
+            file.owner = None
+
+    def get(self, path:str) -> VirtualFile:
+
+        """
+        Gets a file by path, ignoring case, slash direction and a leading slash.
+
+        Args:
+        - path (str): The path of the file.
+
+        Returns:
+        - The first file in the list with that path, or None.
+        """
+
+        files = self.index.get(Packfile.format_path_for_comparison(path))
+        if files == None:
+            return None
+        if len(files) == 1:
+            return files[0]
+        # duplicate paths resolve to whichever comes first in the list
+        return min(files, key=self.index_of)
+
+    def find_by_suffix(self, suffix:str) -> list[VirtualFile]:
+
+        """
+        Gets every file whose path ends with a suffix, ignoring case, slash
+        direction and a leading slash.
+
+        Args:
+        - suffix (str): The end of the path, which doesn't have to start at a slash.
+
+        Returns:
+        - The matching files, in list order.
+        """
+
+        return self._get_files(self.suffixes.find(Packfile.format_path_for_comparison(suffix)))
+
+    def find_by_basename(self, basename:str) -> list[VirtualFile]:
+
+        """
+        Gets every file with a file name, ignoring case.
+
+        Args:
+        - basename (str): The file name, without any folders.
+
+        Returns:
+        - The matching files, in list order.
+        """
+
+        return self._get_files(self.suffixes.find_basename(basename.lower()))
+
+    def _get_files(self, keys:list[str]) -> list[VirtualFile]:
+        files = []
+        for key in keys:
+            files.extend(self.index[key])
+        if len(files) < 2:
+            return files
+        # a file that is in the list more than once is in the index once per position
+        positions = set()
+        for file in files:
+            positions.update(self.get_positions()[id(file)])
+        return [self[i] for i in sorted(positions)]
+
+    def get_positions(self) -> dict[int, list[int]]:
+        if self.positions == None:
+            self.positions = {}
+            for i, file in enumerate(self):
+                self.positions.setdefault(id(file), []).append(i)
+        return self.positions
+
+    def index_of(self, file:VirtualFile) -> int:
+        # by identity, files don't define equality
+        positions = self.get_positions().get(id(file))
+        if positions == None:
+            raise ValueError("File is not in the list")
+        return positions[0]
+
+    def rename(self, file:VirtualFile, old_path:str) -> None:
+        # called by VirtualFile when its path changes
+        count = 1
+        if old_path != None:
+            # a file that is in the list more than once moves with all of its entries
+            count = max(1, sum(1 for other in self.index.get(Packfile.format_path_for_comparison(old_path), []) if other is file))
+            for _ in range(count):
+                self._remove_from_index(file, old_path)
+        for _ in range(count):
+            self._add_to_index(file)
+
+    def append(self, file:VirtualFile) -> None:
+        super().append(file)
+        self._add_to_index(file)
+
+    def insert(self, index:int, file:VirtualFile) -> None:
+        super().insert(index, file)
+        self._add_to_index(file)
+
+    def extend(self, files) -> None:
+        files = list(files)
+        super().extend(files)
+        for file in files:
+            self._add_to_index(file)
+
+    def __iadd__(self, files) -> "FileList":
+        self.extend(files)
+        return self
+
+    def __imul__(self, amount:int) -> "FileList":
+        super().__imul__(amount)
+        self.reindex()
+        return self
+
+    def remove(self, file:VirtualFile) -> None:
+        super().remove(file)
+        self._remove_from_index(file)
+
+    def pop(self, index:int = -1) -> VirtualFile:
+        file = super().pop(index)
+        self._remove_from_index(file)
+        return file
+
+    def clear(self) -> None:
+        self._release(self)
+        super().clear()
+        self.index = {}
+        self.suffixes = SuffixIndex()
+        self.positions = None
+        self.changed()
+
+    def sort(self, *args, **kwargs) -> None:
+        super().sort(*args, **kwargs)
+        self.positions = None
+        self.changed()
+
+    def reverse(self) -> None:
+        super().reverse()
+        self.positions = None
+        self.changed()
+
+    def _release(self, files:list[VirtualFile]) -> None:
+        # files that are still in the list are claimed again by reindex()
+        for file in files:
+            if file.owner is self:
+                file.owner = None
+
+    def __setitem__(self, index, value) -> None:
+        if isinstance(index, slice):
+            self._release(self[index])
+            super().__setitem__(index, value)
+            self.reindex()
+            return
+        old_file = self[index]
+        super().__setitem__(index, value)
+        self._remove_from_index(old_file)
+        self._add_to_index(value)
+
+    def __delitem__(self, index) -> None:
+        if isinstance(index, slice):
+            self._release(self[index])
+            super().__delitem__(index)
+            self.reindex()
+            return
+        old_file = self[index]
+        super().__delitem__(index)
+        self._remove_from_index(old_file)
+
+class StoredLayout:
+    """
+    The packfile on disk that files were read from or last saved to.
+
+    Files that haven't changed point at their data in it with
+    `VirtualFile.stored_at`, which lets `Packfile.save_in_place()` leave
+    that data where it is.
+    """
+
+    endian:EndianType
+    path:str
+    # whether the file is memory-mapped, changing it in place would break the files reading from it
+    mapped:bool
+    # the mapping the files read from, closed before saving over it. None if it isn't mapped or was mapped by something else
+    fm:FileManipulator
+    size:int
+    modified_time:int
+
+    def __init__(self, endian:EndianType, path:str = None, mapped:bool = False) -> "StoredLayout":
+        self.endian = endian
+        self.path = None
+        self.mapped = mapped
+        self.fm = None
+        self.size = 0
+        self.modified_time = 0
+        if path != None:
+            self.remember_path(path, mapped)
+
+    def remember_path(self, path:str, mapped:bool = False) -> None:
+        self.path = os.path.abspath(path)
+        self.mapped = mapped
+        self.update_stat()
+
+    def update_stat(self) -> None:
+        stat = os.stat(self.path)
+        self.size = stat.st_size
+        self.modified_time = stat.st_mtime_ns
+
+    def matches_disk(self) -> bool:
+        # false if the file was changed by something else since it was read or saved
+        if self.path == None or not os.path.exists(self.path):
+            return False
+        stat = os.stat(self.path)
+        return stat.st_size == self.size and stat.st_mtime_ns == self.modified_time
+
+def move_region(f, old_offset:int, new_offset:int, size:int, chunk_size:int = 0x100000) -> None:
+    # copies in chunks, back to front when moving forward so overlapping data is read before it's overwritten
+    starts = list(range(0, size, chunk_size))
+    if new_offset > old_offset:
+        starts.reverse()
+    for start in starts:
+        length = min(chunk_size, size - start)
+        f.seek(old_offset + start)
+        chunk = f.read(length)
+        f.seek(new_offset + start)
+        f.write(chunk.ljust(length, b"\x00"))
+
+class OffsetIndex:
+    """
+    The data range of every file in a packfile as it would be packed, sorted
+    by offset so the file at an offset is found with a binary search.
+
+    Built by `Packfile.get_offset_index()`, which rebuilds it after the files change.
+    """
+
+    # the FileList and its version this was built from
+    file_list:"FileList"
+    version:int
+    starts:list[int]
+    ends:list[int]
+    files:list[VirtualFile]
+
+    def __init__(self, packfile:"Packfile") -> "OffsetIndex":
+        self.file_list = packfile.files
+        self.version = packfile.files.version
+        self.files = list(packfile.files)
+        self.starts = []
+        self.ends = []
+        path_partition, _ = packfile.pack_path_partition()
+        # header, number of files, table of contents and path partition, aligned to 32 bytes
+        offset = (0x20 + 4 + TOC_ENTRY.size * len(self.files) + len(path_partition) + 31) & ~31
+        for file in self.files:
+            self.starts.append(offset)
+            offset += (file.get_compressed_data_size() + 31) & ~31
+            self.ends.append(offset)
+
+    def find(self, offset:int) -> VirtualFile:
+        # the last file starting at or before the offset, files without data share their start with the next one
+        i = bisect_right(self.starts, offset) - 1
+        if i < 0 or offset >= self.ends[i]:
+            return None
+        return self.files[i]
+
+    def find_all(self, offsets:list[int]) -> list[VirtualFile]:
+
+        """
+        Gets the files covering many offsets at once.
+
+        Args:
+        - offsets (list[int]): Offsets in the packed packfile, in any order.
+
+        Returns:
+        - The file covering each offset, or None, in the same order as the offsets.
+        """
+
+        return [self.find(offset) for offset in offsets]
+
+# extension -> side file extension of the files that can be decompiled, the same ones from_dict_stripped compiles
+DECOMPILED_EXTENSIONS = {
+    ".bin": ".json",
+    ".clb": ".xml",
+    ".sub": ".xml",
+    ".dct": ".xml"
+}
+
+def decompile(path:str, data:bytes, endian:EndianType) -> str:
+    extension = os.path.splitext(path)[1].lower()
+    if extension == ".bin":
+        return SceneFile.from_binary(data, endian=endian).to_json()
+    elif extension == ".clb":
+        return CollectibleDatabase.from_binary(data, endian).to_xml()
+    elif extension == ".sub":
+        return SubtitleFile.from_binary(data, endian=endian).to_xml()
+    elif extension == ".dct":
+        return DCT.from_binary(data).to_xml()
+    raise Exception(f"Unknown extension {extension}")
+
+def is_inside_directory(directory:str, path:str) -> bool:
+    directory = os.path.normcase(os.path.realpath(directory))
+    path = os.path.normcase(os.path.realpath(path))
+    try:
+        return os.path.commonpath([directory, path]) == directory
+    except ValueError:
+        # on windows, a path on another drive has no common path with the directory
+        return False
+
+def extract_file(directory:str, path:str, data:bytes, compressed:bool, decompile_file:bool, endian:EndianType, overwrite:bool, real_size:int) -> str:
+
+    """
+    Writes one file of a packfile to a directory. Module level so a process pool can run it.
+
+    Args:
+    - directory (str): The directory to extract to.
+    - path (str): The path of the file in the packfile.
+    - data (bytes): The data of the file.
+    - compressed (bool): Whether the data still has to be decompressed.
+    - decompile_file (bool): Whether to write a decompiled side file too.
+    - endian (EndianType): The endian of the packfile, for decompiling.
+    - overwrite (bool): Whether to replace files that already exist.
+    - real_size (int): The size of the decompressed data.
+
+    Returns:
+    - Why the file couldn't be extracted or decompiled, or None if it was or didn't have to be.
+    """
+
+    absolute_path = os.path.join(directory, path)
+    # paths in a packfile can't write outside the directory
+    if not is_inside_directory(directory, absolute_path):
+        return "Not extracted, the path is outside the extraction directory"
+    try:
+        if compressed == True:
+            data = decompress_exact(data, real_size, path)
+        os.makedirs(os.path.dirname(absolute_path), exist_ok=True)
+        if overwrite == True or not os.path.exists(absolute_path):
+            with open(absolute_path, "wb") as f:
+                f.write(data)
+    except Exception as e:
+        # damaged data or a path this system can't write, the other files are still extracted
+        return f"Not extracted, {type(e).__name__}: {e}"
+    extension = os.path.splitext(path)[1].lower()
+    if decompile_file == False or extension not in DECOMPILED_EXTENSIONS:
+        return None
+    side_path = absolute_path + DECOMPILED_EXTENSIONS[extension]
+    if overwrite == False and os.path.exists(side_path):
+        return None
+    try:
+        text = decompile(path, data, endian)
+        with open(side_path, "w") as f:
+            f.write(text)
+    except Exception as e:
+        # the raw file is still there, rebuilding uses it when there is no side file
+        return f"Not decompiled, {type(e).__name__}: {e}"
+    return None
+
+# one 24 byte table of contents entry, the type is the 4 character type string read as a u32
+TOC_ENTRY = RecordSchema(
+    ("real_file_size", "I"),
+    ("compressed_file_size", "I"),
+    ("aligned_file_size", "I"),
+    ("folder_pointer", "I"),
+    ("type", "I"),
+    ("file_pointer", "I")
+)
+
+def replace_file(path:str, write:callable, before_replace:callable = None):
+
+    """
+    Writes a file next to `path` and renames it over `path` once it's complete,
+    so a failed write leaves the old file alone.
+
+    Args:
+    - path (str): The file to write.
+    - write (callable): Called with the open binary file to write into.
+    - before_replace (callable): Called once the file is written, before it's renamed over `path`. Windows can't rename over a file that is still open or mapped, so files `write` read from are closed here.
+
+    Returns:
+    - What `write` returned.
+    """
+
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, temp_path = tempfile.mkstemp(prefix=".", suffix=".tmp", dir=directory)
+    try:
+        with os.fdopen(fd, "wb") as f:
+            result = write(f)
+        if before_replace != None:
+            before_replace()
+        # mkstemp only lets the owner read the file, keep the permissions a normal save would have
+        if os.path.exists(path):
+            shutil.copymode(path, temp_path)
+        else:
+            umask = os.umask(0)
+            os.umask(umask)
+            os.chmod(temp_path, 0o666 & ~umask)
+        os.replace(temp_path, path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+    return result
+
+def convert_header(header:bytes, endian:EndianType) -> bytes:
+
+    """
+    Converts everything that comes before the path partition of a packed
+    packfile to the other endian.
+
+    The magic, the type of every file and the padding are packed like u32s
+    as well, so every 4 bytes of it are one value read in one endian and
+    written in the other.
+
+    Args:
+    - header (bytes): The start of a packfile, at least up to the end of its table of contents.
+    - endian (EndianType): The endian the header is in.
+
+    Returns:
+    - The converted header and table of contents, the rest of the packfile stays the same.
+    """
+
+    fm = FileManipulator(data=header, endian=endian)
+    bb = BinaryBuilder(endian=EndianType.LITTLE if endian == EndianType.BIG else EndianType.BIG)
+    fm.seek(12)
+    header_size = fm.r_u32()
+    if header_size < 20 or header_size % 4 != 0:
+        raise ParseError(f"Invalid header size {header_size}", 12)
+    fm.seek(0)
+    for _ in range(header_size // 4):
+        bb.w_u32(fm.r_u32())
+    num_files = fm.r_u32()
+    bb.w_u32(num_files)
+    TOC_ENTRY.pack_table(bb, TOC_ENTRY.unpack_table(fm, num_files))
+    return bb.getvalue()
+
 class Packfile:
 
     magic:str
     version:int
-    files:list[VirtualFile]
+    files:FileList
+    # where the packfile was read from or last saved to, None if it never was
+    layout:StoredLayout
+    offset_index:"OffsetIndex"
+    # where compressed data is looked up before compressing, None to always compress
+    compression_cache:CompressionCache
 
     def __init__(self, magic:str = "PAK ", version:int = 2, files:list[VirtualFile] = []):
         self.magic = magic
         self.version = version
         self.files = files
+        self.layout = None
+        self.offset_index = None
+        self.compression_cache = None
+
+    @property
+    def files(self) -> FileList:
+        return self._files
 
-    def unpack(self, fm:FileManipulator):
+    @files.setter
+    def files(self, files:list[VirtualFile]) -> None:
+        # plain lists are copied into an indexed list, the order is kept
+        if not isinstance(files, FileList):
+            files = FileList(files)
+        self._files = files
+
+    def unpack(self, fm:FileManipulator, lazy:bool = False, cache:LRUCache = None):
+
+        """
+        Reads the packfile.
+
+        Args:
+        - fm (FileManipulator): The file to read from.
+        - lazy (bool): Whether to only read the table of contents, reading and decompressing the data of a file on first access. The file manipulator has to stay open while the files are in use.
+        - cache (LRUCache): Where lazily loaded files keep their decompressed data, by default every file keeps its own once loaded.
+        """
+
+        self.layout = StoredLayout(fm.endian)
         self.magic = fm.r_str(4)
         if fm.endian == EndianType.BIG:
             self.magic = self.magic[::-1]
@@ -148,33 +956,23 @@ class Packfile:
         string_pointer = (num_files * 24) + header_size + 4
         current_header_position = header_size + 4
 
+        # measured once, before views of the data keep the buffer from being measured without a copy
+        file_size = fm.size()
+
         # go to current header position
         fm.seek(current_header_position)
 
-        # loop through all files
-        for _ in range(num_files):
-            # get the real file size as a 4 byte int
-            real_file_size = fm.r_u32()
-            # get the compressed file size as a 4 byte int
-            compressed_file_size = fm.r_u32()
-            # get the aligned file size as a 4 byte int
-            aligned_file_size = fm.r_u32()
-            
-            # read the folder pointer as a 4 byte int
-            folder_pointer = fm.r_u32()
-            # read the file type as a 4 byte string
-            file_type = EndianDependentString()
-            fm = file_type.unpack(fm)
-            # read the file pointer as a 4 byte int
-            file_pointer = fm.r_u32()
+        # loop through all files, the whole table of contents is read in one go
+        for i, (real_file_size, compressed_file_size, aligned_file_size, folder_pointer, type_value, file_pointer) in enumerate(TOC_ENTRY.unpack_table(fm, num_files)):
+            try:
+                file_type = EndianDependentString.from_u32(type_value)
+            except UnicodeDecodeError:
+                raise ParseError("File type is not valid utf-8", current_header_position + i * TOC_ENTRY.size + 16) from None
 
             # add the string pointer to the folder name pointer and the file name pointer
             folder_pointer += string_pointer
             file_pointer += string_pointer
 
-            # set the current header position to the current position
-            current_header_position = fm.tell()
-
             # go to the folder name pointer
             fm.seek(folder_pointer)
             # read the folder name as a null terminated string
@@ -192,182 +990,391 @@ class Packfile:
             else:
                 path = folder_name + "/" + file_name
 
-            # go to the current data position
-            fm.seek(current_data_positon)
+            # the data is read from the current data position, now or on first access
+            source = PackedData(fm, current_data_positon, compressed_file_size, real_file_size, path)
+            if current_data_positon + compressed_file_size > file_size:
+                raise ParseError(f"Data of {path} is past the end of the file", current_data_positon)
+
+            if lazy == True:
+                file = VirtualFile(type=file_type, compress=source.is_compressed(), path=path, source=source, cache=cache)
+            elif source.is_compressed():
+                # a view of the stored data, it's decompressed and kept without being copied
+                raw = source.read_view()
+                file = VirtualFile(type=file_type, compress=True, path=path, data=source.decompress(raw))
+                # kept so unchanged files are written back without compressing them again
+                file.compressed_data = raw
+            else:
+                file = VirtualFile(type=file_type, compress=False, path=path, data=source.read_raw())
+            file.stored_at = (self.layout, current_data_positon, compressed_file_size)
+            self.files.append(file)
 
-            # read the data
-            data = fm.read(compressed_file_size)
+            # add the aligned file size to the current data position
+            current_data_positon += aligned_file_size
 
-            compress = False
-            # if the file is compressed, decompress it
-            if compressed_file_size != real_file_size:
-                compress = True
-                data = zlib.decompress(data)
-            
-            self.files.append(
-                VirtualFile (
-                    type=file_type,
-                    compress=compress,
-                    path=path,
-                    data=data
+        return fm
+
+    def extract(self, directory:str, decompile:bool = False, overwrite:bool = True, workers:int = 0, use_processes:bool = False, progress:callable = None) -> dict[str, str]:
+
+        """
+        Writes every file to a directory tree along with the stripped manifest, which `from_json_stripped_path` rebuilds the packfile from.
+
+        Args:
+        - directory (str): The directory to extract to.
+        - decompile (bool): Whether to also write scenes as .json and collectible databases, subtitles and dictionaries as .xml side files.
+        - overwrite (bool): Whether to replace files that already exist.
+        - workers (int): The amount of threads or processes decompressing and writing files, 0 uses one per core.
+        - use_processes (bool): Whether to use a process pool rather than a thread pool, which is faster when decompiling.
+        - progress (callable): Called with (files written, total files, file) after each file.
+
+        Returns:
+        - The path of every file that couldn't be extracted or decompiled -> why. The rest of the files are extracted anyway, and the raw data of a file that couldn't be decompiled is still there.
+        """
+
+        if workers <= 0:
+            workers = os.cpu_count() or 1
+        endian = EndianType.BIG
+        if self.layout != None:
+            endian = self.layout.endian
+        os.makedirs(directory, exist_ok=True)
+        failed = {}
+        total = len(self.files)
+        done = 0
+        executor_type = ProcessPoolExecutor if use_processes == True else ThreadPoolExecutor
+        # a few batches per worker bounds how much data is waiting to be written at once
+        batch_size = workers * 4
+        with executor_type(max_workers=workers) as executor:
+            for start in range(0, total, batch_size):
+                batch = self.files[start:start + batch_size]
+                # data is read here, lazily loaded files aren't safe to load from several threads
+                datas = []
+                compressed = []
+                for file in batch:
+                    data, is_compressed = file.get_stored_data()
+                    if use_processes == True:
+                        # memoryviews can't be sent to another process
+                        data = bytes(data)
+                    datas.append(data)
+                    compressed.append(is_compressed)
+                results = executor.map(
+                    extract_file,
+                    [directory] * len(batch),
+                    [file.path for file in batch],
+                    datas,
+                    compressed,
+                    [decompile] * len(batch),
+                    [endian] * len(batch),
+                    [overwrite] * len(batch),
+                    [file.get_real_data_size() for file in batch]
                 )
-            )
+                for file, error in zip(batch, results):
+                    if error != None:
+                        failed[file.path] = error
+                    done += 1
+                    if progress != None:
+                        progress(done, total, file)
+        self.to_json_stripped_path(os.path.join(directory, "packfile_stripped.json"))
+        return failed
 
-            # add the aligned file size to the current data position
-            current_data_positon += aligned_file_size
+    def compress_files(self, workers:int = 0, use_processes:bool = False) -> None:
 
-            # go to the current header position
-            fm.seek(current_header_position)
+        """
+        Compresses every file that needs it in parallel, so packing only has to write them.
 
-        return fm
+        Args:
+        - workers (int): The amount of threads or processes to use, 0 uses one per core.
+        - use_processes (bool): Whether to compress in a process pool rather than a thread pool.
+        """
 
-    def pack(self, endian:EndianType) -> bytes:
-        fm = FileManipulator(endian=endian)
+        if workers <= 0:
+            workers = os.cpu_count() or 1
+        files = [file for file in self.files if file.needs_compressing()]
+        if len(files) == 0:
+            return
+        executor_type = ProcessPoolExecutor if use_processes == True else ThreadPoolExecutor
+        # a few batches per worker bounds how much data is waiting to be compressed at once
+        batch_size = workers * 4
+        with executor_type(max_workers=workers) as executor:
+            for start in range(0, len(files), batch_size):
+                batch = files[start:start + batch_size]
+                # data is loaded here, lazily loaded files aren't safe to load from several threads
+                datas = [file.data for file in batch]
+                if self.compression_cache != None:
+                    keys = [CompressionCache.get_key(data, file.compression_level) for file, data in zip(batch, datas)]
+                    missed = []
+                    for file, data, key in zip(batch, datas, keys):
+                        file.compressed_data = self.compression_cache.get(key)
+                        if file.compressed_data == None:
+                            missed.append((file, data, key))
+                    if len(missed) == 0:
+                        continue
+                    batch, datas, keys = [list(values) for values in zip(*missed)]
+                if use_processes == True:
+                    # memoryviews can't be sent to another process
+                    datas = [bytes(data) for data in datas]
+                levels = [file.compression_level for file in batch]
+                # results come back in order, so the output is the same as compressing one by one
+                for file, compressed_data in zip(batch, executor.map(zlib.compress, datas, levels)):
+                    file.compressed_data = compressed_data
+                if self.compression_cache != None:
+                    for file, key in zip(batch, keys):
+                        self.compression_cache.put(key, file.compressed_data)
+
+    def pack(self, endian:EndianType, workers:int = 1, use_processes:bool = False) -> bytes:
 
-        if endian == EndianType.LITTLE:
-            fm.w_str(self.magic)
-        else:
-            fm.w_str(self.magic[::-1])
+        """
+        Packs the packfile.
+
+        Args:
+        - endian (EndianType): The endian to pack in.
+        - workers (int): The amount of threads or processes compressing files, 1 compresses them one by one and 0 uses one per core.
+        - use_processes (bool): Whether to compress in a process pool rather than a thread pool.
+
+        Returns:
+        - The packed packfile.
+        """
+
+        if workers != 1:
+            self.compress_files(workers=workers, use_processes=use_processes)
+
+        path_partition, path_pointers = self.pack_path_partition()
+
+        # compress every file once, the sizes and the data both need it
+        compressed_datas = []
+        toc_entries = []
+
+        # loop through all the files
+        for file, (folder_pointer, file_pointer) in zip(self.files, path_pointers):
+            compressed_data = file.get_compressed_data(compression_cache=self.compression_cache)
+            compressed_datas.append(compressed_data)
+            toc_entries.append(Packfile.get_toc_entry(file, len(compressed_data), folder_pointer, file_pointer))
+
+        bb = self.pack_header_to(BinaryBuilder(endian=endian), toc_entries, path_partition)
+
+        for compressed_data in compressed_datas:
+            bb.write(compressed_data)
+            bb.align(32)
         
-        # version
-        fm.w_u32(self.version)
+        # return the binary data
+        return bb.getvalue()
 
-        # header zero
-        fm.w_u32(0)
+    def pack_path_partition(self) -> tuple[bytes, list[tuple[int, int]]]:
 
-        # header size
-        header_size = 32
-        fm.w_u32(header_size)
+        """
+        Packs the folder and file names, every name is only written once.
+
+        Returns:
+        - The path partition, and the folder name pointer and file name pointer of every file.
+        """
 
-        path_partition = b""
+        path_partition = BinaryBuilder()
 
         filename_pointers = {}
         folder_pointers = {}
+        path_pointers = []
 
         for file in self.files:
             foldername, filename  = file.get_split_path()
             # if foldername is not in folder pointers, add it to the path partition and the folder pointers
             if foldername not in folder_pointers:
-                folder_pointers[foldername] = len(path_partition)
-                path_partition += foldername.encode("utf-8")
-                path_partition += b"\0"
+                folder_pointers[foldername] = path_partition.tell()
+                path_partition.w_str_null(foldername)
             # if filename is not in filename pointers, add it to the path partition and the filename pointers
             if filename not in filename_pointers:
-                filename_pointers[filename] = len(path_partition)
-                path_partition += filename.encode("utf-8")
-                path_partition += b"\0"
-        # header data pointer
-        data_pointer = header_size + len(path_partition) + (len(self.files) * 24) + 4
-        while data_pointer % 32 != 0:
-            data_pointer += 1
-        fm.w_u32(data_pointer - header_size)
-        
-        # go to the header size
-        fm.seek(header_size)
+                filename_pointers[filename] = path_partition.tell()
+                path_partition.w_str_null(filename)
+            path_pointers.append((folder_pointers[foldername], filename_pointers[filename]))
 
-        # number of files
-        fm.w_u32(len(self.files))
+        return path_partition.getvalue(), path_pointers
 
-        # loop through all the files
-        for file in self.files:
-            # get the folder pointer
-            foldername, filename = file.get_split_path()
-            folder_pointer = folder_pointers[foldername]
-            file_pointer = filename_pointers[filename]
-            # write the header values
-            fm.w_u32(file.get_real_data_size())
-            fm.w_u32(file.get_compressed_data_size())
-            fm.w_u32(file.get_aligned_data_size())
-            fm.w_u32(folder_pointer)
-            fm.write(file.type.pack(fm.endian))
-            fm.w_u32(file_pointer)
-        
-        # write the path partition
-        fm.write(path_partition)
+    @staticmethod
+    def get_toc_entry(file:VirtualFile, compressed_size:int, folder_pointer:int, file_pointer:int) -> tuple:
+        # real file size, compressed file size, aligned file size, folder pointer, type, file pointer
+        return (
+            file.get_real_data_size(),
+            compressed_size,
+            (compressed_size + 31) & ~31,
+            folder_pointer,
+            file.type.to_u32(),
+            file_pointer
+        )
+
+    def pack_header_to(self, bb:BinaryBuilder, toc_entries:list[tuple], path_partition:bytes) -> BinaryBuilder:
 
-        # go to the header data pointer
-        fm.seek(data_pointer)
+        """
+        Writes everything that comes before the file data.
 
-        for file in self.files:
-            fm.write(file.get_assembled_data())
-        
-        # return the binary data
-        return fm.getbuffer()
-    
-    def get_file_from_offset(self, offset:int) -> VirtualFile:
-        fm = FileManipulator()
+        Args:
+        - bb (BinaryBuilder): Where to write the header.
+        - toc_entries (list[tuple]): The table of contents entry of every file.
+        - path_partition (bytes): The packed folder and file names.
+        """
 
-        if self.endian == EndianType.LITTLE:
-            fm.w_str(self.magic)
+        if bb.endian == EndianType.LITTLE:
+            bb.w_str(self.magic)
         else:
-            fm.w_str(self.magic[::-1])
+            bb.w_str(self.magic[::-1])
         
         # version
-        fm.w_u32(self.version)
+        bb.w_u32(self.version)
 
         # header zero
-        fm.w_u32(0)
+        bb.w_u32(0)
 
         # header size
         header_size = 32
-        fm.w_u32(header_size)
+        bb.w_u32(header_size)
 
-        path_partition = b""
+        # header data pointer, relative to the header size
+        bb.w_offset("data", adjust=-header_size)
 
-        filename_pointers = {}
-        folder_pointers = {}
+        bb.pad_to(header_size)
 
-        for file in self.files:
-            foldername, filename  = file.get_split_path()
-            # if foldername is not in folder pointers, add it to the path partition and the folder pointers
-            if foldername not in folder_pointers:
-                folder_pointers[foldername] = len(path_partition)
-                path_partition += foldername.encode("utf-8")
-                path_partition += b"\0"
-            # if filename is not in filename pointers, add it to the path partition and the filename pointers
-            if filename not in filename_pointers:
-                filename_pointers[filename] = len(path_partition)
-                path_partition += filename.encode("utf-8")
-                path_partition += b"\0"
-        # header data pointer
-        data_pointer = header_size + len(path_partition) + (len(self.files) * 24)
-        while data_pointer % 32 != 0:
-            data_pointer += 1
-        fm.w_u32(data_pointer - header_size)
+        # number of files
+        bb.w_u32(len(toc_entries))
+
+        # write the header values
+        TOC_ENTRY.pack_table(bb, toc_entries)
         
-        # go to the header size
-        fm.seek(header_size)
+        # write the path partition
+        bb.write(path_partition)
 
-        # number of files
-        fm.w_u32(len(self.files))
+        # the data starts at the next 32 byte boundary
+        bb.align(32)
+        bb.label("data")
+        return bb
 
-        # loop through all the files
-        for file in self.files:
-            # get the folder pointer
-            foldername, filename = file.get_split_path()
-            folder_pointer = folder_pointers[foldername]
-            file_pointer = filename_pointers[filename]
-            # write the header values
-            fm.w_u32(file.get_real_data_size())
-            fm.w_u32(file.get_compressed_data_size())
-            fm.w_u32(file.get_aligned_data_size())
-            fm.w_u32(folder_pointer)
-            fm.write(file.type.pack(fm.endian))
-            fm.w_u32(file_pointer)
+    def write_to(self, f, endian:EndianType, progress:callable = None) -> list[tuple[int, int]]:
 
-        # write the path partition
-        fm.write(path_partition)
+        """
+        Packs the packfile straight into a file, one file's data at a time.
 
-        # go to the header data pointer
-        fm.seek(data_pointer)
+        The table of contents is written as zeros first and filled in once
+        every file's compressed size is known, so only one file's compressed
+        data is held at a time.
 
-        for file in self.files:
-            start_offset = fm.tell()
-            fm.write(file.get_assembled_data())
-            end_offset = fm.tell()
-            if start_offset <= offset and end_offset >= offset:
-                return file
-        return None
+        Args:
+        - f: A seekable binary file, at the position the packfile starts.
+        - endian (EndianType): The endian to pack in.
+        - progress (callable): Called with (files written, total files, file) after each file.
+
+        Returns:
+        - The offset, relative to the start of the packfile, and the compressed size of every file's data.
+        """
+
+        start = f.tell()
+        path_partition, path_pointers = self.pack_path_partition()
+        total = len(self.files)
+        # same size as the real header, the sizes aren't known yet
+        f.write(self.pack_header_to(BinaryBuilder(endian=endian), [(0, 0, 0, 0, 0, 0)] * total, path_partition).getvalue())
+
+        toc_entries = []
+        stored_at = []
+        for i, (file, (folder_pointer, file_pointer)) in enumerate(zip(self.files, path_pointers)):
+            compressed_data = file.get_compressed_data(keep=False, compression_cache=self.compression_cache)
+            stored_at.append((f.tell() - start, len(compressed_data)))
+            f.write(compressed_data)
+            f.write(bytes(-len(compressed_data) % 32))
+            toc_entries.append(Packfile.get_toc_entry(file, len(compressed_data), folder_pointer, file_pointer))
+            if progress != None:
+                progress(i + 1, total, file)
+
+        end = f.tell()
+        f.seek(start)
+        f.write(self.pack_header_to(BinaryBuilder(endian=endian), toc_entries, path_partition).getvalue())
+        f.seek(end)
+        return stored_at
+
+    def save_in_place(self, endian:EndianType) -> bool:
+
+        """
+        Saves changes into the packfile on disk that this was read from or last saved to.
+
+        Data of unchanged files stays where it is. Only the header, changed
+        files and the unchanged files after them whose position changed are
+        written, unchanged files are moved on disk without compressing them.
+        This isn't atomic, an interrupted save leaves a broken packfile.
+
+        Args:
+        - endian (EndianType): The endian to save in.
+
+        Returns:
+        - Whether it was saved. False means nothing was written, because the file on disk changed since, is memory-mapped, has another endian, or unchanged files were reordered.
+        """
+
+        layout = self.layout
+        if layout == None or layout.mapped == True or layout.endian != endian or not layout.matches_disk():
+            return False
+
+        path_partition, path_pointers = self.pack_path_partition()
+        data_offset = len(self.pack_header_to(BinaryBuilder(endian=endian), [(0, 0, 0, 0, 0, 0)] * len(self.files), path_partition).getvalue())
+
+        toc_entries = []
+        new_stored_at = []
+        # (old offset, new offset, aligned size) of unchanged data that has to move
+        moves = []
+        # (new offset, compressed data) of changed files
+        writes = []
+        last_stored_offset = -1
+        for file, (folder_pointer, file_pointer) in zip(self.files, path_pointers):
+            if file.stored_at != None and file.stored_at[0] is layout:
+                _, stored_offset, compressed_size = file.stored_at
+                # moving data in place only works if unchanged files kept their order
+                if stored_offset <= last_stored_offset:
+                    return False
+                last_stored_offset = stored_offset
+                if stored_offset != data_offset:
+                    moves.append((stored_offset, data_offset, (compressed_size + 31) & ~31))
+            else:
+                compressed_data = file.get_compressed_data(compression_cache=self.compression_cache)
+                compressed_size = len(compressed_data)
+                writes.append((data_offset, compressed_data))
+            toc_entries.append(Packfile.get_toc_entry(file, compressed_size, folder_pointer, file_pointer))
+            new_stored_at.append((data_offset, compressed_size))
+            data_offset += (compressed_size + 31) & ~31
+
+        header = self.pack_header_to(BinaryBuilder(endian=endian), toc_entries, path_partition).getvalue()
+        with open(layout.path, "r+b") as f:
+            # data moving forward is moved last to first and data moving back first to last, so no data
+            # is overwritten before it's moved. the header and changed files only go where nothing is left to move
+            for old_offset, new_offset, size in reversed([move for move in moves if move[1] > move[0]]):
+                move_region(f, old_offset, new_offset, size)
+            for old_offset, new_offset, size in [move for move in moves if move[1] < move[0]]:
+                move_region(f, old_offset, new_offset, size)
+            for new_offset, compressed_data in writes:
+                f.seek(new_offset)
+                f.write(compressed_data)
+                f.write(bytes(-len(compressed_data) % 32))
+            f.seek(0)
+            f.write(header)
+            f.truncate(data_offset)
+
+        for file, (offset, compressed_size) in zip(self.files, new_stored_at):
+            file.stored_at = (layout, offset, compressed_size)
+        layout.update_stat()
+        return True
+    
+    def get_offset_index(self) -> "OffsetIndex":
+        # rebuilt when the files changed since it was last built
+        if self.offset_index == None or self.offset_index.file_list is not self.files or self.offset_index.version != self.files.version:
+            self.offset_index = OffsetIndex(self)
+        return self.offset_index
+
+    def get_file_from_offset(self, offset:int) -> VirtualFile:
+
+        """
+        Gets the file whose data covers an offset in the packed packfile.
+
+        Args:
+        - offset (int): The offset in the packed packfile.
+
+        Returns:
+        - The file, or None if the offset is in the header or past the end.
+        """
+
+        return self.get_offset_index().find(offset)
+
+    def get_files_from_offsets(self, offsets:list[int]) -> list[VirtualFile]:
+        return self.get_offset_index().find_all(offsets)
     
     @staticmethod
     def format_path_for_comparison(path:str) -> str:
@@ -377,11 +1384,9 @@ class Packfile:
         return path
     
     def do_operation_on_file(self, path:str, operation:callable) -> None:
-        path = Packfile.format_path_for_comparison(path)
-        for file in self.files:
-            path2 = Packfile.format_path_for_comparison(file.path)
-            if path == path2:
-                return operation(file)
+        file = self.files.get(path)
+        if file != None:
+            return operation(file)
 
     def remove_file_from_path(self, path:str) -> None:
         def operation(file:VirtualFile) -> None:
@@ -441,20 +1446,107 @@ class Packfile:
             paths.append(file.path)
         return paths
     
-    def get_data_from_end_path(self, end_path:str) -> bytes:
-        end_path = Packfile.format_path_for_comparison(end_path)
-        for file in self.files:
-            path = Packfile.format_path_for_comparison(file.path)
-            if path.endswith(end_path):
-                return file.data
+    def get_data_from_end_path(self, end_path:str, all_matches:bool = False) -> bytes:
+
+        """
+        Gets the data of the file whose path ends with `end_path`.
+
+        Args:
+        - end_path (str): The end of the path, which doesn't have to start at a slash.
+        - all_matches (bool): Whether to return the data of every matching file.
+
+        Returns:
+        - The data of the first matching file in the packfile, or None. A list of
+          the data of every matching file in order if `all_matches` is set.
+        """
+
+        files = self.files.find_by_suffix(end_path)
+        if all_matches == True:
+            return [file.data for file in files]
+        if len(files) > 0:
+            return files[0].data
     
-    def to_binary(self, endian:EndianType=EndianType.BIG) -> bytes:
-        return self.pack(endian=endian)
+    def to_binary(self, endian:EndianType=EndianType.BIG, workers:int=1, use_processes:bool=False) -> bytes:
+        return self.pack(endian=endian, workers=workers, use_processes=use_processes)
     
-    def to_binary_path(self, binary_path:str, endian:EndianType=EndianType.BIG):
-        binary = self.to_binary(endian=endian)
-        with open(binary_path, "wb") as f:
-            f.write(binary)
+    def to_binary_path(self, binary_path:str, endian:EndianType=EndianType.BIG, workers:int=1, use_processes:bool=False, progress:callable=None, incremental:bool=False):
+        # written next to binary_path and renamed over it once it's complete, so a failed save leaves the old file alone
+        if workers != 1:
+            self.compress_files(workers=workers, use_processes=use_processes)
+        # saving over the file this was read from can leave unchanged data where it is instead
+        if incremental == True and self.layout != None and self.layout.path == os.path.abspath(binary_path):
+            if self.save_in_place(endian):
+                return
+        write = lambda f: self.write_to(f, endian, progress=progress)
+        if self.layout != None and self.layout.fm != None and self.layout.path == os.path.abspath(binary_path):
+            self.replace_mapped(write, endian)
+            return
+        stored_at = replace_file(binary_path, write)
+        # the next incremental save can start from the file that was just written
+        self.layout = StoredLayout(endian, binary_path)
+        for file, (offset, compressed_size) in zip(self.files, stored_at):
+            file.stored_at = (self.layout, offset, compressed_size)
+
+    def replace_mapped(self, write:callable, endian:EndianType) -> None:
+
+        """
+        Saves over the memory-mapped packfile that files read their data from.
+
+        Windows can't rename over a file that is still mapped, so once the new
+        file is written the files drop their views of the old one and it's
+        unmapped. Afterwards they read from the new file, mapped the same way,
+        or from the old one again if it couldn't be replaced.
+
+        Args:
+        - write (callable): Called with the open binary file to write into, returns where the data of every file was written.
+        - endian (EndianType): The endian being written.
+        """
+
+        layout = self.layout
+        mapping = layout.fm.mapping
+
+        def in_mapping(data) -> bool:
+            return isinstance(data, memoryview) and data.obj is mapping
+
+        # (file, offset, compressed size, real size) of every file reading from the mapping
+        released = []
+        for file in self.files:
+            if file.source != None and file.source.fm is layout.fm:
+                released.append((file, file.source.offset, file.source.compressed_size, file.source.real_size))
+                continue
+            if in_mapping(file._data) and file.stored_at == None:
+                # stored differently since it was read, there's nothing to read it back from
+                file._data = bytes(file._data)
+            if in_mapping(file._data) or in_mapping(file.compressed_data):
+                _, offset, compressed_size = file.stored_at
+                released.append((file, offset, compressed_size, file.get_real_data_size()))
+
+        def release() -> None:
+            for file, _, _, _ in released:
+                if file.cache != None and file.source != None:
+                    file.cache.remove(file.source)
+                if in_mapping(file._data):
+                    file._data = None
+                file.source = None
+                file.compressed_data = None
+            layout.fm.close()
+
+        try:
+            stored_at = replace_file(layout.path, write, release)
+        except BaseException:
+            if layout.fm.closed:
+                layout.fm = FileManipulator.from_path(layout.path, endian=layout.endian, mapped=True)
+                for file, offset, compressed_size, real_size in released:
+                    file.read_from(PackedData(layout.fm, offset, compressed_size, real_size, file.path))
+            raise
+
+        self.layout = StoredLayout(endian, layout.path, mapped=True)
+        self.layout.fm = FileManipulator.from_path(layout.path, endian=endian, mapped=True)
+        for file, (offset, compressed_size) in zip(self.files, stored_at):
+            file.stored_at = (self.layout, offset, compressed_size)
+        for file, _, _, real_size in released:
+            _, offset, compressed_size = file.stored_at
+            file.read_from(PackedData(self.layout.fm, offset, compressed_size, real_size, file.path))
 
     def to_xml(self, pretty:bool=True) -> str:
         root = ET.Element("Packfile")
@@ -544,7 +1636,7 @@ class Packfile:
             raise Exception("The root tag of the xml must be Packfile")
         packfile = Packfile()
         packfile.version = int(root.get("version"))
-        packfile.magic = EndianDependentString("PAK ")
+        packfile.magic = "PAK "
         for file_element in root:
             file = VirtualFile()
             file.path = file_element.get("path")
@@ -569,13 +1661,15 @@ class Packfile:
         return Packfile.from_xml(xml_string)
     
     @staticmethod
-    def from_xml_stripped(xml_string:str, base_directory:str) -> "Packfile":
+    def from_xml_stripped(xml_string:str, base_directory:str, compression_cache:CompressionCache = None) -> "Packfile":
         root = ET.fromstring(xml_string)
         if root.tag != "PackfileStripped":
             raise Exception("The root tag of the xml must be PackfileStripped")
         packfile = Packfile()
+        # unchanged files built from a project directory are usually compressed the same as last time
+        packfile.compression_cache = compression_cache
         packfile.version = int(root.get("version"))
-        packfile.magic = EndianDependentString(" KAP")
+        packfile.magic = "PAK "
         for file_element in root:
             file = VirtualFile()
             file.path = file_element.get("path")
@@ -634,29 +1728,36 @@ class Packfile:
         return packfile
     
     @staticmethod
-    def from_xml_stripped_path(xml_path:str, base_directory:str) -> "Packfile":
+    def from_xml_stripped_path(xml_path:str, base_directory:str, compression_cache:CompressionCache = None) -> "Packfile":
         xml_string = open(xml_path, "r").read()
-        return Packfile.from_xml_stripped(xml_string, base_directory)
+        return Packfile.from_xml_stripped(xml_string, base_directory, compression_cache=compression_cache)
     
     @staticmethod
-    def from_binary(binary:bytes) -> "Packfile":
+    def from_binary(binary:bytes, lazy:bool = False, cache:LRUCache = None) -> "Packfile":
+        fm = FileManipulator(data=binary)
+        return Packfile.from_file_manipulator(fm, lazy=lazy, cache=cache)
+
+    @staticmethod
+    def from_file_manipulator(fm:FileManipulator, lazy:bool = False, cache:LRUCache = None) -> "Packfile":
 
         # determine the endian type
-        endian = EndianType.BIG
-        if binary[0:4] == b"PAK ":
-            endian = EndianType.LITTLE
+        fm.endian = EndianType.BIG
+        if fm.read(4) == b"PAK ":
+            fm.endian = EndianType.LITTLE
+        fm.seek(0)
 
-        fm = FileManipulator(data=binary, endian=endian)
         packfile = Packfile()
         packfile.files = []
-        packfile.unpack(fm)
+        packfile.unpack(fm, lazy=lazy, cache=cache)
         return packfile
     
     @staticmethod
-    def from_dict_stripped(dictionary, base_directory:str) -> "Packfile":
+    def from_dict_stripped(dictionary, base_directory:str, compression_cache:CompressionCache = None) -> "Packfile":
         packfile = Packfile()
+        # unchanged files built from a project directory are usually compressed the same as last time
+        packfile.compression_cache = compression_cache
         packfile.version = dictionary["version"]
-        packfile.magic = EndianDependentString(" KAP")
+        packfile.magic = "PAK "
         packfile.files = []
         for file_dict in dictionary["files"]:
             file = VirtualFile()
@@ -701,15 +1802,155 @@ class Packfile:
         return packfile
     
     @staticmethod
-    def from_json_stripped(json_str:str, base_directory:str) -> "Packfile":
+    def from_json_stripped(json_str:str, base_directory:str, compression_cache:CompressionCache = None) -> "Packfile":
         dictionary = json.loads(json_str)
-        return Packfile.from_dict_stripped(dictionary, base_directory)
+        return Packfile.from_dict_stripped(dictionary, base_directory, compression_cache=compression_cache)
     
     @staticmethod
-    def from_binary_path(binary_path:str) -> "Packfile":
-        binary = open(binary_path, "rb").read()
-        return Packfile.from_binary(binary)
+    def from_binary_path(binary_path:str, mapped:bool=False, lazy:bool=False, cache:LRUCache=None) -> "Packfile":
+        # mapped packfiles keep uncompressed entries as views into the file on disk, so don't overwrite
+        # binary_path while the packfile is in use other than with to_binary_path, which unmaps it first
+        # lazy packfiles only parse the table of contents, mapped and lazy together reads nothing else up front
+        if mapped == True:
+            fm = FileManipulator.from_path(binary_path, mapped=True)
+            packfile = Packfile.from_file_manipulator(fm, lazy=lazy, cache=cache)
+        else:
+            binary = open(binary_path, "rb").read()
+            packfile = Packfile.from_binary(binary, lazy=lazy, cache=cache)
+        # remembered so changes can be saved back into the same file in place
+        packfile.layout.remember_path(binary_path, mapped)
+        if mapped == True:
+            packfile.layout.fm = fm
+        return packfile
     
+    @staticmethod
+    def merge(packfiles:list["Packfile"]) -> "Packfile":
+
+        """
+        Merges packfiles into one, later packfiles overriding files with the same path.
+
+        A file keeps the position of the first file with its path, with the
+        path and data of the last one. Paths are compared ignoring case, slash
+        direction and a leading slash. The files are copies sharing their
+        data, so files read lazily are still only read when they're packed,
+        and unchanged compressed files are written back without decompressing
+        them.
+
+        Args:
+        - packfiles (list[Packfile]): The packfiles, the first one is the base.
+
+        Returns:
+        - The merged packfile, with the magic and version of the first one.
+        """
+
+        merged = Packfile()
+        if len(packfiles) > 0:
+            merged.magic = packfiles[0].magic
+            merged.version = packfiles[0].version
+        # normalized path -> file, a dict keeps the position a key was first added at when it's replaced
+        files = {}
+        for packfile in packfiles:
+            for file in packfile.files:
+                key = Packfile.format_path_for_comparison(file.path)
+                # a path that is in one packfile more than once counts once, like get()
+                files[key] = packfile.files.get(file.path)
+        merged.files = [file.copy() for file in files.values()]
+        return merged
+
+    @staticmethod
+    def merge_binary_paths(binary_paths:list[str], destination_path:str, endian:EndianType = None, progress:callable = None) -> None:
+
+        """
+        Merges packed packfiles into one on disk, see `merge()`.
+
+        The packfiles are memory-mapped and only their tables of contents are
+        parsed. The stored data of every file is copied as it is, one file at
+        a time, so nothing is decompressed and memory use doesn't grow with
+        the size of the packfiles.
+
+        Args:
+        - binary_paths (list[str]): The packfiles, the first one is the base.
+        - destination_path (str): Where to write the merged packfile, can be one of `binary_paths`.
+        - endian (EndianType): The endian to write in, by default the one of the first packfile.
+        - progress (callable): Called with (files written, total files, file) after each file.
+        """
+
+        fms = []
+
+        def close_sources() -> None:
+            for fm in fms:
+                fm.close()
+
+        try:
+            packfiles = []
+            for binary_path in binary_paths:
+                fm = FileManipulator.from_path(binary_path, mapped=True)
+                fms.append(fm)
+                packfiles.append(Packfile.from_file_manipulator(fm, lazy=True))
+            merged = Packfile.merge(packfiles)
+            if endian == None:
+                endian = packfiles[0].layout.endian if len(packfiles) > 0 else EndianType.BIG
+            # the sources are unmapped before the merged file is renamed into place, which may be over one of them
+            replace_file(destination_path, lambda f: merged.write_to(f, endian, progress=progress), close_sources)
+        finally:
+            close_sources()
+
+    @staticmethod
+    def convert_binary_path(source_path:str, destination_path:str, endian:EndianType = None, chunk_size:int = 0x100000) -> EndianType:
+
+        """
+        Converts a packed packfile to another endian without unpacking it.
+
+        Only the header and the table of contents change, the path partition
+        and the data of every file are copied as they are, so nothing is
+        decompressed or compressed again. Converting a file onto itself only
+        rewrites the header and the table of contents, but isn't atomic.
+
+        Args:
+        - source_path (str): The packfile to convert.
+        - destination_path (str): Where to write the converted packfile, can be `source_path`.
+        - endian (EndianType): The endian to convert to, by default the other one. A packfile that is already in it is copied as it is.
+        - chunk_size (int): How much data is copied at a time.
+
+        Returns:
+        - The endian the packfile was in.
+        """
+
+        with open(source_path, "rb") as f:
+            source_endian = EndianType.LITTLE if f.read(4) == b"PAK " else EndianType.BIG
+            f.seek(0)
+            fm = FileManipulator(data=f.read(0x20), endian=source_endian)
+            # header size, then the number of files right after the header
+            fm.seek(12)
+            header_size = fm.r_u32()
+            f.seek(header_size)
+            num_files = FileManipulator(data=f.read(4), endian=source_endian).r_u32()
+            header_end = header_size + 4 + num_files * TOC_ENTRY.size
+            if header_end > os.fstat(f.fileno()).st_size:
+                raise ParseError("Table of contents is past the end of the file", header_size)
+            f.seek(0)
+            header = f.read(header_end)
+        if endian == None:
+            endian = EndianType.LITTLE if source_endian == EndianType.BIG else EndianType.BIG
+        converted = header
+        if endian != source_endian:
+            converted = convert_header(header, source_endian)
+
+        if os.path.abspath(source_path) == os.path.abspath(destination_path):
+            if converted != header:
+                with open(destination_path, "r+b") as f:
+                    f.write(converted)
+            return source_endian
+
+        def write(f) -> None:
+            f.write(converted)
+            with open(source_path, "rb") as source:
+                source.seek(header_end)
+                shutil.copyfileobj(source, f, chunk_size)
+
+        replace_file(destination_path, write)
+        return source_endian
+
     @staticmethod
     def determine_compress_from_path(path:str) -> bool:
         path = path.lower()
@@ -743,7 +1984,7 @@ class Packfile:
     
     @staticmethod
     def from_file_list(file_list:list[str], base_directory:str) -> "Packfile":
-        packfile = Packfile(magic=EndianDependentString(" KAP"))
+        packfile = Packfile(magic="PAK ")
         packfile.files = []
         for file in file_list:
             virtual_file = VirtualFile()
@@ -782,28 +2023,20 @@ class Packfile:
             texture_paths = []
             # search for every occurence of "_tex.nif_wii" in the nif file
             indexes = []
-            with open(absolute_nif_path, "rb") as f:
-                data = f.read()
-                index = 0
-                while True:
-                    index = data.find(b"_tex.nif", index)
-                    if index == -1:
-                        break
-                    indexes.append(index)
-                    index += 1
             fm = FileManipulator.from_path(absolute_nif_path, endian=EndianType.BIG)
+            index = 0
+            while True:
+                index = fm.find(b"_tex.nif", index)
+                if index == -1:
+                    break
+                indexes.append(index)
+                index += 1
             for index in indexes:
-                fm.seek(index)
-                # go back until we hit a null byte
-                while True:
-                    fm.seek(-2, 1)
-                    if fm.r_u8() == 0:
-                        break
-                # go back until we hit a non null byte
-                while True:
-                    fm.seek(-2, 1)
-                    if fm.r_u8() != 0:
-                        break
+                # go back to the last null byte, then to the last non null byte before it
+                null_offset = fm.rfind(b"\x00", 0, index)
+                if null_offset == -1:
+                    continue
+                fm.seek(fm.rfind_not(0, null_offset) + 1)
                 # read the u32
                 length = fm.r_u32()
                 # read the string
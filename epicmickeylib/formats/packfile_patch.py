@@ -0,0 +1,315 @@
+# epicmickeylib/formats/packfile_patch.py
+#
+# the differences between two packfiles, for shipping a changed packfile without shipping all of it
+#
+# files are matched by a hash of their stored data, so unchanged, moved and renamed files are copied
+# from the base packfile and only the data of new and changed files is in the patch
+
+import hashlib
+import os
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from epicmickeylib.formats.packfile import Packfile, replace_file
+from epicmickeylib.internal.binary_builder import BinaryBuilder
+from epicmickeylib.internal.file_manipulator import EndianType, FileManipulator, ParseError
+from epicmickeylib.internal.record_schema import RecordSchema
+
+MAGIC = b"PKPT"
+VERSION = 1
+
+PATCH_HEADER = RecordSchema(
+    ("magic", "4s"),
+    ("version", "I"),
+    ("base_size", "I"),
+    ("base_hash", "32s"),
+    ("target_size", "I"),
+    ("target_hash", "32s"),
+    ("prefix_size", "I"),
+    ("num_operations", "I"),
+    ("suffix_size", "I"),
+    # size of the compressed prefix, operations and suffix
+    ("packed_size", "I")
+)
+
+# base index -1 is a region of the target stored in the patch, anything else copies that file's stored data from the base
+PATCH_OPERATION = RecordSchema(("base_index", "i"), ("size", "I"))
+
+def hash_datas(datas:list) -> list[bytes]:
+    return [hashlib.sha256(data).digest() for data in datas]
+
+def hash_all(datas:list, workers:int = 0) -> list[bytes]:
+
+    """
+    Hashes many pieces of data in a thread pool, sha256 doesn't hold the GIL while it hashes.
+
+    Args:
+    - datas (list): The bytes-like data to hash.
+    - workers (int): The amount of threads to use, 0 uses one per core.
+
+    Returns:
+    - The sha256 digest of every piece of data, in order.
+    """
+
+    if workers <= 0:
+        workers = os.cpu_count() or 1
+    if workers == 1 or len(datas) < 2:
+        return hash_datas(datas)
+    # a few batches per worker, one task per file would spend more time scheduling than hashing small files
+    batch_size = max(1, len(datas) // (workers * 4))
+    batches = [datas[start:start + batch_size] for start in range(0, len(datas), batch_size)]
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        return [digest for digests in executor.map(hash_datas, batches) for digest in digests]
+
+class StoredRegions:
+    """
+    Where everything in a packed packfile is, without reading any file's data.
+
+    The prefix is the header, table of contents and path partition up to the
+    first file's data. Every file's region runs from its data up to the next
+    file's data, so it includes the padding after it. The suffix is anything
+    after the last file's padding.
+    """
+
+    fm:FileManipulator
+    size:int
+    prefix_end:int
+    # (offset, stored size, end of the region) of every file, in order
+    regions:list[tuple[int, int, int]]
+    data_end:int
+
+    def __init__(self, fm:FileManipulator) -> "StoredRegions":
+        self.fm = fm
+        self.size = fm.size()
+        packfile = Packfile.from_file_manipulator(fm, lazy=True)
+        self.regions = []
+        sources = [file.source for file in packfile.files]
+        for i, source in enumerate(sources):
+            if i + 1 < len(sources):
+                end = sources[i + 1].offset
+            else:
+                end = min(source.offset + ((source.compressed_size + 31) & ~31), self.size)
+            self.regions.append((source.offset, source.compressed_size, end))
+        if len(self.regions) > 0:
+            self.prefix_end = self.regions[0][0]
+            self.data_end = self.regions[-1][2]
+        else:
+            self.prefix_end = self.size
+            self.data_end = self.size
+
+    def get_stored_data(self, i:int):
+        offset, stored_size, _ = self.regions[i]
+        return self.fm.read_at(offset, stored_size)
+
+    def get_region(self, i:int):
+        offset, _, end = self.regions[i]
+        return self.fm.read_at(offset, end - offset)
+
+    def get_prefix(self):
+        return self.fm.read_at(0, self.prefix_end)
+
+    def get_suffix(self):
+        return self.fm.read_at(self.data_end, self.size - self.data_end)
+
+    def get_prefix_hash(self) -> bytes:
+        return hashlib.sha256(self.get_prefix()).digest()
+
+class PackfilePatch:
+    """
+    The differences between a base packfile and a target packfile.
+
+    Applying the patch to the base rebuilds the target byte for byte. The
+    target's header, table of contents and path partition are stored
+    compressed. Its file data is a list of operations that either copy a
+    file's stored data from the base or take a region stored in the patch.
+
+    Example:
+    ```
+    patch = PackfilePatch.diff("base.pak", "modded.pak")
+    patch.to_binary_path("mod.pkpt")
+    PackfilePatch.from_binary_path("mod.pkpt").apply("base.pak", "modded.pak")
+    ```
+    """
+
+    base_size:int
+    # sha256 of the base's header, table of contents and path partition
+    base_hash:bytes
+    target_size:int
+    # sha256 of the sha256 of every part of the target, see get_target_hash()
+    target_hash:bytes
+    prefix:bytes
+    # (base index, size) of every file of the target, in order
+    operations:list[tuple[int, int]]
+    # the regions of the target that aren't copied from the base, in order
+    literals:list[bytes]
+    suffix:bytes
+
+    def __init__(self) -> "PackfilePatch":
+        self.base_size = 0
+        self.base_hash = bytes(32)
+        self.target_size = 0
+        self.target_hash = bytes(32)
+        self.prefix = b""
+        self.operations = []
+        self.literals = []
+        self.suffix = b""
+
+    @staticmethod
+    def get_target_hash(digests:list[bytes]) -> bytes:
+        # the prefix, every file's data and the suffix are hashed separately, so they can be hashed in parallel
+        return hashlib.sha256(b"".join(digests)).digest()
+
+    @staticmethod
+    def diff(base_path:str, target_path:str, workers:int = 0) -> "PackfilePatch":
+
+        """
+        Compares two packed packfiles.
+
+        Args:
+        - base_path (str): The packfile the patch is applied to.
+        - target_path (str): The packfile applying the patch rebuilds.
+        - workers (int): The amount of threads hashing file data, 0 uses one per core.
+
+        Returns:
+        - The patch.
+        """
+
+        base_fm = FileManipulator.from_path(base_path, mapped=True)
+        target_fm = FileManipulator.from_path(target_path, mapped=True)
+        try:
+            base = StoredRegions(base_fm)
+            target = StoredRegions(target_fm)
+            base_hashes = hash_all([base.get_stored_data(i) for i in range(len(base.regions))], workers)
+            target_hashes = hash_all([target.get_stored_data(i) for i in range(len(target.regions))], workers)
+
+            # hash -> first file in the base with that data
+            base_indices = {}
+            for i, digest in enumerate(base_hashes):
+                base_indices.setdefault(digest, i)
+
+            patch = PackfilePatch()
+            patch.base_size = base.size
+            patch.base_hash = base.get_prefix_hash()
+            patch.target_size = target.size
+            patch.prefix = bytes(target.get_prefix())
+            patch.suffix = bytes(target.get_suffix())
+            digests = [hashlib.sha256(patch.prefix).digest()]
+            for i, (offset, stored_size, end) in enumerate(target.regions):
+                base_index = base_indices.get(target_hashes[i])
+                region = target.get_region(i)
+                # copied data is padded with zeros, anything else is stored as it is
+                padding = region[stored_size:]
+                if base_index != None and len(region) == (stored_size + 31) & ~31 and padding == bytes(len(padding)) and base.get_stored_data(base_index) == target.get_stored_data(i):
+                    patch.operations.append((base_index, stored_size))
+                    digests.append(target_hashes[i])
+                else:
+                    patch.operations.append((-1, len(region)))
+                    patch.literals.append(bytes(region))
+                    digests.append(hashlib.sha256(region).digest())
+                del region, padding
+            digests.append(hashlib.sha256(patch.suffix).digest())
+            patch.target_hash = PackfilePatch.get_target_hash(digests)
+        finally:
+            base_fm.close()
+            target_fm.close()
+        return patch
+
+    def apply(self, base_path:str, destination_path:str) -> None:
+
+        """
+        Rebuilds the target packfile from the base packfile.
+
+        Args:
+        - base_path (str): The packfile the patch was made against.
+        - destination_path (str): Where to write the target, can be `base_path`.
+        """
+
+        base_fm = FileManipulator.from_path(base_path, mapped=True)
+        try:
+            base = StoredRegions(base_fm)
+            if base.size != self.base_size or base.get_prefix_hash() != self.base_hash:
+                raise Exception(f"{base_path} is not the packfile this patch was made for")
+
+            def write(f) -> None:
+                digests = [hashlib.sha256(self.prefix).digest()]
+                f.write(self.prefix)
+                literals = iter(self.literals)
+                for base_index, size in self.operations:
+                    if base_index == -1:
+                        data = next(literals)
+                        f.write(data)
+                    else:
+                        data = base.get_stored_data(base_index)
+                        f.write(data)
+                        f.write(bytes(-len(data) % 32))
+                    digests.append(hashlib.sha256(data).digest())
+                    del data
+                f.write(self.suffix)
+                digests.append(hashlib.sha256(self.suffix).digest())
+                if f.tell() != self.target_size or PackfilePatch.get_target_hash(digests) != self.target_hash:
+                    raise Exception("Patched packfile doesn't match the target, the base or the patch is damaged")
+
+            # the base is unmapped before the target is renamed into place, which may be over it
+            replace_file(destination_path, write, base_fm.close)
+        finally:
+            base_fm.close()
+
+    def get_literal_size(self) -> int:
+        return sum(len(literal) for literal in self.literals)
+
+    def unpack(self, fm:FileManipulator) -> "FileManipulator":
+        (magic, version, self.base_size, self.base_hash, self.target_size, self.target_hash,
+         prefix_size, num_operations, suffix_size, packed_size) = PATCH_HEADER.unpack(fm)
+        if magic != MAGIC:
+            raise ParseError("Not a packfile patch", 0)
+        if version != VERSION:
+            raise ParseError(f"Unknown packfile patch version {version}", 4)
+        packed_offset = fm.tell()
+        try:
+            packed = zlib.decompress(fm.r_bytes(packed_size))
+        except zlib.error as e:
+            raise ParseError(f"Packfile patch is damaged: {e}", packed_offset) from None
+        if len(packed) != prefix_size + num_operations * PATCH_OPERATION.size + suffix_size:
+            raise ParseError("Packfile patch is damaged", packed_offset)
+        packed_fm = FileManipulator(data=packed, endian=EndianType.LITTLE)
+        self.prefix = packed_fm.r_bytes(prefix_size)
+        self.operations = list(PATCH_OPERATION.unpack_table(packed_fm, num_operations))
+        self.suffix = packed_fm.r_bytes(suffix_size)
+        self.literals = [fm.r_bytes(size) for base_index, size in self.operations if base_index == -1]
+        return fm
+
+    def pack_to(self, bb:BinaryBuilder) -> BinaryBuilder:
+        packed = BinaryBuilder(endian=EndianType.LITTLE)
+        packed.write(self.prefix)
+        PATCH_OPERATION.pack_table(packed, self.operations)
+        packed.write(self.suffix)
+        # the literals are mostly compressed file data already, only the header and operations are compressed
+        packed = zlib.compress(packed.getvalue(), 9)
+        PATCH_HEADER.pack_to(bb, MAGIC, VERSION, self.base_size, self.base_hash, self.target_size, self.target_hash,
+                             len(self.prefix), len(self.operations), len(self.suffix), len(packed))
+        bb.write(packed)
+        for literal in self.literals:
+            bb.write(literal)
+        return bb
+
+    def pack(self) -> bytes:
+        return self.pack_to(BinaryBuilder(endian=EndianType.LITTLE)).getvalue()
+
+    def to_binary(self) -> bytes:
+        return self.pack()
+
+    def to_binary_path(self, path:str) -> None:
+        with open(path, "wb") as f:
+            f.write(self.to_binary())
+
+    @staticmethod
+    def from_binary(binary:bytes) -> "PackfilePatch":
+        fm = FileManipulator(data=binary, endian=EndianType.LITTLE)
+        patch = PackfilePatch()
+        patch.unpack(fm)
+        return patch
+
+    @staticmethod
+    def from_binary_path(binary_path:str) -> "PackfilePatch":
+        with open(binary_path, "rb") as f:
+            binary = f.read()
+        return PackfilePatch.from_binary(binary)
@@ -5,7 +5,10 @@
 import json
 import math
 from xml.etree import ElementTree
-from epicmickeylib.internal.file_manipulator import FileManipulator, EndianType
+from epicmickeylib.internal.file_manipulator import FileManipulator, EndianType, ParseError
+from epicmickeylib.internal.binary_builder import BinaryBuilder
+from epicmickeylib.internal.record_schema import RecordSchema
+from epicmickeylib.internal.string_pool import StringPool
 from xml.etree.ElementTree import Element, SubElement, tostring
 from xml.dom import minidom
 
@@ -29,15 +32,15 @@ class Point2:
         self.y = y
     
     def unpack(self, fm:FileManipulator):
-        self.x = fm.r_float()
-        self.y = fm.r_float()
+        self.x, self.y = fm.read_struct(fm.codec.get("2f"))
         return fm
     
     def pack(self, endian:EndianType = EndianType.BIG) -> bytes:
-        fm = FileManipulator(endian=endian)
-        fm.w_float(self.x)
-        fm.w_float(self.y)
-        return fm.getbuffer()
+        return self.pack_to(BinaryBuilder(endian=endian)).getvalue()
+
+    def pack_to(self, bb:BinaryBuilder) -> BinaryBuilder:
+        bb.write_struct(bb.codec.get("2f"), self.x, self.y)
+        return bb
     
     def __str__(self):
         return f"({self.x}, {self.y})"
@@ -89,17 +92,15 @@ class Point3:
         self.z = z
     
     def unpack(self, fm:FileManipulator):
-        self.x = fm.r_float()
-        self.y = fm.r_float()
-        self.z = fm.r_float()
+        self.x, self.y, self.z = fm.read_struct(fm.codec.get("3f"))
         return fm
     
     def pack(self, endian:EndianType = EndianType.BIG) -> bytes:
-        fm = FileManipulator(endian=endian)
-        fm.w_float(self.x)
-        fm.w_float(self.y)
-        fm.w_float(self.z)
-        return fm.getbuffer()
+        return self.pack_to(BinaryBuilder(endian=endian)).getvalue()
+
+    def pack_to(self, bb:BinaryBuilder) -> BinaryBuilder:
+        bb.write_struct(bb.codec.get("3f"), self.x, self.y, self.z)
+        return bb
     
     def __str__(self):
         return f"({self.x}, {self.y}, {self.z})"
@@ -161,29 +162,19 @@ class Matrix3:
         self.m22 = m22
     
     def unpack(self, fm:FileManipulator):
-        self.m00 = fm.r_float()
-        self.m01 = fm.r_float()
-        self.m02 = fm.r_float()
-        self.m10 = fm.r_float()
-        self.m11 = fm.r_float()
-        self.m12 = fm.r_float()
-        self.m20 = fm.r_float()
-        self.m21 = fm.r_float()
-        self.m22 = fm.r_float()
+        (
+            self.m00, self.m01, self.m02,
+            self.m10, self.m11, self.m12,
+            self.m20, self.m21, self.m22
+        ) = fm.read_struct(fm.codec.get("9f"))
         return fm
     
     def pack(self, endian:EndianType = EndianType.BIG) -> bytes:
-        fm = FileManipulator(endian=endian)
-        fm.w_float(self.m00)
-        fm.w_float(self.m01)
-        fm.w_float(self.m02)
-        fm.w_float(self.m10)
-        fm.w_float(self.m11)
-        fm.w_float(self.m12)
-        fm.w_float(self.m20)
-        fm.w_float(self.m21)
-        fm.w_float(self.m22)
-        return fm.getbuffer()
+        return self.pack_to(BinaryBuilder(endian=endian)).getvalue()
+
+    def pack_to(self, bb:BinaryBuilder) -> BinaryBuilder:
+        bb.write_struct(bb.codec.get("9f"), *self.to_tuple())
+        return bb
     
     def __str__(self):
         return f"({self.m00}, {self.m01}, {self.m02}, {self.m10}, {self.m11}, {self.m12}, {self.m20}, {self.m21}, {self.m22})"
@@ -301,17 +292,15 @@ class ColorRGB:
         self.b = b
     
     def unpack(self, fm:FileManipulator):
-        self.r = fm.r_float()
-        self.g = fm.r_float()
-        self.b = fm.r_float()
+        self.r, self.g, self.b = fm.read_struct(fm.codec.get("3f"))
         return fm
     
     def pack(self, endian:EndianType = EndianType.BIG) -> bytes:
-        fm = FileManipulator(endian=endian)
-        fm.w_float(self.r)
-        fm.w_float(self.g)
-        fm.w_float(self.b)
-        return fm.getbuffer()
+        return self.pack_to(BinaryBuilder(endian=endian)).getvalue()
+
+    def pack_to(self, bb:BinaryBuilder) -> BinaryBuilder:
+        bb.write_struct(bb.codec.get("3f"), self.r, self.g, self.b)
+        return bb
     
     def __str__(self):
         return f"({self.r}, {self.g}, {self.b})"
@@ -387,19 +376,15 @@ class ColorRGBA:
         self.a = a
     
     def unpack(self, fm:FileManipulator):
-        self.r = fm.r_float()
-        self.g = fm.r_float()
-        self.b = fm.r_float()
-        self.a = fm.r_float()
+        self.r, self.g, self.b, self.a = fm.read_struct(fm.codec.get("4f"))
         return fm
     
     def pack(self, endian:EndianType = EndianType.BIG) -> bytes:
-        fm = FileManipulator(endian=endian)
-        fm.w_float(self.r)
-        fm.w_float(self.g)
-        fm.w_float(self.b)
-        fm.w_float(self.a)
-        return fm.getbuffer()
+        return self.pack_to(BinaryBuilder(endian=endian)).getvalue()
+
+    def pack_to(self, bb:BinaryBuilder) -> BinaryBuilder:
+        bb.write_struct(bb.codec.get("4f"), self.r, self.g, self.b, self.a)
+        return bb
     
     def __str__(self):
         return f"({self.r}, {self.g}, {self.b}, {self.a})"
@@ -564,9 +549,11 @@ class EntityPointer:
         return fm
     
     def pack(self, endian:EndianType = EndianType.BIG) -> bytes:
-        fm = FileManipulator(endian=endian)
-        fm.w_u32(self.ref_link_id.num)
-        return fm.getbuffer()
+        return self.pack_to(BinaryBuilder(endian=endian)).getvalue()
+
+    def pack_to(self, bb:BinaryBuilder) -> BinaryBuilder:
+        bb.w_u32(self.ref_link_id.num)
+        return bb
     
     def __str__(self):
         return f"{self.ref_link_id}"
@@ -580,6 +567,36 @@ class EntityPointer:
     def __hash__(self):
         return hash(self.ref_link_id)
 
+# property classes whose list values are read as one flat array:
+# class name -> (data type, values per item, function building an item)
+BULK_LIST_CLASSES = {
+    "Entity Pointer": ("I", 1, lambda num: EntityPointer(ID.from_int(num))),
+    "Color (RGB)": ("f", 3, ColorRGB),
+    "Color (RGBA)": ("f", 4, ColorRGBA),
+    "Point2": ("f", 2, Point2),
+    "Point3": ("f", 3, Point3),
+    "Matrix3": ("f", 9, Matrix3),
+    "Boolean": ("I", 1, lambda num: num == 0xFFFFFFFF),
+    "Integer": ("i", 1, None),
+    "Unsigned Integer": ("I", 1, None),
+    "Float": ("f", 1, None)
+}
+
+# the fixed part of a property and a component, read as one record each
+PROPERTY_HEADER = RecordSchema(
+    ("name_pointer", "I"),
+    ("class_name_pointer", "I"),
+    ("data_type", "I"),
+    ("amount", "I")
+)
+COMPONENT_HEADER = RecordSchema(
+    ("class_name_pointer", "I"),
+    ("template_id_pointer", "I"),
+    ("link_id", "I"),
+    ("master_link_id", "I"),
+    ("amount", "I")
+)
+
 class Property:
     class_name:str
     name:str
@@ -682,7 +699,7 @@ class Property:
             json_data["value"] = self.get_json_for_value(self.class_name, self.value)
         return json_data
     
-    def unpack_value(self, fm:FileManipulator, version:int = SceneFileVersion.VERSION_1):
+    def unpack_value(self, fm:FileManipulator, version:int = SceneFileVersion.VERSION_1, strings:StringPool = None):
         value = None
         if self.class_name == "Entity Pointer":
             value = EntityPointer()
@@ -714,10 +731,9 @@ class Property:
             pointer = fm.r_u32()
             if version == SceneFileVersion.VERSION_2 or version == SceneFileVersion.VERSION_2_PROTOTYPE:
                 pointer += 4
-            pos = fm.tell()
-            fm.seek(pointer)
-            value = fm.r_str_jps()
-            fm.seek(pos)
+            if strings == None:
+                strings = StringPool(fm)
+            value = strings.r_str_jps(pointer)
         elif self.class_name == "Short":
             value = fm.r_s16()
             fm.move(2)
@@ -725,67 +741,58 @@ class Property:
             value = fm.r_u16()
             fm.move(2)
         else:
-            raise Exception(f"Unknown data type: {self.class_name}")
+            raise ParseError(f"Unknown data type: {self.class_name}", fm.tell())
 
         return fm, value
 
     def pack_value(self, value, strings_offsets:dict, endian:EndianType = EndianType.BIG) -> bytes:
-        fm = FileManipulator(endian=endian)
+        return self.pack_value_to(BinaryBuilder(endian=endian), value, strings_offsets).getvalue()
+
+    def pack_value_to(self, bb:BinaryBuilder, value, strings_offsets:dict) -> BinaryBuilder:
         if self.class_name == "Entity Pointer":
-            fm.write(value.pack(endian=endian))
+            value.pack_to(bb)
         elif self.class_name == "Color (RGB)":
-            fm.write(value.pack(endian=endian))
+            value.pack_to(bb)
         elif self.class_name == "Color (RGBA)":
-            fm.write(value.pack(endian=endian))
+            value.pack_to(bb)
         elif self.class_name == "Point2":
-            fm.write(value.pack(endian=endian))
+            value.pack_to(bb)
         elif self.class_name == "Point3":
-            fm.write(value.pack(endian=endian))
+            value.pack_to(bb)
         elif self.class_name == "Matrix3":
-            fm.write(value.pack(endian=endian))
+            value.pack_to(bb)
         elif self.class_name == "Boolean":
-            fm.w_bool(value)
+            bb.w_bool(value)
         elif self.class_name == "Integer":
-            fm.w_s32(value)
+            bb.w_s32(value)
         elif self.class_name == "Unsigned Integer":
-            fm.w_u32(value)
+            bb.w_u32(value)
         elif self.class_name == "Float":
-            fm.w_float(value)
+            bb.w_float(value)
         elif self.class_name == "String":
             pointer = strings_offsets[value]
-            fm.w_u32(pointer)
+            bb.w_u32(pointer)
         elif self.class_name == "Short":
-            fm.w_s16(value)
-            fm.write(b"\xCD\xCD")
+            bb.w_s16(value)
+            bb.write(b"\xCD\xCD")
         elif self.class_name == "Unsigned Short":
-            fm.w_u16(value)
-            fm.write(b"\xCD\xCD")
+            bb.w_u16(value)
+            bb.write(b"\xCD\xCD")
         else:
             raise Exception(f"Unknown data type: {self.class_name}")
         
-        return fm.getbuffer()
+        return bb
     
-    def unpack(self, fm:FileManipulator, version:int = SceneFileVersion.VERSION_1):
-        # read the class name
-        name_pointer = fm.r_u32()
-        class_name_pointer = fm.r_u32()
+    def unpack(self, fm:FileManipulator, version:int = SceneFileVersion.VERSION_1, strings:StringPool = None):
+        if strings == None:
+            strings = StringPool(fm)
+        name_pointer, class_name_pointer, data_type, amount = PROPERTY_HEADER.unpack(fm)
         if version == SceneFileVersion.VERSION_2 or version == SceneFileVersion.VERSION_2_PROTOTYPE:
             name_pointer += 4
             class_name_pointer += 4
 
-        pos = fm.tell()
-
-        
-        fm.seek(name_pointer)
-        self.name = fm.r_str_jps()
-
-        fm.seek(class_name_pointer)
-        self.class_name = fm.r_str_jps()
-
-
-        fm.seek(pos)
-        
-        data_type = fm.r_u32()
+        self.name = strings.r_str_jps(name_pointer)
+        self.class_name = strings.r_str_jps(class_name_pointer)
 
         list_mode = False
 
@@ -801,19 +808,29 @@ class Property:
         elif data_type == 5:
             self.template = True
             list_mode = True
-        
-        amount = fm.r_u32()
 
         if amount == 0 and list_mode:
             self.value = []
             return fm
         
         values = []
-        for _ in range(amount):
-            fm, value = self.unpack_value(fm, version=version)
-            values.append(value)
+        if list_mode and self.class_name in BULK_LIST_CLASSES:
+            data_type, width, build = BULK_LIST_CLASSES[self.class_name]
+            flat = fm.read_array(data_type, amount * width)
+            if build == None:
+                values = flat.tolist()
+            elif width == 1:
+                values = [build(v) for v in flat]
+            else:
+                values = [build(*flat[i:i + width]) for i in range(0, len(flat), width)]
+        else:
+            for _ in range(amount):
+                fm, value = self.unpack_value(fm, version=version, strings=strings)
+                values.append(value)
 
         if not list_mode:
+            if amount == 0:
+                raise ParseError(f"Property {self.name} has no value", fm.tell())
             self.value = values[0]
         else:
             self.value = values
@@ -821,12 +838,13 @@ class Property:
         return fm
     
     def pack(self, strings_offsets:dict, endian:EndianType = EndianType.BIG) -> bytes:
-        fm = FileManipulator(endian=endian)
-        
+        return self.pack_to(BinaryBuilder(endian=endian), strings_offsets).getvalue()
+
+    def pack_to(self, bb:BinaryBuilder, strings_offsets:dict) -> BinaryBuilder:
         # write the name
-        fm.w_u32(strings_offsets[self.name])
+        bb.w_u32(strings_offsets[self.name])
         # write the class name
-        fm.w_u32(strings_offsets[self.class_name])
+        bb.w_u32(strings_offsets[self.class_name])
         # write the data type
         data_type = 0
         # if its a list but not an asset, set the data type to 1
@@ -842,19 +860,24 @@ class Property:
             data_type = 4
         elif self.template:
             data_type = 5
-        fm.w_u32(data_type)
+        bb.w_u32(data_type)
         # write the amount of values
         amount = 1
         if isinstance(self.value, list):
             amount = len(self.value)
-        fm.w_u32(amount)
+        bb.w_u32(amount)
         # write the values
         if isinstance(self.value, list):
-            for v in self.value:
-                fm.write(self.pack_value(v, strings_offsets, endian=endian))
+            bulk = BULK_LIST_CLASSES.get(self.class_name)
+            if bulk != None and bulk[2] == None:
+                # plain numbers can be written as one array
+                bb.w_array(bulk[0], self.value)
+            else:
+                for v in self.value:
+                    self.pack_value_to(bb, v, strings_offsets)
         else:
-            fm.write(self.pack_value(self.value, strings_offsets, endian=endian))
-        return fm.getbuffer()
+            self.pack_value_to(bb, self.value, strings_offsets)
+        return bb
     
     @staticmethod
     def from_xml(xml:str):
@@ -994,52 +1017,53 @@ class Component:
         self.master_link_id = master_link_id
         self.properties = properties
     
-    def unpack(self, fm:FileManipulator, version:int = SceneFileVersion.VERSION_1):
-        class_name_pointer = fm.r_u32()
-        template_id_pointer = fm.r_u32()
+    def unpack(self, fm:FileManipulator, version:int = SceneFileVersion.VERSION_1, strings:StringPool = None):
+        if strings == None:
+            strings = StringPool(fm)
+        class_name_pointer, template_id_pointer, link_id, master_link_id, amount = COMPONENT_HEADER.unpack(fm)
         if version == SceneFileVersion.VERSION_2 or version == SceneFileVersion.VERSION_2_PROTOTYPE:
             class_name_pointer += 4
             template_id_pointer += 4
-        pos = fm.tell()
-        fm.seek(class_name_pointer)
-        self.class_name = fm.r_str_jps()
-        fm.seek(template_id_pointer)
-        template_id = fm.r_str_jps()
-        self.template_id = ID.from_str(template_id)
-        fm.seek(pos)
-        self.link_id = ID.from_int(fm.r_u32())
-        self.master_link_id = ID.from_int(fm.r_u32())
+        self.class_name = strings.r_str_jps(class_name_pointer)
+        template_id = strings.r_str_jps(template_id_pointer)
+        try:
+            self.template_id = ID.from_str(template_id)
+        except Exception as e:
+            raise ParseError(f"Invalid template id {template_id!r}: {e}", template_id_pointer) from None
+        self.link_id = ID.from_int(link_id)
+        self.master_link_id = ID.from_int(master_link_id)
         # if master link id is 0, set it to None
         if self.master_link_id.num == 0:
             self.master_link_id = None
-        amount = fm.r_u32()
         self.properties = []
         for _ in range(amount):
             property = Property()
-            property.unpack(fm, version=version)
+            property.unpack(fm, version=version, strings=strings)
             self.properties.append(property)
         self.fill_name_from_class_name()
         return fm
     
     def pack(self, strings_offsets:dict, endian:EndianType = EndianType.BIG) -> bytes:
-        fm = FileManipulator(endian=endian)
+        return self.pack_to(BinaryBuilder(endian=endian), strings_offsets).getvalue()
+
+    def pack_to(self, bb:BinaryBuilder, strings_offsets:dict) -> BinaryBuilder:
         # write the class name
-        fm.w_u32(strings_offsets[self.class_name])
+        bb.w_u32(strings_offsets[self.class_name])
         # write the template id
-        fm.w_u32(strings_offsets[self.template_id.to_str(fill=False)])
+        bb.w_u32(strings_offsets[self.template_id.to_str(fill=False)])
         # write the link id
-        fm.w_u32(self.link_id.num)
+        bb.w_u32(self.link_id.num)
         # write the master link id
         if self.master_link_id == None:
-            fm.w_u32(0)
+            bb.w_u32(0)
         else:
-            fm.w_u32(self.master_link_id.num)
+            bb.w_u32(self.master_link_id.num)
         # write the amount of properties
-        fm.w_u32(len(self.properties))
+        bb.w_u32(len(self.properties))
         # write the properties
         for p in self.properties:
-            fm.write(p.pack(strings_offsets, endian=endian))
-        return fm.getbuffer()
+            p.pack_to(bb, strings_offsets)
+        return bb
     
     def fill_name_from_class_name(self):
         mapping = {
@@ -1150,14 +1174,13 @@ class Entity:
     def fill_class_name(self):
         self.class_name = "JPSGeneralEntity"
     
-    def unpack(self, fm:FileManipulator, version:int = SceneFileVersion.VERSION_1):
+    def unpack(self, fm:FileManipulator, version:int = SceneFileVersion.VERSION_1, strings:StringPool = None):
+        if strings == None:
+            strings = StringPool(fm)
         name_pointer = fm.r_u32()
         if version == SceneFileVersion.VERSION_2 or version == SceneFileVersion.VERSION_2_PROTOTYPE:
             name_pointer += 4
-        pos = fm.tell()
-        fm.seek(name_pointer)
-        self.name = fm.r_str_jps()
-        fm.seek(pos)
+        self.name = strings.r_str_jps(name_pointer)
         self.link_id = ID.from_int(fm.r_u32())
         self.master_link_id = ID.from_int(fm.r_u32())
         if self.master_link_id.num == 0:
@@ -1169,31 +1192,33 @@ class Entity:
         self.components = []
         for _ in range(amount):
             component = Component()
-            component.unpack(fm, version=version)
+            component.unpack(fm, version=version, strings=strings)
             self.components.append(component)
         return fm
     
     def pack(self, strings_offsets:dict, endian:EndianType = EndianType.BIG, version:int = SceneFileVersion.VERSION_1) -> bytes:
-        fm = FileManipulator(endian=endian)
+        return self.pack_to(BinaryBuilder(endian=endian), strings_offsets, version=version).getvalue()
+
+    def pack_to(self, bb:BinaryBuilder, strings_offsets:dict, version:int = SceneFileVersion.VERSION_1) -> BinaryBuilder:
         # write the name
-        fm.w_u32(strings_offsets[self.name])
+        bb.w_u32(strings_offsets[self.name])
         # write the link id
-        fm.w_u32(self.link_id.num)
+        bb.w_u32(self.link_id.num)
         # write the master link id
         if self.master_link_id == None:
-            fm.w_u32(0)
+            bb.w_u32(0)
         else:
-            fm.w_u32(self.master_link_id.num)
+            bb.w_u32(self.master_link_id.num)
         # write the unknown
-        fm.w_u32(self.unknown)
+        bb.w_u32(self.unknown)
         if version == SceneFileVersion.VERSION_2 or version == SceneFileVersion.VERSION_2_PROTOTYPE:
-            fm.w_u32(self.unknown_em2)
+            bb.w_u32(self.unknown_em2)
         # write the amount of components
-        fm.w_u32(len(self.components))
+        bb.w_u32(len(self.components))
         # write the components
         for c in self.components:
-            fm.write(c.pack(strings_offsets, endian=endian))
-        return fm.getbuffer()
+            c.pack_to(bb, strings_offsets)
+        return bb
     
     def to_xml(self, version:int = SceneFileVersion.VERSION_1) -> str:
         # create the entity
@@ -1434,7 +1459,7 @@ class SceneFile:
         if self.version == SceneFileVersion.VERSION_2 or self.version == SceneFileVersion.VERSION_2_PROTOTYPE:
             fm.move(4)
         if self.version == SceneFileVersion.VERSION_1 or self.version == SceneFileVersion.VERSION_2_PROTOTYPE:
-            self.guid = ID.from_bytes(fm.read(16))
+            self.guid = ID.from_bytes(fm.r_bytes(16))
         if self.version == SceneFileVersion.VERSION_2 or self.version == SceneFileVersion.VERSION_2_PROTOTYPE:
             num_extra_strings = fm.r_u32()
             self.em2_extra_strings = []
@@ -1443,61 +1468,60 @@ class SceneFile:
         entity_amount = fm.r_u32()
         ref_ids_amount = fm.r_u32()
 
-        # read the entities
-        self.objects.entities = []
+        # every entity, component and property points into the same strings section
+        strings = StringPool(fm)
+
+        # read the entities, into new objects since the default ones are shared by every SceneFile
+        self.objects = Objects([])
         for _ in range(entity_amount):
             entity = Entity()
-            entity.unpack(fm, self.version)
+            entity.unpack(fm, self.version, strings=strings)
             self.objects.entities.append(entity)
         
         # read the referenced entities
-        self.scene.referenced_entities = []
-        for _ in range(ref_ids_amount):
-            self.scene.referenced_entities.append(ID.from_int(fm.r_u32()))
+        self.scene = Scene([ID.from_int(num) for num in fm.r_u32_array(ref_ids_amount)])
         
         return fm
     
-    def add_string_to_strings(self, strings_offsets:dict, strings_section:bytes, start_offset:int, string:str) -> tuple[dict, bytes]:
+    def add_string_to_strings(self, strings_offsets:dict, strings_section:BinaryBuilder, start_offset:int, string:str) -> dict:
         if string in strings_offsets:
-            return strings_offsets, strings_section
-        strings_offsets[string] = len(strings_section) + start_offset
-        fm = FileManipulator(endian=EndianType.BIG)
-        fm.w_str_jps(string)
-        strings_section += fm.getbuffer()
-        return strings_offsets, strings_section
+            return strings_offsets
+        strings_offsets[string] = strings_section.tell() + start_offset
+        strings_section.w_str_jps(string)
+        return strings_offsets
     
-    def build_strings(self) -> dict:
+    def build_strings(self) -> tuple[dict, bytes]:
         strings_offsets = {}
-        strings_section = b""
+        strings_section = BinaryBuilder(endian=EndianType.BIG)
         start_offset = 4
         for e in self.objects.entities:
-            strings_offsets, strings_section = self.add_string_to_strings(
+            strings_offsets = self.add_string_to_strings(
                 strings_offsets,
                 strings_section,
                 start_offset,
                 e.name
             )
             for c in e.components:
-                strings_offsets, strings_section = self.add_string_to_strings(
+                strings_offsets = self.add_string_to_strings(
                     strings_offsets,
                     strings_section,
                     start_offset,
                     c.class_name
                 )
-                strings_offsets, strings_section = self.add_string_to_strings(
+                strings_offsets = self.add_string_to_strings(
                     strings_offsets,
                     strings_section,
                     start_offset,
                     c.template_id.to_str(fill=False)
                 )
                 for p in c.properties:
-                    strings_offsets, strings_section = self.add_string_to_strings(
+                    strings_offsets = self.add_string_to_strings(
                         strings_offsets,
                         strings_section,
                         start_offset,
                         p.name
                     )
-                    strings_offsets, strings_section = self.add_string_to_strings(
+                    strings_offsets = self.add_string_to_strings(
                         strings_offsets,
                         strings_section,
                         start_offset,
@@ -1505,7 +1529,7 @@ class SceneFile:
                     )
                     
                     if isinstance(p.value, str):
-                        strings_offsets, strings_section = self.add_string_to_strings(
+                        strings_offsets = self.add_string_to_strings(
                             strings_offsets,
                             strings_section,
                             start_offset,
@@ -1514,46 +1538,45 @@ class SceneFile:
                     elif isinstance(p.value, list):
                         for v in p.value:
                             if isinstance(v, str):
-                                strings_offsets, strings_section = self.add_string_to_strings(
+                                strings_offsets = self.add_string_to_strings(
                                     strings_offsets,
                                     strings_section,
                                     start_offset,
                                     v
                                 )
-        return strings_offsets, strings_section
+        return strings_offsets, strings_section.getvalue()
     
     def pack(self, endian:EndianType = EndianType.BIG) -> bytes:
-        fm = FileManipulator(endian=endian)
+        bb = BinaryBuilder(endian=endian)
         # build the strings
         strings_offsets, strings_section = self.build_strings()
         if self.version == SceneFileVersion.VERSION_2 or self.version == SceneFileVersion.VERSION_2_PROTOTYPE:
-            fm.w_u32(0x01000001)
+            bb.w_u32(0x01000001)
         # write the data offset
-        fm.w_u32(4 + len(strings_section))
+        bb.w_u32(4 + len(strings_section))
         # write the strings section
-        fm.write(strings_section)
+        bb.write(strings_section)
         if self.version == SceneFileVersion.VERSION_2:
-            fm.w_u32(0x02000002)
+            bb.w_u32(0x02000002)
         elif self.version == SceneFileVersion.VERSION_2_PROTOTYPE:
-            fm.w_u32(0x02000001)
+            bb.w_u32(0x02000001)
         if self.version == SceneFileVersion.VERSION_1 or self.version == SceneFileVersion.VERSION_2_PROTOTYPE:
             # write the guid
-            fm.write(self.guid.to_bytes(16, endian=endian))
+            bb.write(self.guid.to_bytes(16, endian=endian))
         if self.version == SceneFileVersion.VERSION_2 or self.version == SceneFileVersion.VERSION_2_PROTOTYPE:
-            fm.w_u32(len(self.em2_extra_strings))
+            bb.w_u32(len(self.em2_extra_strings))
             for s in self.em2_extra_strings:
-                fm.w_str_jps(s)
+                bb.w_str_jps(s)
         # write the entity amount
-        fm.w_u32(len(self.objects.entities))
+        bb.w_u32(len(self.objects.entities))
         # write the ref ids amount
-        fm.w_u32(len(self.scene.referenced_entities))
+        bb.w_u32(len(self.scene.referenced_entities))
         # write the entities
         for e in self.objects.entities:
-            fm.write(e.pack(strings_offsets, endian=endian, version=self.version))
+            e.pack_to(bb, strings_offsets, version=self.version)
         # write the referenced entities
-        for e in self.scene.referenced_entities:
-            fm.w_u32(e.num)
-        return fm.getbuffer()
+        bb.w_array("I", [e.num for e in self.scene.referenced_entities])
+        return bb.getvalue()
     
     def display(self):
         # use plt
@@ -1763,7 +1786,8 @@ class SceneFile:
         dictionary["objects"] = self.objects.to_dict()
         if self.version == SceneFileVersion.VERSION_1 or self.version == SceneFileVersion.VERSION_2_PROTOTYPE:
             dictionary["guid"] = self.guid.to_str(16)
-        elif self.version == SceneFileVersion.VERSION_2 or self.version == SceneFileVersion.VERSION_2_PROTOTYPE:
+        # the prototype has both, from_dict reads both
+        if self.version == SceneFileVersion.VERSION_2 or self.version == SceneFileVersion.VERSION_2_PROTOTYPE:
             dictionary["em2_extra_strings"] = self.em2_extra_strings
         return dictionary
     
@@ -1804,6 +1828,10 @@ class SceneFile:
     @staticmethod
     def from_binary(data:bytes, endian:EndianType = EndianType.BIG):
         fm = FileManipulator(data, endian=endian)
+        return SceneFile.from_file_manipulator(fm)
+
+    @staticmethod
+    def from_file_manipulator(fm:FileManipulator):
         start_pos = fm.tell()
         first_four_bytes = fm.r_u32()
         version = SceneFileVersion.VERSION_1
@@ -1817,14 +1845,21 @@ class SceneFile:
             elif num == 0x02000001:
                 version = SceneFileVersion.VERSION_2_PROTOTYPE
             else:
-                raise Exception(f"Unknown version number: {num}")
+                raise ParseError(f"Unknown version number: {num}", offset)
         fm.seek(start_pos)
         scene_file = SceneFile(version=version)
         scene_file.unpack(fm)
         return scene_file
     
     @staticmethod
-    def from_binary_path(path:str, endian:EndianType = EndianType.BIG):
+    def from_binary_path(path:str, endian:EndianType = EndianType.BIG, mapped:bool = False):
+        if mapped == True:
+            # nothing in a parsed scene references the buffer, so the mapping can be closed right away
+            fm = FileManipulator.from_path(path, endian=endian, mapped=True)
+            try:
+                return SceneFile.from_file_manipulator(fm)
+            finally:
+                fm.close()
         with open(path, "rb") as f:
             return SceneFile.from_binary(f.read(), endian=endian)
     
@@ -3,6 +3,7 @@
 # format specific to the Japanese version of Epic Mickey 2 for Wii (why), similar to DCT but split up
 
 from epicmickeylib.internal.file_manipulator import FileManipulator
+from epicmickeylib.internal.string_pool import StringPool
 
 class SDICLine:
     hashed_key:int
@@ -19,20 +20,18 @@ class SDICFile:
         self.lines = lines
     
     def unpack(self, fm:FileManipulator) -> "FileManipulator":
+        strings = StringPool(fm)
         num_lines = fm.r_u32()
         for _ in range(num_lines):
             hashed_key = fm.r_u32()
             string_offset = fm.r_u32()
-            pos = fm.tell()
-            fm.seek(string_offset)
-            string = fm.r_str_null(encoding="utf-8")
+            string = strings.r_str_null(string_offset, encoding="utf-8")
             self.lines.append(
                 SDICLine(
                     hashed_key,
                     string
                 )
             )
-            fm.seek(pos)
         return fm
     
     @staticmethod
@@ -2,11 +2,25 @@
 #
 # format contains subtitle dialog keys and their start/end times
 
-from epicmickeylib.internal.file_manipulator import EndianType, FileManipulator
+from epicmickeylib.internal.file_manipulator import EndianType, FileManipulator, ParseError
+from epicmickeylib.internal.record_schema import RecordSchema
 import xml.etree.ElementTree as ET
 from xml.dom import minidom
 import json
 
+KEY_SIZE = 0x44
+
+# one 76 byte record per subtitle, the times are ints in version 1 and floats in version 2
+SUBTITLE_RECORDS = {
+    1: RecordSchema(("translation_key", f"{KEY_SIZE}s"), ("start_time", "I"), ("end_time", "I")),
+    2: RecordSchema(("translation_key", f"{KEY_SIZE}s"), ("start_time", "f"), ("end_time", "f"))
+}
+
+def get_record_schema(version:int, offset:int = 0) -> RecordSchema:
+    if version not in SUBTITLE_RECORDS:
+        raise ParseError(f"Unknown subtitle version: {version}", offset)
+    return SUBTITLE_RECORDS[version]
+
 class SubtitleString:
     text:str
 
@@ -14,14 +28,23 @@ class SubtitleString:
         self.text = text
     
     def unpack(self, fm:FileManipulator) -> "FileManipulator":
-        self.text = fm.r_str(0x44).replace("\0", "")
+        self.text = fm.r_str(KEY_SIZE).replace("\0", "")
         return fm
     
     def pack(self) -> bytes:
-        fm:FileManipulator = FileManipulator()
-        fm.w_str(self.text)
-        fm.pad(0x44)
-        return fm.getbuffer()
+        # an empty key is still a full field of nulls
+        return self.encode().ljust(KEY_SIZE, b"\x00")
+
+    def encode(self) -> bytes:
+        # the struct field pads with nulls but would silently cut a long key short
+        data = self.text.encode("utf-8")
+        if len(data) > KEY_SIZE:
+            raise Exception(f"Translation key is longer than {KEY_SIZE} bytes: {self.text}")
+        return data
+
+    @staticmethod
+    def decode(data:bytes) -> "SubtitleString":
+        return SubtitleString(data.decode("utf-8").replace("\0", ""))
 
     def __str__(self):
         return self.text
@@ -40,25 +63,20 @@ class Subtitle:
         self.end_time = end_time
     
     def unpack(self, fm:FileManipulator) -> "FileManipulator":
-        fm = self.translation_key.unpack(fm)
-        if self.version == 1:
-            self.start_time = fm.r_u32()
-            self.end_time = fm.r_u32()
-        elif self.version == 2:
-            self.start_time = fm.r_float()
-            self.end_time = fm.r_float()
+        start = fm.tell()
+        translation_key, self.start_time, self.end_time = get_record_schema(self.version, fm.tell()).unpack(fm)
+        try:
+            self.translation_key = SubtitleString.decode(translation_key)
+        except UnicodeDecodeError:
+            raise ParseError("Translation key is not valid utf-8", start) from None
         return fm
 
     def pack(self, endian:EndianType=EndianType.BIG) -> bytes:
-        fm:FileManipulator = FileManipulator(endian=endian)
-        fm.write(self.translation_key.pack())
-        if self.version == 1:
-            fm.w_u32(self.start_time)
-            fm.w_u32(self.end_time)
-        elif self.version == 2:
-            fm.w_float(self.start_time)
-            fm.w_float(self.end_time)
-        return fm.getbuffer()
+        return get_record_schema(self.version).pack(endian, *self.get_record())
+
+    def get_record(self) -> tuple:
+        # the values in the order of the record schema
+        return (self.translation_key.encode(), self.start_time, self.end_time)
     
     def to_dict(self) -> dict:
         return {
@@ -86,17 +104,22 @@ class SubtitleFile:
         self.subtitles = subtitles
     
     def unpack(self, fm:FileManipulator) -> "FileManipulator":
-        amount_to_read = int(fm.size() / 76)
-        for _ in range(amount_to_read):
-            subtitle:Subtitle = Subtitle(version=self.version)
-            fm = subtitle.unpack(fm)
+        schema = get_record_schema(self.version, fm.tell())
+        start = fm.tell()
+        amount_to_read = fm.size() // schema.size
+        # the whole file is one table of records
+        for i, (translation_key, start_time, end_time) in enumerate(schema.unpack_table(fm, amount_to_read)):
+            subtitle:Subtitle = Subtitle(version=self.version, start_time=start_time, end_time=end_time)
+            try:
+                subtitle.translation_key = SubtitleString.decode(translation_key)
+            except UnicodeDecodeError:
+                raise ParseError("Translation key is not valid utf-8", start + i * schema.size) from None
             self.subtitles.append(subtitle)
         return fm
     
     def pack(self, endian:EndianType=EndianType.BIG) -> bytes:
         fm:FileManipulator = FileManipulator(endian=endian)
-        for subtitle in self.subtitles:
-            fm.write(subtitle.pack(endian=endian))
+        get_record_schema(self.version).pack_table(fm, [subtitle.get_record() for subtitle in self.subtitles])
         return fm.getbuffer()
     
     def __str__(self) -> str:
@@ -0,0 +1,255 @@
+# epicmickeylib/internal/binary_builder.py
+#
+# append-only writer for packing binary formats without seeking around a buffer
+
+import array
+import struct
+from epicmickeylib.internal.file_manipulator import EndianType, StructCodec, ARRAY_TYPECODES, get_codec
+
+class Fixup:
+    """
+    A field written before its value is known.
+    """
+
+    index:int
+    position:int
+    compiled:struct.Struct
+    name:str
+    label:bool
+    adjust:int
+    relative:bool
+
+    def __init__(self, index:int, position:int, compiled:struct.Struct, name:str, label:bool = False, adjust:int = 0, relative:bool = False):
+        self.index = index
+        self.position = position
+        self.compiled = compiled
+        self.name = name
+        self.label = label
+        self.adjust = adjust
+        self.relative = relative
+
+class BinaryBuilder:
+    """
+    Builds a binary file as a list of chunks that are joined once at the end.
+
+    Only appends are supported. Fields whose value is not known yet (sizes,
+    offsets to data that comes later) are written as placeholders and filled
+    in by `getvalue()`, either with a value given to `patch()` or with the
+    position of a label.
+    """
+
+    endian:EndianType
+    codec:StructCodec
+    chunks:list
+    position:int
+    labels:dict[str, int]
+    values:dict[str, int]
+    fixups:list[Fixup]
+
+    def __init__(self, endian:EndianType = EndianType.BIG) -> "BinaryBuilder":
+        self.chunks = []
+        self.position = 0
+        self.labels = {}
+        self.values = {}
+        self.fixups = []
+        self.endian = endian
+
+    @property
+    def endian(self) -> EndianType:
+        return self._endian
+
+    @endian.setter
+    def endian(self, endian:EndianType) -> None:
+        self._endian = endian
+        self.codec = get_codec(endian)
+
+    def tell(self) -> int:
+        return self.position
+
+    def write(self, data:bytes) -> None:
+        self.chunks.append(data)
+        self.position += len(data)
+
+    def label(self, name:str) -> int:
+
+        """
+        Marks the current position so placeholders can point at it.
+
+        Args:
+        - name (str): The name of the label.
+
+        Returns:
+        - The position of the label.
+        """
+
+        if name in self.labels:
+            raise Exception(f"Label already defined: {name}")
+        self.labels[name] = self.position
+        return self.position
+
+    def placeholder(self, name:str, data_type:str = "I") -> int:
+
+        """
+        Reserves a field that is filled in later with `patch()`.
+
+        Args:
+        - name (str): The name used to patch the field.
+        - data_type (str): The struct format of the field.
+
+        Returns:
+        - The position of the field.
+        """
+
+        return self._reserve(Fixup(len(self.chunks), self.position, self.codec.get(data_type), name))
+
+    def patch(self, name:str, value:int) -> None:
+
+        """
+        Sets the value of every placeholder with the given name.
+
+        Args:
+        - name (str): The name of the placeholder.
+        - value (int): The value to write.
+        """
+
+        self.values[name] = value
+
+    def w_offset(self, label:str, data_type:str = "I", adjust:int = 0, relative:bool = False) -> int:
+
+        """
+        Reserves a field holding the position of a label, which may be defined later.
+
+        Args:
+        - label (str): The label to point at.
+        - data_type (str): The struct format of the field.
+        - adjust (int): Added to the position of the label.
+        - relative (bool): Whether the position of the field itself is subtracted.
+
+        Returns:
+        - The position of the field.
+        """
+
+        return self._reserve(Fixup(len(self.chunks), self.position, self.codec.get(data_type), label, True, adjust, relative))
+
+    def _reserve(self, fixup:Fixup) -> int:
+        self.fixups.append(fixup)
+        self.write(bytes(fixup.compiled.size))
+        return fixup.position
+
+    def align(self, num:int = 4) -> None:
+
+        """
+        Writes null bytes up to a byte boundary.
+
+        Args:
+        - num (int): The byte boundary to align to.
+        """
+
+        if self.position % num != 0:
+            self.write(bytes(num - (self.position % num)))
+
+    # FileManipulator calls writing alignment `pad`
+    pad = align
+
+    def pad_to(self, offset:int) -> None:
+
+        """
+        Writes null bytes up to an absolute position.
+
+        Args:
+        - offset (int): The position to pad to.
+        """
+
+        if offset < self.position:
+            raise Exception(f"Cannot pad backwards from {self.position} to {offset}")
+        if offset > self.position:
+            self.write(bytes(offset - self.position))
+
+    def write_struct(self, compiled:struct.Struct, *values) -> None:
+        self.write(compiled.pack(*values))
+
+    def write_type(self, data_type:str, data:any) -> None:
+        self.write(self.codec.get(data_type).pack(data))
+
+    def w_array(self, data_type:str, values) -> None:
+        values = array.array(ARRAY_TYPECODES[data_type], values)
+        if self.codec.byteswap:
+            values.byteswap()
+        self.write(values.tobytes())
+
+    def w_u8(self, data) -> None:
+        self.write(self.codec.u8.pack(data))
+
+    def w_s8(self, data) -> None:
+        self.write(self.codec.s8.pack(data))
+
+    def w_u16(self, data) -> None:
+        self.write(self.codec.u16.pack(data))
+
+    def w_s16(self, data) -> None:
+        self.write(self.codec.s16.pack(data))
+
+    def w_u32(self, data) -> None:
+        self.write(self.codec.u32.pack(data))
+
+    def w_s32(self, data) -> None:
+        self.write(self.codec.s32.pack(data))
+
+    def w_u64(self, data) -> None:
+        self.write(self.codec.u64.pack(data))
+
+    def w_s64(self, data) -> None:
+        self.write(self.codec.s64.pack(data))
+
+    def w_float(self, data) -> None:
+        self.write(self.codec.float.pack(data))
+
+    def w_bool(self, value:bool) -> None:
+        if value == True:
+            self.write(b"\xFF\xFF\xFF\xFF")
+        else:
+            self.write(b"\x00\x00\x00\x00")
+
+    def w_str(self, text:str) -> None:
+        self.write(text.encode("utf-8"))
+
+    def w_str_null(self, text:str) -> None:
+        self.write(text.encode("utf-8") + b"\x00")
+
+    def w_str_jps(self, text:str) -> None:
+        # same layout as FileManipulator.w_str_jps
+        text_length = len(text)
+        if text_length > 0:
+            text_length += 1
+        size = text_length + 2
+        while (size % 4) != 0:
+            size += 1
+        self.write(self.codec.u8.pack(size) + self.codec.u8.pack(text_length) + text.encode("utf-8") + b"\x00")
+        self.align()
+
+    def getvalue(self) -> bytes:
+
+        """
+        Fills in every placeholder and joins the chunks.
+
+        Returns:
+        - The built binary data.
+        """
+
+        for fixup in self.fixups:
+            if fixup.label:
+                if fixup.name not in self.labels:
+                    raise Exception(f"Undefined label: {fixup.name}")
+                value = self.labels[fixup.name] + fixup.adjust
+                if fixup.relative:
+                    value -= fixup.position
+            else:
+                if fixup.name not in self.values:
+                    raise Exception(f"Placeholder was never patched: {fixup.name}")
+                value = self.values[fixup.name]
+            self.chunks[fixup.index] = fixup.compiled.pack(value)
+        return b"".join(self.chunks)
+
+# lets the opt-in instrumentation count calls, this does nothing unless it's enabled
+from epicmickeylib.internal import instrumentation
+instrumentation.register(BinaryBuilder)
@@ -0,0 +1,206 @@
+# epicmickeylib/internal/compression_cache.py
+#
+# compressed data kept on disk between runs, so building a packfile again doesn't compress unchanged files again
+
+import hashlib
+import os
+import struct
+import tempfile
+import zlib
+from epicmickeylib.internal.lru_cache import LRUCache
+
+# every blob starts with the size and crc32 of the compressed data after it, so a damaged blob is never used
+BLOB_MAGIC = b"ZCB1"
+BLOB_HEADER = struct.Struct("<4sII")
+
+class CachedBlob:
+    """
+    A compressed blob in the cache directory, measured by its size on disk, header included.
+    """
+
+    path:str
+    size:int
+
+    def __init__(self, path:str, size:int) -> "CachedBlob":
+        self.path = path
+        self.size = size
+
+    def __len__(self) -> int:
+        return self.size
+
+class CompressionCache:
+    """
+    zlib compressed data stored in a directory, keyed by the sha256 of the
+    uncompressed data and the compression level.
+
+    Once the blobs take up more than `max_bytes` the least recently used ones
+    are deleted, a limit of 0 keeps everything. When a blob was last used is
+    its modification time, so the order survives between runs. Blobs are
+    written to a temporary file and renamed into place, so several processes
+    can share a directory. A blob that is truncated or doesn't match its
+    crc32 is deleted and the data is compressed again.
+
+    Example:
+    ```
+    cache = CompressionCache("cache", max_bytes=1 << 30)
+    packfile = Packfile.from_json_stripped(open("project/packfile_stripped.json").read(), "project", compression_cache=cache)
+    packfile.to_binary_path("out.pak")
+    print(cache.report())
+    ```
+    """
+
+    directory:str
+    # key -> blob, in least to most recently used order
+    blobs:LRUCache
+    hits:int
+    misses:int
+    evictions:int
+    # blobs that were damaged, they count as misses too
+    invalid:int
+
+    def __init__(self, directory:str, max_bytes:int = 0) -> "CompressionCache":
+        self.directory = directory
+        self.blobs = LRUCache(max_bytes=max_bytes, on_evict=self.evict)
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalid = 0
+        os.makedirs(directory, exist_ok=True)
+        self.load()
+
+    def load(self) -> None:
+        # blobs are added oldest first, so the least recently used ones are evicted first
+        found = []
+        for folder in os.scandir(self.directory):
+            if not folder.is_dir():
+                continue
+            for entry in os.scandir(folder.path):
+                if entry.name.startswith("."):
+                    continue
+                stat = entry.stat()
+                found.append((stat.st_mtime_ns, entry.name, entry.path, stat.st_size))
+        found.sort()
+        for _, key, path, size in found:
+            self.blobs.put(key, CachedBlob(path, size))
+
+    def evict(self, key:str, blob:CachedBlob) -> None:
+        self.evictions += 1
+        try:
+            os.remove(blob.path)
+        except FileNotFoundError:
+            pass
+
+    @staticmethod
+    def get_key(data:bytes, compression_level:int) -> str:
+        return f"{hashlib.sha256(data).hexdigest()}-{compression_level}"
+
+    def get_path(self, key:str) -> str:
+        # spread over subfolders so no single folder holds every blob
+        return os.path.join(self.directory, key[:2], key)
+
+    def get(self, key:str) -> bytes:
+
+        """
+        Gets a compressed blob and marks it as the most recently used.
+
+        Args:
+        - key (str): The key from `get_key()`.
+
+        Returns:
+        - The compressed data, or None if it isn't cached.
+        """
+
+        blob = self.blobs.get(key)
+        if blob != None:
+            try:
+                with open(blob.path, "rb") as f:
+                    header = f.read(BLOB_HEADER.size)
+                    compressed_data = f.read()
+                if CompressionCache.is_valid(header, compressed_data):
+                    os.utime(blob.path)
+                    self.hits += 1
+                    return compressed_data
+                # truncated or damaged on disk, the caller compresses the data again and replaces it
+                self.invalid += 1
+                self.blobs.remove(key)
+                self.evict(key, blob)
+            except FileNotFoundError:
+                # deleted by another process sharing the directory
+                self.blobs.remove(key)
+        self.misses += 1
+        return None
+
+    @staticmethod
+    def is_valid(header:bytes, compressed_data:bytes) -> bool:
+        if len(header) != BLOB_HEADER.size:
+            return False
+        magic, size, crc = BLOB_HEADER.unpack(header)
+        return magic == BLOB_MAGIC and size == len(compressed_data) and crc == zlib.crc32(compressed_data)
+
+    def put(self, key:str, compressed_data:bytes) -> None:
+
+        """
+        Stores a compressed blob, evicting the least recently used blobs if the cache is full.
+
+        Args:
+        - key (str): The key from `get_key()`.
+        - compressed_data (bytes): The compressed data.
+        """
+
+        path = self.get_path(key)
+        folder = os.path.dirname(path)
+        os.makedirs(folder, exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(prefix=".", suffix=".tmp", dir=folder)
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(BLOB_HEADER.pack(BLOB_MAGIC, len(compressed_data), zlib.crc32(compressed_data)))
+                f.write(compressed_data)
+            os.replace(temp_path, path)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+        self.blobs.put(key, CachedBlob(path, BLOB_HEADER.size + len(compressed_data)))
+
+    def compress(self, data:bytes, compression_level:int) -> bytes:
+
+        """
+        Compresses data, or gets it from the cache if it was compressed before.
+
+        Args:
+        - data (bytes): The uncompressed data.
+        - compression_level (int): The zlib compression level.
+
+        Returns:
+        - The compressed data.
+        """
+
+        key = CompressionCache.get_key(data, compression_level)
+        compressed_data = self.get(key)
+        if compressed_data == None:
+            compressed_data = zlib.compress(data, compression_level)
+            self.put(key, compressed_data)
+        return compressed_data
+
+    def clear(self) -> None:
+        for key, blob in list(self.blobs.entries.items()):
+            self.evict(key, blob)
+        self.blobs.clear()
+
+    def __len__(self) -> int:
+        return len(self.blobs)
+
+    def get_stats(self) -> dict:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "invalid": self.invalid,
+            "blobs": len(self.blobs),
+            "bytes": self.blobs.total_bytes
+        }
+
+    def report(self) -> str:
+        lookups = self.hits + self.misses
+        hit_rate = 100 * self.hits / lookups if lookups > 0 else 0
+        return f"compression cache: {self.hits} hits, {self.misses} misses ({hit_rate:.1f}% hits), {self.evictions} evicted, {self.invalid} invalid, {len(self.blobs)} blobs, {self.blobs.total_bytes} bytes"
@@ -3,9 +3,12 @@
 # "advanced" random access file manipulator
 # probably inefficient
 
-from io import BytesIO
+from io import BytesIO, UnsupportedOperation
+import array
+import mmap
 import os
 import struct
+import sys
 
 class EndianType:
     BIG     = 0
@@ -15,46 +18,432 @@ class WriteMode:
     OVERWRITE = 0
     INSERT    = 1
 
+# array.array typecodes with the same item size as each struct type
+ARRAY_TYPECODES = {}
+for data_type in "bBhHiIqQf":
+    for typecode in data_type + "lL":
+        if array.array(typecode).itemsize == struct.calcsize(data_type):
+            ARRAY_TYPECODES[data_type] = typecode
+            break
+
+class StructCodec:
+    """
+    Precompiled `struct.Struct` objects bound to a single byte order.
+
+    Building a format string and calling `struct.calcsize` for every value is
+    most of the cost of reading a u32, so each (endian, type) pair is compiled
+    once and shared by every FileManipulator using that byte order.
+    """
+
+    prefix:str
+    structs:dict[str, struct.Struct]
+    # whether arrays read with the machine's byte order need to be swapped
+    byteswap:bool
+
+    def __init__(self, prefix:str):
+        self.prefix = prefix
+        self.structs = {}
+        if sys.byteorder == "little":
+            self.byteswap = prefix == ">"
+        else:
+            self.byteswap = prefix == "<"
+        self.u8 = self.get("B")
+        self.s8 = self.get("b")
+        self.u16 = self.get("H")
+        self.s16 = self.get("h")
+        self.u32 = self.get("I")
+        self.s32 = self.get("i")
+        self.u64 = self.get("Q")
+        self.s64 = self.get("q")
+        self.u128 = self.get("QQ")
+        self.s128 = self.get("qq")
+        self.float = self.get("f")
+
+    def get(self, data_type:str) -> struct.Struct:
+
+        """
+        Gets the compiled struct for a type, compiling it on first use.
+
+        Args:
+        - data_type (str): The struct format of the data, without a byte order prefix.
+
+        Returns:
+        - The compiled struct.
+        """
+
+        compiled = self.structs.get(data_type)
+        if compiled is None:
+            compiled = struct.Struct(self.prefix + data_type)
+            self.structs[data_type] = compiled
+        return compiled
+
+class ParseError(Exception):
+    """
+    Raised when a file can't be parsed, usually because it is truncated or corrupt.
+    """
+
+    # where in the file parsing failed
+    offset:int
+
+    def __init__(self, message:str, offset:int) -> "ParseError":
+        super().__init__(f"{message} (at offset {offset})")
+        self.offset = offset
+
+class GapBuffer:
+    """
+    Bytes with a movable gap where inserted data goes.
+
+    Inserting at the gap is an amortized O(1) append, so a run of inserts at
+    one place only pays for moving the gap once. The bytes after the gap are
+    kept reversed so the gap can move in either direction by appending.
+    """
+
+    # bytes before the gap
+    head:bytearray
+    # bytes after the gap, reversed
+    tail:bytearray
+    # file pointer, which doesn't have to be at the gap
+    position:int
+
+    def __init__(self, data:bytes=b"", position:int=0) -> "GapBuffer":
+        self.head = bytearray(data)
+        self.tail = bytearray()
+        self.position = position
+
+    def size(self) -> int:
+        return len(self.head) + len(self.tail)
+
+    def move_gap(self, position:int) -> None:
+        gap = len(self.head)
+        if position < gap:
+            self.tail += self.head[position:][::-1]
+            del self.head[position:]
+        elif position > gap:
+            amount = position - gap
+            self.head += self.tail[-amount:][::-1]
+            del self.tail[-amount:]
+
+    def insert(self, data:bytes) -> int:
+
+        """
+        Inserts data at the file pointer and moves the file pointer past it.
+
+        Args:
+        - data (bytes): The data to insert.
+
+        Returns:
+        - The amount of bytes inserted.
+        """
+
+        size = self.size()
+        if self.position > size:
+            # like BytesIO, writing past the end fills the space with null bytes
+            self.move_gap(size)
+            self.head += bytes(self.position - size)
+        else:
+            self.move_gap(self.position)
+        gap = len(self.head)
+        self.head += data
+        self.position += len(self.head) - gap
+        return len(self.head) - gap
+
+    def getvalue(self) -> bytes:
+        self.move_gap(self.size())
+        return bytes(self.head)
+
+CODECS = {
+    EndianType.BIG: StructCodec(">"),
+    EndianType.LITTLE: StructCodec("<")
+}
+# if no endian is somehow specified or it is invalid, default to the machine's byte ordering
+NATIVE_CODEC = StructCodec("@")
+
+def get_codec(endian:EndianType) -> StructCodec:
+    return CODECS.get(endian, NATIVE_CODEC)
+
 class FileManipulator(BytesIO):
-    # controls whether the file should r/w with a big or little endianess
-    endian:EndianType = EndianType.BIG
+    # codec matching the current endian, rebound whenever the endian changes
+    codec:StructCodec
 
     # controls whether the file should insert or overwrite data
     write_mode:WriteMode = WriteMode.OVERWRITE
 
+    # the buffer primitives unpack from. getvalue() does not copy an unmodified buffer
+    _view = BytesIO.getvalue
+
+    # inserted data that hasn't been written to the buffer yet
+    gap_buffer:GapBuffer = None
+
+    # longest string the string readers accept, so a corrupt length or missing terminator fails fast
+    max_string_length:int = 0x100000
+
+    # methods that need the inserted data to be in the buffer before they run
+    MATERIALIZING_METHODS = ("read", "read1", "readinto", "readinto1", "readline", "readlines", "getvalue", "getbuffer", "truncate", "_view")
+
     def __init__(self, data:bytes=b"", endian:EndianType=EndianType.BIG, write_mode:WriteMode=WriteMode.OVERWRITE) -> "FileManipulator":
         super().__init__(data)
         self.endian = endian
         self.write_mode = write_mode
+
+    @property
+    def endian(self) -> EndianType:
+        # controls whether the file should r/w with a big or little endianess
+        return self._endian
+
+    @endian.setter
+    def endian(self, endian:EndianType) -> None:
+        self._endian = endian
+        self.codec = get_codec(endian)
     
     def read_backwards(self, length:int) -> bytes:
-        # move backwards through the file
-        data = bytes()
-        for _ in range(length):
-            self.move(-1)
-            data += self.read(1)
-            self.move(-1)
-        return data
+        # move backwards through the file, the bytes are returned in the order they were passed
+        pos = self.tell()
+        if length > pos:
+            raise ValueError(f"negative seek value {pos - length}")
+        self.seek(pos - length)
+        return bytes(self._view()[pos - length:pos][::-1])
     
     def write(self, __buffer: bytes):
-        if self.write_mode == WriteMode.OVERWRITE:
-            super().write(__buffer)
-        elif self.write_mode == WriteMode.INSERT:
-            # insert data
-            pos = self.tell()
-            data = self.read()
-            self.seek(pos)
-            super().write(__buffer)
-            super.write(data)
-            # move file pointer
-            self.seek(pos + len(__buffer))
+        if self.write_mode == WriteMode.INSERT:
+            self.begin_inserts()
+            return self.write(__buffer)
+        return super().write(__buffer)
+
+    def begin_inserts(self) -> None:
+
+        """
+        Moves the data into a gap buffer so inserts don't rewrite the rest of the file.
+
+        While inserts are pending, seek, tell and write are served by the gap
+        buffer and every other method writes the data back first. Overwrite
+        mode never goes through here, so it pays nothing for this.
+        """
+
+        if self.gap_buffer != None:
+            return
+        self.gap_buffer = GapBuffer(BytesIO.getvalue(self), BytesIO.tell(self))
+        for name in self.MATERIALIZING_METHODS:
+            setattr(self, name, self._materializing(getattr(self, name)))
+        self.seek = self._gap_seek
+        self.tell = self._gap_tell
+        self.write = self._gap_write
+
+    def end_inserts(self) -> None:
+
+        """
+        Writes pending inserts back into the buffer.
+        """
+
+        gap_buffer = self.gap_buffer
+        if gap_buffer == None:
+            return
+        self.gap_buffer = None
+        for name in self.MATERIALIZING_METHODS + ("seek", "tell", "write"):
+            del self.__dict__[name]
+        BytesIO.__init__(self, gap_buffer.getvalue())
+        BytesIO.seek(self, gap_buffer.position)
+
+    def _materializing(self, method):
+        def wrapper(*args, **kwargs):
+            self.end_inserts()
+            return method(*args, **kwargs)
+        return wrapper
+
+    def _gap_seek(self, pos:int, whence:int=0) -> int:
+        if whence == 1:
+            pos += self.gap_buffer.position
+        elif whence == 2:
+            pos += self.gap_buffer.size()
+        if pos < 0:
+            raise ValueError(f"negative seek value {pos}")
+        self.gap_buffer.position = pos
+        return pos
+
+    def _gap_tell(self) -> int:
+        return self.gap_buffer.position
+
+    def _gap_write(self, __buffer:bytes):
+        if self.write_mode == WriteMode.INSERT:
+            return self.gap_buffer.insert(__buffer)
+        self.end_inserts()
+        return self.write(__buffer)
     
+    def find(self, sub:bytes, start:int=0, end:int=None) -> int:
+
+        """
+        Searches the file for a byte sequence without moving the file pointer.
+
+        Args:
+        - sub (bytes): The bytes to search for.
+        - start (int): The offset to start searching from.
+        - end (int): The offset to stop searching at, or the end of the file.
+
+        Returns:
+        - The offset of the first match, or -1 if there is none.
+        """
+
+        view = self._view()
+        if end == None:
+            end = len(view)
+        return view.find(sub, start, end)
+
+    def rfind(self, sub:bytes, start:int=0, end:int=None) -> int:
+
+        """
+        Searches the file backwards for a byte sequence without moving the file pointer.
+
+        Args:
+        - sub (bytes): The bytes to search for.
+        - start (int): The offset to stop searching at.
+        - end (int): The offset to start searching backwards from, or the end of the file.
+
+        Returns:
+        - The offset of the last match before `end`, or -1 if there is none.
+        """
+
+        view = self._view()
+        if end == None:
+            end = len(view)
+        return view.rfind(sub, start, end)
+
+    def rfind_not(self, byte:int, end:int=None, start:int=0) -> int:
+
+        """
+        Searches the file backwards for the first byte that isn't `byte`, without moving the file pointer.
+
+        Args:
+        - byte (int): The byte value to skip over.
+        - end (int): The offset to start searching backwards from, or the end of the file.
+        - start (int): The offset to stop searching at.
+
+        Returns:
+        - The offset of the last byte before `end` that isn't `byte`, or -1 if there is none.
+        """
+
+        view = self._view()
+        if end == None:
+            end = len(view)
+        skip = bytes((byte,))
+        # runs of the skipped byte are usually short, so strip small blocks at a time
+        block_size = 256
+        while end > start:
+            block_start = max(start, end - block_size)
+            remaining = len(view[block_start:end].rstrip(skip))
+            if remaining > 0:
+                return block_start + remaining - 1
+            end = block_start
+            block_size *= 2
+        return -1
+
     def get_struct_order_prefix(self):
-        if self.endian == EndianType.BIG:
-            return ">"
-        elif self.endian == EndianType.LITTLE:
-            return "<"
-        return "@" # if no endian is somehow specified or it is invalid, default to the machine's byte ordering
+        return self.codec.prefix
+
+    def read_struct(self, compiled:struct.Struct) -> tuple:
+
+        """
+        Unpacks a compiled struct straight from the buffer at the file pointer.
+
+        Args:
+        - compiled (struct.Struct): The struct to unpack.
+
+        Returns:
+        - A tuple of the values that were read.
+        """
+
+        # one read moves the file pointer, so no tell() and seek() around the unpack
+        data = self.read(compiled.size)
+        try:
+            return compiled.unpack(data)
+        except struct.error:
+            raise self._unexpected_end(compiled.size, data) from None
+
+    def _unexpected_end(self, size:int, data:bytes) -> ParseError:
+        # a short read leaves the file pointer at the end of the file, put it back where the read started
+        pos = self.tell() - len(data)
+        self.seek(pos)
+        return ParseError(f"Unexpected end of file reading {size} bytes", pos)
+
+    def read_array(self, data_type:str, count:int) -> array.array:
+
+        """
+        Reads a run of values of the same type in one call.
+
+        Args:
+        - data_type (str): The struct format of a single value (one of `bBhHiIqQf`).
+        - count (int): The amount of values to read.
+
+        Returns:
+        - An `array.array` of the values, in the machine's byte order.
+        """
+
+        values = array.array(ARRAY_TYPECODES[data_type])
+        values.frombytes(self.r_bytes(values.itemsize * count))
+        if self.codec.byteswap:
+            values.byteswap()
+        return values
+    
+    def r_u32_array(self, count:int) -> array.array:
+        """
+        Reads an array of 4-byte unsigned integers from the file.
+        """
+        return self.read_array("I", count)
+    
+    def r_s32_array(self, count:int) -> array.array:
+        """
+        Reads an array of 4-byte signed integers from the file.
+        """
+        return self.read_array("i", count)
+    
+    def r_f32_array(self, count:int) -> array.array:
+        """
+        Reads an array of 4-byte floats from the file.
+        """
+        return self.read_array("f", count)
+
+    def r_bytes(self, size:int) -> bytes:
+
+        """
+        Reads exactly `size` bytes from the file.
+
+        Args:
+        - size (int): The amount of bytes to read.
+
+        Returns:
+        - The bytes that were read.
+        """
+
+        if size < 0:
+            raise ParseError(f"Negative size {size}", self.tell())
+        data = self.read(size)
+        if len(data) != size:
+            raise self._unexpected_end(size, data)
+        return data
+
+    def read_at(self, offset:int, size:int) -> bytes:
+
+        """
+        Reads exactly `size` bytes at an absolute offset without moving the file pointer.
+
+        Args:
+        - offset (int): Where to read from.
+        - size (int): The amount of bytes to read.
+
+        Returns:
+        - The bytes that were read.
+        """
+
+        # measured on the view rather than with size(), getbuffer() copies the buffer while views of it are alive
+        view = self._view()
+        if offset < 0 or size < 0 or offset + size > len(view):
+            raise ParseError(f"Unexpected end of file reading {size} bytes", offset)
+        return view[offset:offset + size]
+
+    def view_at(self, offset:int, size:int) -> memoryview:
+        # like read_at, without copying. the view keeps the data it was taken from alive
+        view = self._view()
+        if offset < 0 or size < 0 or offset + size > len(view):
+            raise ParseError(f"Unexpected end of file reading {size} bytes", offset)
+        return memoryview(view)[offset:offset + size]
 
     def read_type(self, data_type) -> any:
 
@@ -63,16 +452,12 @@ class FileManipulator(BytesIO):
 
         Args:
         - data_type (str): The type of data to be read.
-        - length (int): The length of the data to be read.
 
         Returns:
         - The data that was read.
         """
 
-        prefix = self.get_struct_order_prefix()
-        format_str = prefix + data_type
-        size = struct.calcsize(format_str)
-        values = struct.unpack(format_str, self.read(size))
+        values = self.read_struct(self.codec.get(data_type))
         if len(values) == 1:
             return values[0]
         return values
@@ -84,7 +469,11 @@ class FileManipulator(BytesIO):
         Returns:
         - The byte that was read.
         """
-        return self.read_type("B")
+        data = self.read(1)
+        try:
+            return self.codec.u8.unpack(data)[0]
+        except struct.error:
+            raise self._unexpected_end(1, data) from None
     
     def r_s8(self) -> int:
         """
@@ -93,7 +482,11 @@ class FileManipulator(BytesIO):
         Returns:
         - The byte that was read.
         """
-        return self.read_type("b")
+        data = self.read(1)
+        try:
+            return self.codec.s8.unpack(data)[0]
+        except struct.error:
+            raise self._unexpected_end(1, data) from None
     
     def r_u16(self) -> int:
 
@@ -104,7 +497,11 @@ class FileManipulator(BytesIO):
         - The unsigned short that was read.
         """
 
-        return self.read_type("H")
+        data = self.read(2)
+        try:
+            return self.codec.u16.unpack(data)[0]
+        except struct.error:
+            raise self._unexpected_end(2, data) from None
     
     def r_u16_jps(self) -> int:
         """
@@ -113,7 +510,7 @@ class FileManipulator(BytesIO):
         Returns:
         - The unsigned short that was read.
         """
-        data = self.read_type("H")
+        data = self.r_u16()
         self.move(2)
         return data
     
@@ -126,7 +523,11 @@ class FileManipulator(BytesIO):
         - The short that was read.
         """
 
-        return self.read_type("h")
+        data = self.read(2)
+        try:
+            return self.codec.s16.unpack(data)[0]
+        except struct.error:
+            raise self._unexpected_end(2, data) from None
     
     def r_u32(self) -> int:
             
@@ -137,7 +538,11 @@ class FileManipulator(BytesIO):
         - The unsigned integer that was read.
         """
 
-        return self.read_type("I")
+        data = self.read(4)
+        try:
+            return self.codec.u32.unpack(data)[0]
+        except struct.error:
+            raise self._unexpected_end(4, data) from None
     
     def r_s32(self) -> int:
                 
@@ -148,7 +553,11 @@ class FileManipulator(BytesIO):
         - The integer that was read.
         """
 
-        return self.read_type("i")
+        data = self.read(4)
+        try:
+            return self.codec.s32.unpack(data)[0]
+        except struct.error:
+            raise self._unexpected_end(4, data) from None
     
     def r_u64(self) -> int:
                 
@@ -159,7 +568,11 @@ class FileManipulator(BytesIO):
         - The unsigned integer that was read.
         """
 
-        return self.read_type("Q")
+        data = self.read(8)
+        try:
+            return self.codec.u64.unpack(data)[0]
+        except struct.error:
+            raise self._unexpected_end(8, data) from None
     
     def r_s64(self) -> int:
                 
@@ -170,7 +583,11 @@ class FileManipulator(BytesIO):
         - The integer that was read.
         """
 
-        return self.read_type("q")
+        data = self.read(8)
+        try:
+            return self.codec.s64.unpack(data)[0]
+        except struct.error:
+            raise self._unexpected_end(8, data) from None
     
     def r_u128(self) -> int:
         
@@ -181,7 +598,7 @@ class FileManipulator(BytesIO):
         - The unsigned integer that was read.
         """
 
-        data = self.read_type("QQ") 
+        data = self.read_struct(self.codec.u128)
         return (data[0] << 64) | data[1]
     
     def r_s128(self) -> int:
@@ -193,11 +610,15 @@ class FileManipulator(BytesIO):
         - The integer that was read.
         """
 
-        data = self.read_type("qq") 
+        data = self.read_struct(self.codec.s128)
         return (data[0] << 64) | data[1]
     
     def r_float(self) -> float:
-        return self.read_type("f")
+        data = self.read(4)
+        try:
+            return self.codec.float.unpack(data)[0]
+        except struct.error:
+            raise self._unexpected_end(4, data) from None
     
     def r_str(self, length) -> str:
 
@@ -211,7 +632,13 @@ class FileManipulator(BytesIO):
         - The characters that were read.
         """
 
-        return self.read(length).decode("utf-8")
+        if length > self.max_string_length:
+            raise ParseError(f"String length {length} is over the limit of {self.max_string_length}", self.tell())
+        pos = self.tell()
+        try:
+            return str(self.r_bytes(length), "utf-8")
+        except UnicodeDecodeError as e:
+            raise ParseError(f"Invalid string: {e}", pos) from None
     
     def r_str_jps(self) -> str:
         size = self.r_u8()
@@ -229,27 +656,16 @@ class FileManipulator(BytesIO):
         - The string that was read.
         """
         
-        string = b""
-        while True:
-            char = self.read(1)
-            if char == b"\x00":
-                break
-            string += char
-        return string.decode(encoding, errors="backslashreplace")
+        start = self.tell()
+        end = self.find(b"\x00", start, start + self.max_string_length + 1)
+        if end == -1:
+            raise ParseError("Unterminated string", start)
+        self.seek(end + 1)
+        return str(self._view()[start:end], encoding, errors="backslashreplace")
     
     def r_bool(self) -> bool:
-        value = False
-        data = self.read(4)
-
-        ffs_encountered = 0
-        for num in data:
-            if num == 255:
-                ffs_encountered += 1
-        
-        if ffs_encountered == 4:
-            value = True
-        
-        return value
+        # only FF FF FF FF is true
+        return self.r_bytes(4) == b"\xFF\xFF\xFF\xFF"
     
     def write_type(self, data_type:str, data:any) -> None:
 
@@ -261,21 +677,46 @@ class FileManipulator(BytesIO):
         - data (Any): The data to be packed.
         """
 
-        prefix = self.get_struct_order_prefix()
-        format_str = prefix + data_type
-        self.write(struct.pack(format_str, data))
+        self.write(self.codec.get(data_type).pack(data))
+
+    def write_struct(self, compiled:struct.Struct, *values) -> None:
+
+        """
+        Packs values with a compiled struct and writes them to the file.
+
+        Args:
+        - compiled (struct.Struct): The struct to pack with.
+        - values: The values to be packed.
+        """
+
+        self.write(compiled.pack(*values))
+    
+    def w_array(self, data_type:str, values) -> None:
+
+        """
+        Writes a run of values of the same type in one call.
+
+        Args:
+        - data_type (str): The struct format of a single value (one of `bBhHiIqQf`).
+        - values: The values to be written.
+        """
+
+        values = array.array(ARRAY_TYPECODES[data_type], values)
+        if self.codec.byteswap:
+            values.byteswap()
+        self.write(values)
     
     def w_u8(self, data) -> None:
         """
         Writes an unsigned byte to the file.
         """
-        self.write_type("B", data)
+        self.write(self.codec.u8.pack(data))
     
     def w_s8(self, data) -> None:
         """
         Writes a signed byte to the file.
         """
-        self.write_type("b", data)
+        self.write(self.codec.s8.pack(data))
     
     def w_u16(self, data) -> None:
 
@@ -283,20 +724,18 @@ class FileManipulator(BytesIO):
         Writes a 2-byte unsigned short to the file.
         """
 
-        self.write_type("H", data)
+        self.write(self.codec.u16.pack(data))
     
     def w_u16_jps(self, data, mode:int=0) -> None:
         """
         Writes a 2-byte unsigned short to the file.
         """
-        self.write_type("H", data)
-        byte_to_write = b""
+        filler = b""
         if mode == 0:
-            byte_to_write = b"\xCD"
+            filler = b"\xCD\xCD"
         elif mode == 1:
-            byte_to_write = b"\xFF"
-        for _ in range(2):
-            self.write(byte_to_write)
+            filler = b"\xFF\xFF"
+        self.write(self.codec.u16.pack(data) + filler)
     
     def w_s16(self, data) -> None: 
         """
@@ -306,7 +745,7 @@ class FileManipulator(BytesIO):
         - The short that was read.
         """
     
-        self.write_type("h", data)
+        self.write(self.codec.s16.pack(data))
     
     def w_u32(self, data) -> None:
             
@@ -314,7 +753,7 @@ class FileManipulator(BytesIO):
         Writes a 4-byte unsigned integer to the file.
         """
 
-        self.write_type("I", data)
+        self.write(self.codec.u32.pack(data))
     
     def w_s32(self, data) -> None:
                 
@@ -322,7 +761,7 @@ class FileManipulator(BytesIO):
         Writes a 4-byte signed integer to the file.
         """
 
-        self.write_type("i", data)
+        self.write(self.codec.s32.pack(data))
     
     def w_u64(self, data) -> None:
         
@@ -330,7 +769,7 @@ class FileManipulator(BytesIO):
         Writes an 8-byte unsigned integer to the file.
         """
 
-        self.write_type("Q", data)
+        self.write(self.codec.u64.pack(data))
     
     def w_s64(self, data) -> None:
         
@@ -338,7 +777,7 @@ class FileManipulator(BytesIO):
         Writes an 8-byte signed integer to the file.
         """
 
-        self.write_type("q", data)
+        self.write(self.codec.s64.pack(data))
     
     def w_u128(self, data) -> None:
             
@@ -346,8 +785,7 @@ class FileManipulator(BytesIO):
         Writes a 16-byte unsigned integer to the file.
         """
 
-        self.write_type("Q", data >> 64)
-        self.write_type("Q", data & 0xFFFFFFFFFFFFFFFF)
+        self.write(self.codec.u128.pack(data >> 64, data & 0xFFFFFFFFFFFFFFFF))
     
     def w_s128(self, data) -> None:
 
@@ -355,11 +793,10 @@ class FileManipulator(BytesIO):
         Writes a 16-byte signed integer to the file.
         """
 
-        self.write_type("q", data >> 64)
-        self.write_type("q", data & 0xFFFFFFFFFFFFFFFF)
+        self.write(self.codec.s128.pack(data >> 64, data & 0xFFFFFFFFFFFFFFFF))
     
     def w_float(self, data) -> None:
-        self.write_type("f", data)
+        self.write(self.codec.float.pack(data))
 
     def w_str(self, text:str) -> None:
         self.write(text.encode("utf-8"))
@@ -377,15 +814,13 @@ class FileManipulator(BytesIO):
         self.pad()
 
     def w_str_null(self, text:str) -> None:
-        self.w_str(text)
-        self.w_u8(0)
+        self.write(text.encode("utf-8") + b"\x00")
     
     def w_bool(self, value:bool) -> None:
-        num = 0
         if value == True:
-            num = 255
-        for _ in range(4):
-            self.w_u8(num)
+            self.write(b"\xFF\xFF\xFF\xFF")
+        else:
+            self.write(b"\x00\x00\x00\x00")
     
     def flip_endian(self) -> None:
         if self.endian == EndianType.BIG:
@@ -453,8 +888,109 @@ class FileManipulator(BytesIO):
             f.write(self.getbuffer())
 
     @staticmethod
-    def from_path(path:str, endian:EndianType=EndianType.BIG, write_mode:WriteMode=WriteMode.OVERWRITE) -> "FileManipulator":
+    def from_path(path:str, endian:EndianType=EndianType.BIG, write_mode:WriteMode=WriteMode.OVERWRITE, mapped:bool=False) -> "FileManipulator":
+        if mapped == True:
+            return MappedFileManipulator(path, endian=endian)
         file = open(path, "rb")
         fm = FileManipulator(data=file.read(), endian=endian, write_mode=write_mode)
         file.close()
         return fm
+
+class MappedFileManipulator(FileManipulator):
+    """
+    Read-only FileManipulator backed by a memory-mapped file.
+
+    Nothing is read up front. `read()` returns zero-copy memoryview slices of
+    the mapping, so pages are only loaded when a parser touches them. Slices
+    keep the mapping alive, so it is only unmapped once they are all released.
+    """
+
+    path:str
+    mapping:mmap.mmap
+    view:memoryview
+    position:int
+
+    def __init__(self, path:str, endian:EndianType=EndianType.BIG) -> "MappedFileManipulator":
+        super().__init__(endian=endian)
+        self.path = path
+        self.position = 0
+        with open(path, "rb") as file:
+            if os.fstat(file.fileno()).st_size == 0:
+                # empty files can't be mapped
+                self.mapping = b""
+            else:
+                self.mapping = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        self.view = memoryview(self.mapping)
+
+    def _view(self):
+        return self.mapping
+
+    def read(self, size:int=-1) -> memoryview:
+        start = self.position
+        end = len(self.view)
+        if size != None and size >= 0:
+            end = min(start + size, end)
+        if end < start:
+            end = start
+        self.position = end
+        return self.view[start:end]
+
+    def read_at(self, offset:int, size:int) -> memoryview:
+        if offset < 0 or size < 0 or offset + size > len(self.view):
+            raise ParseError(f"Unexpected end of file reading {size} bytes", offset)
+        return self.view[offset:offset + size]
+
+    def view_at(self, offset:int, size:int) -> memoryview:
+        return self.read_at(offset, size)
+
+    def readinto(self, buffer) -> int:
+        data = self.read(len(buffer))
+        buffer[:len(data)] = data
+        return len(data)
+
+    def seek(self, pos:int, whence:int=0) -> int:
+        if whence == 1:
+            pos += self.position
+        elif whence == 2:
+            pos += len(self.view)
+        if pos < 0:
+            raise ValueError(f"negative seek value {pos}")
+        self.position = pos
+        return pos
+
+    def tell(self) -> int:
+        return self.position
+
+    def write(self, __buffer:bytes):
+        raise UnsupportedOperation("memory-mapped files are read-only")
+
+    def truncate(self, size:int=None):
+        raise UnsupportedOperation("memory-mapped files are read-only")
+
+    def writable(self) -> bool:
+        return False
+
+    def getbuffer(self) -> memoryview:
+        return self.view
+
+    def getvalue(self) -> bytes:
+        return bytes(self.view)
+
+    def size(self) -> int:
+        return len(self.view)
+
+    def close(self) -> None:
+        if not self.closed:
+            self.view.release()
+            if isinstance(self.mapping, mmap.mmap):
+                try:
+                    self.mapping.close()
+                except BufferError:
+                    # slices handed out by read() still use the mapping, it is unmapped when they are released
+                    pass
+        super().close()
+
+# lets the opt-in instrumentation count calls, this does nothing unless it's enabled
+from epicmickeylib.internal import instrumentation
+instrumentation.register(FileManipulator, inherited=("read", "readinto", "seek"))
+instrumentation.register(MappedFileManipulator)
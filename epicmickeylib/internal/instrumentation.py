@@ -0,0 +1,233 @@
+# epicmickeylib/internal/instrumentation.py
+#
+# opt-in counting of FileManipulator and BinaryBuilder calls, for finding out where parsing and packing spend their time
+#
+# enable it for a whole run with the EPICMICKEYLIB_INSTRUMENT environment variable (a report is printed at exit),
+# or around a block of code with `with instrument():`. nothing is patched while it is disabled, so it costs nothing
+#
+# this module doesn't import the classes it instruments, they register themselves when their module is loaded
+
+import atexit
+import os
+import sys
+import threading
+
+ENVIRONMENT_VARIABLE = "EPICMICKEYLIB_INSTRUMENT"
+
+# primitives that move the file pointer without reading or writing
+SEEK_PRIMITIVES = ("seek", "move", "align")
+
+class IOStats:
+    """
+    Call and byte counts per primitive and per calling function.
+    """
+
+    # (caller, primitive) -> [calls, bytes]
+    counts:dict[tuple[str, str], list[int]]
+    # primitive -> "read", "write" or "seek"
+    kinds:dict[str, str]
+
+    def __init__(self) -> "IOStats":
+        self.counts = {}
+        self.kinds = {}
+
+    def add(self, caller:str, primitive:str, kind:str, size:int) -> None:
+        counts = self.counts.get((caller, primitive))
+        if counts == None:
+            counts = [0, 0]
+            self.counts[(caller, primitive)] = counts
+            self.kinds[primitive] = kind
+        counts[0] += 1
+        counts[1] += size
+
+    def by_class(self) -> dict[str, dict[str, list[int]]]:
+
+        """
+        Totals the counts per calling class (or module level function).
+
+        Returns:
+        - A dict of caller class -> kind -> [calls, bytes].
+        """
+
+        totals = {}
+        for (caller, primitive), (calls, size) in self.counts.items():
+            caller_class = caller.split(".")[0]
+            kinds = totals.setdefault(caller_class, {})
+            total = kinds.setdefault(self.kinds[primitive], [0, 0])
+            total[0] += calls
+            total[1] += size
+        return totals
+
+    def report(self) -> str:
+
+        """
+        Formats the counts as a table, busiest callers first.
+
+        Returns:
+        - The report.
+        """
+
+        lines = ["I/O calls by caller"]
+        for caller_class, kinds in sorted(self.by_class().items(), key=lambda item: -sum(c[0] for c in item[1].values())):
+            summary = ", ".join(f"{kind}s: {calls} calls, {size} bytes" for kind, (calls, size) in sorted(kinds.items()))
+            lines.append(f"{caller_class}: {summary}")
+        lines.append("")
+        lines.append(f"{'caller':<48} {'primitive':<16} {'calls':>10} {'bytes':>12}")
+        for (caller, primitive), (calls, size) in sorted(self.counts.items(), key=lambda item: -item[1][0]):
+            lines.append(f"{caller:<48} {primitive:<16} {calls:>10} {size:>12}")
+        return "\n".join(lines)
+
+# stats currently being collected, innermost last
+active_stats:list[IOStats] = []
+# class -> methods it inherits from outside the package that should be counted too
+registered_classes:dict[type, tuple[str]] = {}
+# (class, name) -> the attribute that was there before patching, or None if it was inherited
+originals:dict[tuple[type, str], object] = {}
+state = threading.local()
+
+def get_kind(name:str) -> str:
+    if name in SEEK_PRIMITIVES:
+        return "seek"
+    if name.startswith("w_") or name.startswith("write") or name.startswith("pad"):
+        return "write"
+    return "read"
+
+def get_caller_name(frame) -> str:
+    code = frame.f_code
+    # co_qualname is only there on python 3.11 and up
+    qualname = getattr(code, "co_qualname", None)
+    if qualname != None:
+        return qualname
+    instance = frame.f_locals.get("self")
+    if instance != None:
+        return f"{type(instance).__name__}.{code.co_name}"
+    return code.co_name
+
+def wrap(name:str, method):
+    kind = get_kind(name)
+
+    def wrapper(self, *args, **kwargs):
+        # only count the call made by format code, not the primitives it is built on
+        if getattr(state, "busy", False):
+            return method(self, *args, **kwargs)
+        state.busy = True
+        try:
+            start = self.tell()
+            result = method(self, *args, **kwargs)
+            # bytes read, written or skipped over
+            size = abs(self.tell() - start)
+        finally:
+            state.busy = False
+        caller = get_caller_name(sys._getframe(1))
+        for stats in active_stats:
+            stats.add(caller, name, kind, size)
+        return result
+
+    wrapper.__name__ = name
+    wrapper.__doc__ = method.__doc__
+    return wrapper
+
+def get_primitive_names(cls:type) -> list[str]:
+    names = list(registered_classes[cls])
+    for name, value in vars(cls).items():
+        if not callable(value):
+            continue
+        if name.startswith("r_") or name.startswith("w_") or name.startswith("read") or name.startswith("write"):
+            names.append(name)
+        elif name in SEEK_PRIMITIVES or name in ("pad", "pad_to", "find", "rfind", "rfind_not"):
+            names.append(name)
+    return names
+
+def patch_class(cls:type) -> None:
+    for name in get_primitive_names(cls):
+        originals[(cls, name)] = vars(cls).get(name)
+        setattr(cls, name, wrap(name, getattr(cls, name)))
+
+def patch() -> None:
+    for cls in registered_classes:
+        patch_class(cls)
+
+def unpatch() -> None:
+    for (cls, name), original in originals.items():
+        if original == None:
+            delattr(cls, name)
+        else:
+            setattr(cls, name, original)
+    originals.clear()
+
+def register(cls:type, inherited:tuple[str] = ()) -> None:
+
+    """
+    Makes a class's primitives countable.
+
+    Args:
+    - cls (type): The class to instrument.
+    - inherited (tuple[str]): Inherited methods that should be counted as well.
+    """
+
+    registered_classes[cls] = inherited
+    if len(active_stats) > 0:
+        patch_class(cls)
+
+def enable() -> IOStats:
+
+    """
+    Starts counting calls into a new IOStats.
+
+    Returns:
+    - The stats that will be filled.
+    """
+
+    stats = IOStats()
+    if len(active_stats) == 0:
+        patch()
+    active_stats.append(stats)
+    return stats
+
+def disable(stats:IOStats) -> None:
+
+    """
+    Stops counting calls into the given stats, unpatching when nothing else is counting.
+
+    Args:
+    - stats (IOStats): The stats returned by `enable()`.
+    """
+
+    active_stats.remove(stats)
+    if len(active_stats) == 0:
+        unpatch()
+
+class instrument:
+    """
+    Context manager counting every FileManipulator and BinaryBuilder call made inside it.
+
+    Example:
+    ```
+    with instrument() as stats:
+        SceneFile.from_binary_path(path)
+    print(stats.report())
+    ```
+    """
+
+    stats:IOStats
+    report:bool
+
+    def __init__(self, report:bool = False) -> "instrument":
+        self.report = report
+
+    def __enter__(self) -> IOStats:
+        self.stats = enable()
+        return self.stats
+
+    def __exit__(self, *exc_info) -> None:
+        disable(self.stats)
+        if self.report:
+            print(self.stats.report(), file=sys.stderr)
+
+def enable_from_environment() -> None:
+    if not os.environ.get(ENVIRONMENT_VARIABLE):
+        return
+    stats = enable()
+    atexit.register(lambda: print(stats.report(), file=sys.stderr))
+
+enable_from_environment()
@@ -0,0 +1,91 @@
+# epicmickeylib/internal/lru_cache.py
+#
+# size bounded least recently used cache, for keeping a limited amount of decoded data around
+
+from collections import OrderedDict
+
+class LRUCache:
+    """
+    Keeps the most recently used values, dropping the oldest ones once the
+    cache holds more than `max_entries` values or more than `max_bytes` bytes.
+    A limit of 0 means that dimension is unbounded.
+
+    Values are measured with `len()`, so they should be bytes-like.
+    `on_evict` is called with the key and value of every evicted value.
+    """
+
+    max_entries:int
+    max_bytes:int
+    entries:OrderedDict
+    total_bytes:int
+    hits:int
+    misses:int
+    on_evict:callable
+
+    def __init__(self, max_entries:int = 0, max_bytes:int = 0, on_evict:callable = None) -> "LRUCache":
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.on_evict = on_evict
+        self.entries = OrderedDict()
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def __contains__(self, key) -> bool:
+        return key in self.entries
+
+    def get(self, key, default=None):
+
+        """
+        Gets a value and marks it as the most recently used.
+
+        Args:
+        - key: The key of the value.
+        - default: Returned if the key isn't cached.
+
+        Returns:
+        - The cached value, or `default`.
+        """
+
+        if key not in self.entries:
+            self.misses += 1
+            return default
+        self.hits += 1
+        self.entries.move_to_end(key)
+        return self.entries[key]
+
+    def put(self, key, value) -> None:
+
+        """
+        Caches a value, evicting the least recently used values if the cache is full.
+
+        Args:
+        - key: The key of the value.
+        - value: The value to cache.
+        """
+
+        self.remove(key)
+        size = len(value)
+        # a value that could never fit isn't cached at all
+        if self.max_bytes > 0 and size > self.max_bytes:
+            if self.on_evict != None:
+                self.on_evict(key, value)
+            return
+        self.entries[key] = value
+        self.total_bytes += size
+        while (self.max_entries > 0 and len(self.entries) > self.max_entries) or (self.max_bytes > 0 and self.total_bytes > self.max_bytes):
+            evicted_key, evicted = self.entries.popitem(last=False)
+            self.total_bytes -= len(evicted)
+            if self.on_evict != None:
+                self.on_evict(evicted_key, evicted)
+
+    def remove(self, key) -> None:
+        if key in self.entries:
+            self.total_bytes -= len(self.entries.pop(key))
+
+    def clear(self) -> None:
+        self.entries.clear()
+        self.total_bytes = 0
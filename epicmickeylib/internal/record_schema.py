@@ -0,0 +1,99 @@
+# epicmickeylib/internal/record_schema.py
+#
+# fixed-size record layouts, described once and compiled into a single struct
+
+import struct
+from epicmickeylib.internal.file_manipulator import EndianType, FileManipulator, get_codec
+
+class RecordSchema:
+    """
+    The layout of a fixed-size record, compiled into one `struct.Struct` per endian.
+
+    Fields are (name, struct type) pairs. The names only document the layout,
+    records are plain tuples in field order. Whole tables of records are
+    decoded with a single `iter_unpack` over one read.
+
+    Example:
+    ```
+    ENTRY = RecordSchema(("hashed_name", "I"), ("data_offset", "I"), ("data_size", "I"))
+    for hashed_name, data_offset, data_size in ENTRY.unpack_table(fm, amount):
+        ...
+    ```
+    """
+
+    fields:tuple[tuple[str, str]]
+    format:str
+    size:int
+
+    def __init__(self, *fields:tuple[str, str]) -> "RecordSchema":
+        self.fields = fields
+        self.format = "".join(data_type for _, data_type in fields)
+        self.size = struct.calcsize("<" + self.format)
+
+    @property
+    def names(self) -> list[str]:
+        return [name for name, _ in self.fields]
+
+    def get_struct(self, endian:EndianType) -> struct.Struct:
+        # compiled structs are cached by the codec
+        return get_codec(endian).get(self.format)
+
+    def unpack(self, fm:FileManipulator) -> tuple:
+
+        """
+        Reads one record.
+
+        Args:
+        - fm (FileManipulator): The file to read from, at the start of the record.
+
+        Returns:
+        - The values of the record, in field order.
+        """
+
+        return fm.read_struct(fm.codec.get(self.format))
+
+    def unpack_table(self, fm:FileManipulator, count:int):
+
+        """
+        Reads `count` consecutive records in one read.
+
+        Args:
+        - fm (FileManipulator): The file to read from, at the start of the first record.
+        - count (int): The amount of records.
+
+        Returns:
+        - An iterator of records, each a tuple of values in field order.
+        """
+
+        compiled = fm.codec.get(self.format)
+        return compiled.iter_unpack(fm.r_bytes(compiled.size * count))
+
+    def pack(self, endian:EndianType, *values) -> bytes:
+        return self.get_struct(endian).pack(*values)
+
+    def pack_to(self, writer, *values):
+
+        """
+        Writes one record.
+
+        Args:
+        - writer (FileManipulator | BinaryBuilder): Where to write the record.
+        - values: The values of the record, in field order.
+        """
+
+        writer.write(writer.codec.get(self.format).pack(*values))
+        return writer
+
+    def pack_table(self, writer, records):
+
+        """
+        Writes consecutive records as one chunk.
+
+        Args:
+        - writer (FileManipulator | BinaryBuilder): Where to write the records.
+        - records: The records, each a tuple of values in field order.
+        """
+
+        compiled = writer.codec.get(self.format)
+        writer.write(b"".join([compiled.pack(*record) for record in records]))
+        return writer
@@ -0,0 +1,63 @@
+# epicmickeylib/internal/string_pool.py
+#
+# cached reader for strings that are pointed to from many places in a file
+
+import sys
+from epicmickeylib.internal.file_manipulator import FileManipulator, ParseError
+
+class StringPool:
+    """
+    Reads strings by offset without moving the file pointer.
+
+    Formats like scenes point at the same names thousands of times, so every
+    string is decoded once, interned and cached by its offset. A pool should
+    only live as long as the parse it was made for, since writing to the file
+    afterwards would leave the cache stale.
+    """
+
+    fm:FileManipulator
+    # the buffer of the file, taken once since the file isn't written to during a parse
+    view:bytes
+    strings:dict[tuple[int, str], str]
+
+    def __init__(self, fm:FileManipulator) -> "StringPool":
+        self.fm = fm
+        self.view = fm._view()
+        self.strings = {}
+
+    def r_str_null(self, offset:int, encoding:str = "utf-8") -> str:
+
+        """
+        Reads a null-terminated string.
+
+        Args:
+        - offset (int): The offset of the string.
+        - encoding (str): The encoding of the string.
+
+        Returns:
+        - The string that was read.
+        """
+
+        key = (offset, encoding)
+        string = self.strings.get(key)
+        if string is None:
+            end = self.view.find(b"\x00", offset, offset + self.fm.max_string_length + 1)
+            if end == -1:
+                raise ParseError("Unterminated string", offset)
+            string = sys.intern(str(self.view[offset:end], encoding, errors="backslashreplace"))
+            self.strings[key] = string
+        return string
+
+    def r_str_jps(self, offset:int) -> str:
+
+        """
+        Reads a JPS string (size byte, length byte, then a null-terminated string).
+
+        Args:
+        - offset (int): The offset of the size byte.
+
+        Returns:
+        - The string that was read.
+        """
+
+        return self.r_str_null(offset + 2)
@@ -67,6 +67,8 @@ DEFAULT_CONFIG = {
     "font_size": 12,
     "text_background_color": [25, 35, 45],
     "save_pak_on_update": True,
+    # rewriting only what changed is faster, but a save that's interrupted leaves a broken .pak
+    "save_pak_in_place": False,
     "update_shortcut": "Ctrl+S",
     "unluac_path": "./thirdparty/unluac.jar",
     "luac_path": "./thirdparty/luac.exe",
@@ -183,6 +185,10 @@ class SettingsWindow(QMainWindow):
         self.save_pak_on_update_checkbox.setChecked(self.config["save_pak_on_update"])
         layout.addRow(QLabel("Save .pak on update"), self.save_pak_on_update_checkbox)
 
+        self.save_pak_in_place_checkbox = QCheckBox()
+        self.save_pak_in_place_checkbox.setChecked(self.config["save_pak_in_place"])
+        layout.addRow(QLabel("Save .pak in place (faster, an interrupted save breaks the .pak)"), self.save_pak_in_place_checkbox)
+
         self.update_shortcut_line_edit = QLineEdit()
         self.update_shortcut_line_edit.setText(self.config["update_shortcut"])
         layout.addRow(QLabel("Update Shortcut"), self.update_shortcut_line_edit)
@@ -209,6 +215,7 @@ class SettingsWindow(QMainWindow):
         self.config["font"] = self.font_combo.currentText()
         self.config["font_size"] = self.font_size_spinbox.value()
         self.config["save_pak_on_update"] = self.save_pak_on_update_checkbox.isChecked()
+        self.config["save_pak_in_place"] = self.save_pak_in_place_checkbox.isChecked()
         self.config["update_shortcut"] = self.update_shortcut_line_edit.text()
         self.config["unluac_path"] = self.unluac_path_line_edit.text()
         self.config["luac_path"] = self.luac_path_line_edit.text()
@@ -343,7 +350,8 @@ class MainWindow(QMainWindow):
         self.file_menu.addAction(open_action)
 
         save_action = QAction("Save", self)
-        save_action.triggered.connect(self.save_file)
+        # triggered passes checked, which would be taken as in_place
+        save_action.triggered.connect(lambda: self.save_file())
         self.file_menu.addAction(save_action)
 
         save_as_action = QAction("Save As", self)
@@ -554,19 +562,15 @@ class MainWindow(QMainWindow):
                     fm = FileManipulator(data, self.endian)
                     relative_dependencies = []
                     for start in relative_dependencies_start_offsets:
-                        fm.seek(start)
-                        # go back until we find a null byte
-                        while fm.read_backwards(1) != b"\x00":
-                            # continue reading backwards
+                        # go back to the last null byte before the match, it's part of the string's u32 length
+                        null_offset = fm.rfind(b"\x00", 0, start)
+                        if null_offset == -1:
                             continue
                         if self.endian == EndianType.BIG:
-                            # go back until we find a non-null byte
-                            while fm.read_backwards(1) == b"\x00":
-                                # continue reading backwards
-                                continue
-                            fm.move(1)
+                            # go back to the last non-null byte, the length starts right after it
+                            fm.seek(fm.rfind_not(0, null_offset) + 1)
                         else:
-                            fm.move(-3)
+                            fm.seek(null_offset - 3)
                         # read the length of the string
                         length = fm.r_u32()
                         # read the string
@@ -633,8 +637,8 @@ class MainWindow(QMainWindow):
         file_name, _ = QFileDialog.getOpenFileName(self, "Open file", "", "Packfiles (*.pak)")
         if file_name:
             self.change_pak_path(file_name)
-            # load the packfile
-            self.pak = Packfile.from_binary_path(file_name)
+            # load the packfile, only the table of contents is parsed and files are decompressed when they are opened
+            self.pak = Packfile.from_binary_path(file_name, lazy=True)
             self.list_widget.clear()
             self.text_edit.clear()
             # deselect all items
@@ -750,11 +754,14 @@ class MainWindow(QMainWindow):
             new_files_order.append(file)
         self.pak.files = new_files_order
 
-    def save_file(self):
+    def save_file(self, in_place:bool = None):
         # if we have a file open, save it
         if self.pak_path != "":
             self.update_pak_ordering()
-            self.pak.to_binary_path(self.pak_path, self.endian)
+            if in_place == None:
+                in_place = self.config["save_pak_in_place"]
+            # in place leaves unchanged data where it is in the file, otherwise a new file replaces it once it's complete
+            self.pak.to_binary_path(self.pak_path, self.endian, incremental=in_place)
         else:
             self.save_file_as()
 
@@ -870,7 +877,8 @@ def main():
         
         save_button = msg.addButton("Save Current Pak", QMessageBox.ActionRole)
         def save_pak():
-            window.save_file()
+            # the packfile may be in a broken state, so never risk the file on disk with an in place save
+            window.save_file(in_place=False)
         save_button.clicked.connect(save_pak)
 
         copy_button = msg.addButton("Copy Detailed Info and Exit", QMessageBox.ActionRole)
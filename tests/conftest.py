@@ -0,0 +1,8 @@
+# tests/conftest.py
+#
+# lets the tests import epicmickeylib when pytest is run from anywhere
+
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
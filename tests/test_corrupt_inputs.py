@@ -0,0 +1,200 @@
+# tests/test_corrupt_inputs.py
+#
+# truncated and bit-flipped copies of every binary format have to either parse or raise ParseError, and do it quickly
+
+import signal
+import threading
+import time
+from contextlib import contextmanager
+
+import pytest
+
+from epicmickeylib.internal.file_manipulator import FileManipulator, EndianType, ParseError
+from epicmickeylib.formats.apprentice_global_state import ApprenticeGlobalState, ApprenticeGlobalStateEntry
+from epicmickeylib.formats.caf import CafFile, VirtualAudioFile
+from epicmickeylib.formats.collectible_database import CollectibleDatabase, Collectible, Extra
+from epicmickeylib.formats.dct import DCT, DCTLine, DCTFooterEntry
+from epicmickeylib.formats.packfile import Packfile, VirtualFile
+from epicmickeylib.formats.scene import *
+from epicmickeylib.formats.subtitle_file import SubtitleFile, Subtitle
+
+# seconds one parse may take, every sample parses in a few milliseconds
+TIME_BUDGET = 2.0
+
+# offsets tried per sample, spread evenly over it
+OFFSETS = 64
+
+# xor masks applied at every offset: the lowest bit, the highest bit and every bit
+FLIP_MASKS = (0x01, 0x80, 0xFF)
+
+class ParseTimeout(BaseException):
+    # not an Exception, so a parser catching Exception can't swallow it
+    pass
+
+@contextmanager
+def time_limit(seconds:float):
+    # stops a parse stuck in a loop, only possible on the main thread of a platform with SIGALRM
+    if not hasattr(signal, "setitimer") or threading.current_thread() is not threading.main_thread():
+        yield
+        return
+
+    def expire(signum, frame):
+        raise ParseTimeout()
+
+    previous = signal.signal(signal.SIGALRM, expire)
+    signal.setitimer(signal.ITIMER_REAL, seconds)
+    try:
+        yield
+    finally:
+        signal.setitimer(signal.ITIMER_REAL, 0)
+        signal.signal(signal.SIGALRM, previous)
+
+def build_scene(version:int) -> bytes:
+    properties = [
+        Property("Point3", "Translation", value=Point3(1, 2, 1.5)),
+        Property("Matrix3", "Rotation", value=Matrix3()),
+        Property("Float", "F", value=0.25),
+        Property("Float", "FL", value=[0.5, 1.0]),
+        Property("Integer", "I", value=-3),
+        Property("Boolean", "B", value=True),
+        Property("String", "S", value="text"),
+        Property("String", "SL", value=["a", "b"], asset=True),
+        Property("Entity Pointer", "E", value=EntityPointer(ID(2))),
+        Property("Color (RGBA)", "CA", value=[ColorRGBA(0.5, 0.25, 1, 0)]),
+        Property("Short", "Sh", value=-3),
+        Property("String", "Pal", value="palette", palette=True)
+    ]
+    entities = []
+    for i in range(2):
+        components = [Component(f"JPSComp{j}", "", ID(0x1234 + j), ID(i * 10 + j), ID(5) if j else None, properties) for j in range(2)]
+        entities.append(Entity("JPSGeneralEntity", f"entity{i}", ID(i + 1), ID(3) if i else None, i, i * 2, components))
+    extra_strings = ["x", "yy"] if version != SceneFileVersion.VERSION_1 else []
+    scene = SceneFile(Scene([ID(k) for k in range(4)]), Objects(entities), ID(0xdeadbeef), extra_strings, version)
+    return bytes(scene.pack(EndianType.BIG))
+
+def build_packfile() -> bytes:
+    files = [
+        VirtualFile(Packfile.determine_type_from_path(path), Packfile.determine_compress_from_path(path), 6, path, data)
+        for path, data in (
+            ("levels/a/scene.bin", b"scene data " * 20),
+            ("levels/a/script.lua", b"return 1\n" * 10),
+            ("textures/a_tex.nif", bytes(range(256))),
+            ("root.sub", b"")
+        )
+    ]
+    return bytes(Packfile(files=files).pack(EndianType.BIG))
+
+def build_dct() -> bytes:
+    lines = [DCTLine(0x1000 + i, f"line {i}") for i in range(8)] + [DCTLine()]
+    return bytes(DCT(lines=lines, footer_lines=[DCTFooterEntry(i, f"footer {i}") for i in range(3)]).pack())
+
+def build_collectible_database() -> bytes:
+    collectibles = [Collectible(f"collectible{i}", "type", "icon") for i in range(3)]
+    extras = [Extra("state", "type", "thumbnail", "asset") for _ in range(2)]
+    return bytes(CollectibleDatabase(3, collectibles, extras).pack())
+
+def build_apprentice_global_state() -> bytes:
+    return bytes(ApprenticeGlobalState(30, [ApprenticeGlobalStateEntry(f"state{i}", i, i * 2, i % 2 == 1) for i in range(6)]).pack())
+
+def build_subtitles() -> bytes:
+    return bytes(SubtitleFile(1, [Subtitle(1, f"KEY_{i}", i * 10, i * 10 + 5) for i in range(4)]).pack(EndianType.BIG))
+
+def build_caf() -> bytes:
+    return bytes(CafFile(files=[VirtualAudioFile(i * 7, bytes(range(100 + i))) for i in range(3)]).pack(EndianType.BIG))
+
+def parse_apprentice_global_state(data:bytes) -> ApprenticeGlobalState:
+    # there's no from_binary, the parser reads straight from a FileManipulator
+    state = ApprenticeGlobalState()
+    state.entries = []
+    state.unpack(FileManipulator(data))
+    return state
+
+# name -> (function building a valid sample, function parsing it)
+FORMATS = {
+    "pak": (build_packfile, Packfile.from_binary),
+    "scene v1": (lambda: build_scene(SceneFileVersion.VERSION_1), SceneFile.from_binary),
+    "scene v2": (lambda: build_scene(SceneFileVersion.VERSION_2), SceneFile.from_binary),
+    "dct": (build_dct, DCT.from_binary),
+    "clb": (build_collectible_database, CollectibleDatabase.from_binary),
+    "apprentice global state": (build_apprentice_global_state, parse_apprentice_global_state),
+    "sub": (build_subtitles, SubtitleFile.from_binary),
+    "caf": (build_caf, lambda data: CafFile.from_binary(data, EndianType.BIG))
+}
+
+def get_offsets(data:bytes) -> list[int]:
+    step = max(1, len(data) // OFFSETS)
+    return sorted(set(range(0, len(data), step)) | {len(data) - 1})
+
+def truncations(data:bytes):
+    for size in get_offsets(data):
+        yield f"truncated to {size} bytes", data[:size]
+
+def bit_flips(data:bytes):
+    for offset in get_offsets(data):
+        for mask in FLIP_MASKS:
+            flipped = bytearray(data)
+            flipped[offset] ^= mask
+            yield f"byte {offset} xor {mask:#04x}", bytes(flipped)
+
+def check_parse(parse:callable, data:bytes, label:str) -> None:
+    start = time.perf_counter()
+    try:
+        with time_limit(TIME_BUDGET):
+            parse(data)
+    except ParseError:
+        pass
+    except ParseTimeout:
+        pytest.fail(f"{label}: still parsing after {TIME_BUDGET} s")
+    except Exception as e:
+        pytest.fail(f"{label}: raised {type(e).__name__} instead of ParseError: {e}")
+    elapsed = time.perf_counter() - start
+    assert elapsed < TIME_BUDGET, f"{label}: took {elapsed:.2f} s"
+
+@pytest.mark.parametrize("name", FORMATS)
+def test_valid_sample_parses(name:str):
+    build, parse = FORMATS[name]
+    parse(build())
+
+@pytest.mark.parametrize("name", FORMATS)
+def test_truncated(name:str):
+    build, parse = FORMATS[name]
+    for label, data in truncations(build()):
+        check_parse(parse, data, f"{name} {label}")
+
+@pytest.mark.parametrize("name", FORMATS)
+def test_bit_flipped(name:str):
+    build, parse = FORMATS[name]
+    for label, data in bit_flips(build()):
+        check_parse(parse, data, f"{name} {label}")
+
+def test_unterminated_string():
+    # used to read one byte at a time forever at the end of the file
+    with time_limit(TIME_BUDGET):
+        with pytest.raises(ParseError):
+            FileManipulator(b"no terminator").r_str_null()
+
+def test_string_over_the_limit():
+    fm = FileManipulator(b"a" * 64 + b"\x00")
+    fm.max_string_length = 16
+    with pytest.raises(ParseError):
+        fm.r_str_null()
+
+def test_apprentice_global_state_truncated_entry():
+    # a truncated last entry used to leave the position past the end, so the loop never ended
+    data = build_apprentice_global_state()
+    for size in range(len(data) - 12, len(data)):
+        check_parse(parse_apprentice_global_state, data[:size], f"apprentice global state truncated to {size} bytes")
+
+def test_dct_footer_offset_past_the_end():
+    # the footer was scanned for until the position reached an offset past the end of the file
+    data = bytearray(build_dct())
+    fm = FileManipulator(endian=EndianType.LITTLE)
+    fm.w_u32(0xFFFFFF00)
+    data[0x18:0x1C] = fm.getvalue()
+    with time_limit(TIME_BUDGET):
+        with pytest.raises(ParseError):
+            DCT.from_binary(bytes(data))
+
+def test_unknown_subtitle_version():
+    with pytest.raises(ParseError):
+        SubtitleFile.from_binary(build_subtitles(), version=7)
@@ -0,0 +1,21 @@
+# tests/test_instrumentation.py
+#
+# counting calls per caller, on every python version
+
+from types import SimpleNamespace
+
+from epicmickeylib.internal import instrumentation
+from epicmickeylib.internal.file_manipulator import FileManipulator
+from epicmickeylib.formats.dct import DCT, DCTLine
+
+def test_counts_calls_by_caller():
+    data = DCT(lines=[DCTLine(1, "a"), DCTLine(2, "b")], footer_lines=[]).pack()
+    with instrumentation.instrument() as stats:
+        DCT.from_binary(data)
+    assert "DCT" in stats.by_class()
+
+def test_caller_name_without_qualname():
+    # python before 3.11 has no co_qualname, the class comes from self instead
+    code = SimpleNamespace(co_name="unpack")
+    assert instrumentation.get_caller_name(SimpleNamespace(f_code=code, f_locals={"self": FileManipulator()})) == "FileManipulator.unpack"
+    assert instrumentation.get_caller_name(SimpleNamespace(f_code=code, f_locals={})) == "unpack"
@@ -0,0 +1,310 @@
+# tests/test_packfile.py
+#
+# packfile editing, saving and the indexes kept alongside its files
+
+import os
+
+import pytest
+
+from epicmickeylib.internal.file_manipulator import EndianType
+from epicmickeylib.formats.packfile import Packfile, VirtualFile, convert_header
+
+def make_file(path:str, data:bytes) -> VirtualFile:
+    return VirtualFile(Packfile.determine_type_from_path(path), Packfile.determine_compress_from_path(path), 6, path, data)
+
+def make_packfile(count:int = 3) -> Packfile:
+    return Packfile(files=[make_file(f"folder/file{i}.nif", bytes([i]) * (100 + 50 * i)) for i in range(count)])
+
+def test_offset_index_after_reassigning_files():
+    packfile = make_packfile()
+    f0, f1, f2 = packfile.files
+    start = packfile.get_offset_index().starts[0]
+    assert packfile.get_file_from_offset(start) is f0
+    # a new list can end up with the same number of changes as the old one had
+    packfile.files = [f2, f1, f0]
+    assert packfile.get_file_from_offset(start) is f2
+    packed = Packfile.from_binary(packfile.pack(EndianType.BIG))
+    assert packed.files[0].path == f2.path
+
+def check_path_index(files) -> None:
+    # every lookup has to agree with searching the list
+    normalize = Packfile.format_path_for_comparison
+    for file in files:
+        assert files.index_of(file) == next(i for i, other in enumerate(files) if other is file)
+        expected = next(other for other in files if normalize(other.path) == normalize(file.path))
+        assert files.get(file.path) is expected
+        assert files.get(file.path.upper().replace("/", "\\")) is expected
+    assert set(files.index) == {normalize(file.path) for file in files}
+    assert files.get("missing/file.nif") is None
+
+def run_mutators(check:callable) -> None:
+    files = make_packfile(4).files
+    check(files)
+    files.append(make_file("appended/a.nif", b"a"))
+    check(files)
+    files.insert(1, make_file("inserted/b.dds", b"b"))
+    check(files)
+    files.extend([make_file("extended/c.nif", b"c"), make_file("extended/d.nif", b"d")])
+    check(files)
+    files += [make_file("added/e.nif", b"e")]
+    check(files)
+    files[0] = make_file("replaced/f.nif", b"f")
+    check(files)
+    files[1:3] = [make_file("sliced/g.nif", b"g"), make_file("sliced/h.nif", b"h"), make_file("sliced/i.nif", b"i")]
+    check(files)
+    del files[2]
+    check(files)
+    del files[0:2]
+    check(files)
+    files.remove(files[1])
+    check(files)
+    files.pop()
+    check(files)
+    files.pop(0)
+    check(files)
+    files.sort(key=lambda file: file.path, reverse=True)
+    check(files)
+    files.reverse()
+    check(files)
+    # a second file with the same path, differently written, resolves to the first one in the list
+    files.append(make_file("/" + files[0].path.upper(), b"duplicate"))
+    check(files)
+    files.reverse()
+    check(files)
+    files[0].path = "renamed/j.nif"
+    check(files)
+    files *= 2
+    check(files)
+    files.clear()
+    check(files)
+
+def test_path_index_after_every_mutator():
+    run_mutators(check_path_index)
+
+def check_suffix_index(files) -> None:
+    normalize = Packfile.format_path_for_comparison
+    check_path_index(files)
+    for file in files:
+        path = normalize(file.path)
+        basename = path.rsplit("/", 1)[-1]
+        for suffix in (path, basename, basename[1:], "/" + basename):
+            expected = [other for other in files if normalize(other.path).endswith(normalize(suffix))]
+            assert files.find_by_suffix(suffix) == expected
+        expected = [other for other in files if normalize(other.path).rsplit("/", 1)[-1] == basename]
+        assert files.find_by_basename(basename.upper()) == expected
+    assert files.find_by_suffix("missing.nif") == []
+    assert files.find_by_basename("missing.nif") == []
+
+def test_suffix_index_after_every_mutator():
+    run_mutators(check_suffix_index)
+
+def test_get_data_from_end_path():
+    packfile = make_packfile(3)
+    packfile.files.append(make_file("other/file1.nif", b"other"))
+    assert packfile.get_data_from_end_path("folder/FILE1.nif") == packfile.files[1].data
+    assert packfile.get_data_from_end_path("file1.nif", all_matches=True) == [packfile.files[1].data, b"other"]
+
+@pytest.mark.parametrize("lazy", (False, True))
+def test_decompressed_data_is_immutable(lazy:bool, tmp_path):
+    path = str(tmp_path / "test.pak")
+    packfile = Packfile(files=[make_file("levels/a/scene.bin", b"scene data " * 100), make_file("a.nif", b"nif")])
+    packfile.to_binary_path(path)
+    packfile = Packfile.from_binary_path(path, lazy=lazy)
+    file = packfile.files[0]
+    assert isinstance(file.data, bytes)
+    # changing the data in place would leave the compressed data stale
+    with pytest.raises(TypeError):
+        file.data[0] = ord("S")
+    file.data = b"S" + file.data[1:]
+    packfile.to_binary_path(path, incremental=True)
+    assert Packfile.from_binary_path(path).files[0].data == b"Scene data " + b"scene data " * 99
+
+def save_mapped_over_itself(tmp_path, monkeypatch, lazy:bool, fail:bool = False):
+    path = str(tmp_path / "test.pak")
+    files = [make_file(f"folder/file{i}.{extension}", bytes([i]) * 300) for i, extension in enumerate(("nif", "bin", "lua", "nif"))]
+    Packfile(files=files).to_binary_path(path)
+    packfile = Packfile.from_binary_path(path, mapped=True, lazy=lazy)
+    mapping = packfile.layout.fm.mapping
+    replace = os.replace
+
+    def replace_like_windows(source:str, destination:str) -> None:
+        # windows can't rename over a file that is still mapped
+        assert mapping.closed
+        if fail == True:
+            raise PermissionError("the file is in use")
+        replace(source, destination)
+
+    monkeypatch.setattr(os, "replace", replace_like_windows)
+    packfile.files[1].data = b"changed"
+    packfile.files.append(make_file("folder/added.nif", b"added"))
+    return path, packfile
+
+@pytest.mark.parametrize("lazy", (False, True))
+def test_save_mapped_over_itself(lazy:bool, tmp_path, monkeypatch):
+    path, packfile = save_mapped_over_itself(tmp_path, monkeypatch, lazy)
+    expected = [bytes([0]) * 300, b"changed", bytes([2]) * 300, bytes([3]) * 300, b"added"]
+    packfile.to_binary_path(path)
+    # the files read from the new file now, which can be saved over again
+    assert [file.data for file in packfile.files] == expected
+    packfile.files[0].data = b"changed again"
+    packfile.to_binary_path(path)
+    expected[0] = b"changed again"
+    assert [file.data for file in Packfile.from_binary_path(path).files] == expected
+
+@pytest.mark.parametrize("lazy", (False, True))
+def test_save_mapped_over_itself_failing(lazy:bool, tmp_path, monkeypatch):
+    path, packfile = save_mapped_over_itself(tmp_path, monkeypatch, lazy, fail=True)
+    with pytest.raises(PermissionError):
+        packfile.to_binary_path(path)
+    # the old file is untouched and the files read from it again
+    assert len(Packfile.from_binary_path(path).files) == 4
+    assert [file.data for file in packfile.files] == [bytes([0]) * 300, b"changed", bytes([2]) * 300, bytes([3]) * 300, b"added"]
+
+def edit_data(packfile:Packfile) -> None:
+    packfile.files[1].data = b"longer than it was " * 40
+
+def shrink_data(packfile:Packfile) -> None:
+    packfile.files[0].data = b"short"
+
+def add_file(packfile:Packfile) -> None:
+    packfile.files.insert(1, make_file("added/levels/scene.bin", b"added " * 100))
+
+def remove_file(packfile:Packfile) -> None:
+    del packfile.files[1]
+
+def rename_file(packfile:Packfile) -> None:
+    # a longer path moves all the data back
+    packfile.files[2].path = "a/much/longer/folder/name/renamed.nif"
+
+def all_edits(packfile:Packfile) -> None:
+    for edit in (rename_file, add_file, edit_data, remove_file, shrink_data):
+        edit(packfile)
+
+EDITS = (edit_data, shrink_data, add_file, remove_file, rename_file, all_edits)
+
+@pytest.mark.parametrize("edit", EDITS)
+@pytest.mark.parametrize("lazy", (False, True))
+@pytest.mark.parametrize("endian", (EndianType.BIG, EndianType.LITTLE))
+def test_save_in_place(edit:callable, lazy:bool, endian:EndianType, tmp_path):
+    path = str(tmp_path / "test.pak")
+    files = [make_file(f"folder/file{i}.{extension}", bytes([i]) * (100 + 50 * i)) for i, extension in enumerate(("nif", "bin", "lua", "nif"))]
+    Packfile(files=files).to_binary_path(path, endian)
+    packfile = Packfile.from_binary_path(path, lazy=lazy)
+    edit(packfile)
+    expected = [(file.path, bytes(file.data)) for file in packfile.files]
+    assert packfile.save_in_place(endian)
+    # the same bytes a full save would write
+    with open(path, "rb") as f:
+        assert f.read() == bytes(packfile.pack(endian))
+    assert [(file.path, bytes(file.data)) for file in Packfile.from_binary_path(path).files] == expected
+    # and the next save starts from the one just done
+    packfile.files[-1].data = b"again"
+    assert packfile.save_in_place(endian)
+    with open(path, "rb") as f:
+        assert f.read() == bytes(packfile.pack(endian))
+
+def test_save_in_place_refused(tmp_path):
+    path = str(tmp_path / "test.pak")
+    make_packfile(3).to_binary_path(path)
+    packfile = Packfile.from_binary_path(path)
+    # unchanged files can't be reordered in place
+    packfile.files.reverse()
+    assert not packfile.save_in_place(EndianType.BIG)
+    packfile.files.reverse()
+    assert not packfile.save_in_place(EndianType.LITTLE)
+    # the file changed since it was read
+    make_packfile(2).to_binary_path(path)
+    assert not packfile.save_in_place(EndianType.BIG)
+    # nothing was written, and incremental falls back to a full save
+    assert len(Packfile.from_binary_path(path).files) == 2
+    packfile.to_binary_path(path, incremental=True)
+    assert len(Packfile.from_binary_path(path).files) == 3
+
+MERGE_INPUTS = [
+    [("shared/a.nif", b"a from the base"), ("base/b.nif", b"b"), ("shared/c.bin", b"c from the base " * 20)],
+    [("SHARED\\C.BIN", b"c from the mod " * 20), ("mod/d.lua", b"d"), ("/shared/a.nif", b"a from the mod")],
+    [("shared/a.nif", b"a from the last mod"), ("last/e.nif", b"e")]
+]
+
+# later inputs win, the winning file keeps the position of the first file with its path
+MERGED = [("shared/a.nif", b"a from the last mod"), ("base/b.nif", b"b"), ("SHARED\\C.BIN", b"c from the mod " * 20), ("mod/d.lua", b"d"), ("last/e.nif", b"e")]
+
+def test_merge():
+    packfiles = [Packfile(files=[make_file(path, data) for path, data in files]) for files in MERGE_INPUTS]
+    merged = Packfile.merge(packfiles)
+    assert [(file.path, file.data) for file in merged.files] == MERGED
+    # the inputs are left alone
+    assert packfiles[0].files[0].data == b"a from the base"
+
+@pytest.mark.parametrize("destination", (None, 0, 2))
+def test_merge_binary_paths(destination:int, tmp_path):
+    paths = []
+    for i, files in enumerate(MERGE_INPUTS):
+        paths.append(str(tmp_path / f"input{i}.pak"))
+        Packfile(files=[make_file(path, data) for path, data in files]).to_binary_path(paths[-1], EndianType.LITTLE)
+    # the output can be written over any of the inputs
+    destination_path = str(tmp_path / "merged.pak") if destination == None else paths[destination]
+    Packfile.merge_binary_paths(paths, destination_path)
+    merged = Packfile.from_binary_path(destination_path)
+    assert [(file.path, file.data) for file in merged.files] == MERGED
+    # in the endian of the first input
+    assert merged.layout.endian == EndianType.LITTLE
+
+def test_convert_header():
+    packfile = make_packfile(3)
+    packfile.files.append(make_file("levels/a/scene.bin", b"scene data " * 100))
+    big = bytes(packfile.pack(EndianType.BIG))
+    little = bytes(packfile.pack(EndianType.LITTLE))
+    # everything up to the end of the table of contents is converted, the path partition after it is the same in both
+    converted = convert_header(big, EndianType.BIG)
+    assert converted == little[:len(converted)]
+    assert convert_header(little, EndianType.LITTLE) == big[:len(converted)]
+    data_offset = Packfile.from_binary(big).files[0].stored_at[1]
+    assert big[len(converted):data_offset] == little[len(converted):data_offset]
+
+@pytest.mark.parametrize("in_place", (False, True))
+def test_convert_binary_path(in_place:bool, tmp_path):
+    packfile = make_packfile(3)
+    packfile.files.append(make_file("levels/a/scene.bin", b"scene data " * 100))
+    big_path = str(tmp_path / "big.pak")
+    packfile.to_binary_path(big_path, EndianType.BIG)
+    little_path = big_path if in_place == True else str(tmp_path / "little.pak")
+    assert Packfile.convert_binary_path(big_path, little_path) == EndianType.BIG
+    with open(little_path, "rb") as f:
+        assert f.read() == bytes(packfile.pack(EndianType.LITTLE))
+    back_path = little_path if in_place == True else str(tmp_path / "back.pak")
+    assert Packfile.convert_binary_path(little_path, back_path) == EndianType.LITTLE
+    with open(back_path, "rb") as f:
+        assert f.read() == bytes(packfile.pack(EndianType.BIG))
+    # converting to the endian it's already in copies it as it is
+    same_path = str(tmp_path / "same.pak")
+    assert Packfile.convert_binary_path(back_path, same_path, EndianType.BIG) == EndianType.BIG
+    with open(same_path, "rb") as f:
+        assert f.read() == bytes(packfile.pack(EndianType.BIG))
+
+def test_extract_continues_past_failures(tmp_path):
+    files = [
+        make_file("good/first.nif", b"first"),
+        make_file("../outside.nif", b"outside"),
+        make_file("good/damaged.bin", b"damaged " * 50),
+        make_file("good/scene.bin", b"not a scene"),
+        make_file("good/first.nif/under_a_file.nif", b"under a file"),
+        make_file("good/last.lua", b"return 1\n")
+    ]
+    binary = bytearray(Packfile(files=files).pack(EndianType.BIG))
+    # damage the compressed data of one file, a lazy packfile only notices when it's extracted
+    _, offset, compressed_size = Packfile.from_binary(bytes(binary), lazy=True).files[2].stored_at
+    binary[offset + compressed_size // 2:offset + compressed_size] = bytes(compressed_size - compressed_size // 2)
+    packfile = Packfile.from_binary(bytes(binary), lazy=True)
+    directory = tmp_path / "extracted"
+    failed = packfile.extract(str(directory), decompile=True, workers=2)
+    assert sorted(failed) == ["../outside.nif", "good/damaged.bin", "good/first.nif/under_a_file.nif", "good/scene.bin"]
+    assert failed["../outside.nif"].startswith("Not extracted")
+    assert failed["good/damaged.bin"].startswith("Not extracted, ParseError")
+    assert failed["good/scene.bin"].startswith("Not decompiled")
+    assert not (tmp_path / "outside.nif").exists()
+    assert (directory / "good" / "first.nif").read_bytes() == b"first"
+    # the raw data of a file that couldn't be decompiled is still extracted
+    assert (directory / "good" / "scene.bin").read_bytes() == b"not a scene"
+    assert (directory / "good" / "last.lua").read_bytes() == b"return 1\n"
+    assert (directory / "packfile_stripped.json").exists()
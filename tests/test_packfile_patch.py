@@ -0,0 +1,74 @@
+# tests/test_packfile_patch.py
+#
+# patches made between two packfiles rebuild the target byte for byte
+
+import pytest
+
+from epicmickeylib.formats.packfile import Packfile, VirtualFile
+from epicmickeylib.formats.packfile_patch import PackfilePatch
+
+def make_file(path:str, data:bytes) -> VirtualFile:
+    return VirtualFile(Packfile.determine_type_from_path(path), Packfile.determine_compress_from_path(path), 6, path, data)
+
+def write_packfile(path:str, files:list[tuple[str, bytes]]) -> str:
+    Packfile(files=[make_file(file_path, data) for file_path, data in files]).to_binary_path(path)
+    return path
+
+BASE_FILES = [
+    ("levels/a/scene.bin", b"scene data " * 200),
+    ("levels/a/script.lua", b"return 1\n" * 50),
+    ("textures/removed.nif", bytes(range(256)) * 4),
+    ("textures/resized.nif", bytes(300)),
+    ("textures/unchanged.nif", bytes(range(100)))
+]
+
+TARGET_FILES = [
+    ("levels/a/scene.bin", b"scene data " * 200),
+    ("levels/a/script.lua", b"return 1\n" * 50),
+    ("textures/added.nif", b"new file " * 30),
+    ("textures/resized.nif", bytes(700)),
+    ("textures/unchanged.nif", bytes(range(100)))
+]
+
+@pytest.fixture
+def paths(tmp_path) -> tuple[str, str, str]:
+    base_path = write_packfile(str(tmp_path / "base.pak"), BASE_FILES)
+    target_path = write_packfile(str(tmp_path / "target.pak"), TARGET_FILES)
+    patch_path = str(tmp_path / "patch.pkpt")
+    PackfilePatch.diff(base_path, target_path).to_binary_path(patch_path)
+    return base_path, target_path, patch_path
+
+def read(path:str) -> bytes:
+    with open(path, "rb") as f:
+        return f.read()
+
+def test_apply(paths, tmp_path):
+    base_path, target_path, patch_path = paths
+    patch = PackfilePatch.from_binary_path(patch_path)
+    # only the added and resized files are stored in the patch, the rest is copied from the base
+    assert [base_index == -1 for base_index, size in patch.operations] == [False, False, True, True, False]
+    destination_path = str(tmp_path / "patched.pak")
+    patch.apply(base_path, destination_path)
+    assert read(destination_path) == read(target_path)
+
+def test_apply_over_the_base(paths):
+    base_path, target_path, patch_path = paths
+    PackfilePatch.from_binary_path(patch_path).apply(base_path, base_path)
+    assert read(base_path) == read(target_path)
+
+def test_apply_to_the_wrong_base(paths, tmp_path):
+    base_path, target_path, patch_path = paths
+    other_path = write_packfile(str(tmp_path / "other.pak"), BASE_FILES[:-1])
+    other = read(other_path)
+    with pytest.raises(Exception, match="not the packfile this patch was made for"):
+        PackfilePatch.from_binary_path(patch_path).apply(other_path, other_path)
+    assert read(other_path) == other
+
+def test_apply_damaged_patch(paths, tmp_path):
+    base_path, target_path, patch_path = paths
+    patch = PackfilePatch.from_binary_path(patch_path)
+    patch.literals[0] = bytes(len(patch.literals[0]))
+    base = read(base_path)
+    with pytest.raises(Exception, match="doesn't match the target"):
+        patch.apply(base_path, base_path)
+    assert read(base_path) == base